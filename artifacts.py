@@ -0,0 +1,126 @@
+"""
+Reading and writing the intermediate files passed between the pipeline scripts
+(raml_api_details.json, parsed_api_v2.json, ...).
+
+Files are written as compact JSON by default, encoded with orjson when it is
+installed, and optionally as msgpack (when installed) and/or compressed with
+gzip or zstd (when zstandard is installed). `indent` writes the indented JSON
+the scripts used to write, for reading and diffing. The file names stay the
+same; `read` detects the format from the first bytes of the file, so every
+script reads whatever the previous one wrote.
+
+Keys are always strings, as in JSON: msgpack could keep the integer status
+codes of the RAML data, but the readers expect what a JSON file gives them.
+"""
+import gzip
+import json
+
+import sources
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ('json', 'msgpack')
+COMPRESSIONS = ('gzip', 'zstd')
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+JSON_START = b'{["-0123456789tfn \t\r\n'
+
+def _str_keys(data):
+    if isinstance(data, dict):
+        return {key if isinstance(key, str) else json.dumps(key).strip('"'): _str_keys(value)
+                for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_str_keys(value) for value in data]
+    return data
+
+def dumps(data, fmt='json', compress=None, indent=None):
+    """
+    Returns data encoded in `fmt`, compressed with `compress`. `indent` only
+    applies to JSON; msgpack has no indented form, so it is ignored there.
+    """
+    if fmt == 'json':
+        if indent:
+            content = json.dumps(data, indent=indent).encode('utf-8')
+        elif orjson is not None:
+            content = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    elif fmt == 'msgpack':
+        if msgpack is None:
+            raise ValueError("The msgpack format needs the msgpack package.")
+        content = msgpack.packb(_str_keys(data), use_bin_type=True)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}.")
+
+    if compress == 'gzip':
+        return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+    if compress == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package.")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(content)
+    if compress:
+        raise ValueError(f"Unknown compression {compress!r}, expected one of {', '.join(COMPRESSIONS)}.")
+    return content
+
+def loads(content):
+    """
+    Decodes a bytes-like object written by `dumps` (or any JSON document),
+    detecting the format. orjson and msgpack read the buffer in place.
+    """
+    with memoryview(content) as view:
+        head = bytes(view[:4])
+        if head.startswith(GZIP_MAGIC):
+            return loads(gzip.decompress(view))
+        if head.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise ValueError("The file is zstd-compressed, reading it needs the zstandard package.")
+            return loads(zstandard.ZstdDecompressor().decompress(view))
+        if not head or head[0] in JSON_START or head.startswith(b'\xef\xbb\xbf'):
+            return orjson.loads(view) if orjson is not None else json.loads(bytes(view))
+        if msgpack is None:
+            raise ValueError("The file is not JSON; if it is msgpack, reading it needs the msgpack package.")
+        return msgpack.unpackb(view, raw=False)
+
+def write(data, file_path, fmt='json', compress=None, indent=None):
+    """Writes data to file_path in the given format (see dumps)."""
+    content = dumps(data, fmt, compress, indent)
+    with open(file_path, 'wb') as f:
+        f.write(content)
+
+def read(file_path):
+    """Reads a file written by `write`, or any JSON file, from a mapping of it (see sources)."""
+    with sources.mapped(file_path) as content:
+        return loads(content)
+
+def add_arguments(parser, default_indent=None):
+    """Adds the --indent, --format and --compress options to an argparse parser."""
+    parser.add_argument('--indent', type=int, nargs='?', const=2, default=default_indent, metavar='N',
+                        help='write indented, human-readable JSON (default indent: 2); '
+                             'ignored with --format msgpack')
+    parser.add_argument('--format', dest='artifact_format', choices=FORMATS, default='json',
+                        help='format of the intermediate files (default: compact JSON)')
+    parser.add_argument('--compress', choices=COMPRESSIONS, default=None,
+                        help='compress the intermediate files')
+
+def options(args):
+    """Returns the write options chosen with the add_arguments options, as keyword arguments for write."""
+    return {
+        'fmt': getattr(args, 'artifact_format', 'json'),
+        'compress': getattr(args, 'compress', None),
+        'indent': getattr(args, 'indent', None),
+    }
@@ -0,0 +1,71 @@
+"""
+Size, dump and load time of the intermediate files in each format of artifacts.
+
+The first row is what the scripts wrote before (stdlib json, indented); the
+others are the formats `artifacts.write` can produce here (msgpack and zstd
+only when installed). HTML files are parsed with parse_html_v2 first, to
+measure the records it writes. --scale N repeats the records N times. Run
+from the repository root:
+
+    python -m benchmarks.bench_artifacts [--files raml_api_details.json kix_api_docs.html] [--scale 10]
+"""
+import argparse
+import json
+import time
+
+import artifacts
+import parse_html_v2
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def scaled(data, scale):
+    if isinstance(data, list):
+        return data * scale
+    return {section: {f'{key}{copy_number or ""}': value
+                      for copy_number in range(scale) for key, value in entries.items()}
+            if isinstance(entries, dict) else entries
+            for section, entries in data.items()}
+
+def variants():
+    yield 'json indent (before)', lambda data: json.dumps(data, indent=2).encode('utf-8'), json.loads
+    yield 'json compact, stdlib', lambda data: json.dumps(data, separators=(',', ':')).encode('utf-8'), json.loads
+    for fmt in artifacts.FORMATS:
+        if fmt == 'msgpack' and artifacts.msgpack is None:
+            continue
+        for compress in (None,) + artifacts.COMPRESSIONS:
+            if compress == 'zstd' and artifacts.zstandard is None:
+                continue
+            name = f"{fmt}{' + ' + compress if compress else ''}"
+            if fmt == 'json' and artifacts.orjson is not None:
+                name += ', orjson'
+            yield name, lambda data, fmt=fmt, compress=compress: artifacts.dumps(data, fmt, compress), artifacts.loads
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', nargs='+', default=['raml_api_details.json', 'kix_api_docs.html'])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for file_path in args.files:
+        if file_path.endswith('.html'):
+            data = scaled(parse_html_v2.parse_html(file_path), args.scale)
+        else:
+            data = scaled(artifacts.read(file_path), args.scale)
+        print(f"\n{file_path}" + (f" x{args.scale}" if args.scale > 1 else ''))
+        print(f"{'format':<28} {'bytes':>10} {'dump ms':>9} {'load ms':>9}")
+        expected = json.loads(json.dumps(data))
+        for name, dump, load in variants():
+            dump_time, content = best_of(args.repeat, lambda: dump(data))
+            load_time, loaded = best_of(args.repeat, lambda: load(content))
+            assert loaded == expected, name
+            print(f"{name:<28} {len(content):>10} {dump_time * 1000:>9.1f} {load_time * 1000:>9.1f}")
+
+if __name__ == '__main__':
+    main()
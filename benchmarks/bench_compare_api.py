@@ -0,0 +1,40 @@
+"""
+Scale benchmark of the compare_api comparison engine on synthetic specs.
+
+Indexing the OpenAPI document and diffing the HTML records against it are
+timed separately, together with the reverse diff. Run from the repository
+root:
+
+    python -m benchmarks.bench_compare_api [--scales 10000 50000 100000]
+"""
+import argparse
+import time
+
+from benchmarks import synthetic
+import compare_api
+import records
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--params', type=int, default=5, help='query parameters per endpoint')
+    args = parser.parse_args()
+
+    print(f"{'endpoints':>9} {'index ms':>9} {'diff ms':>8} {'reverse ms':>10} {'missing':>8} {'undocumented':>12}")
+    for scale in args.scales:
+        openapi_data = synthetic.make_openapi_spec(scale, params_per_endpoint=args.params)
+        html_data = records.html_endpoints(synthetic.make_html_records(scale, params_per_endpoint=args.params))
+
+        index_time, index = timed(compare_api.build_openapi_index, openapi_data)
+        diff_time, missing = timed(compare_api.diff_specs, html_data, index)
+        reverse_time, undocumented = timed(compare_api.reverse_diff_specs, html_data, index)
+        print(f"{scale:>9} {index_time * 1000:>9.1f} {diff_time * 1000:>8.1f} {reverse_time * 1000:>10.1f} "
+              f"{sum(map(len, missing.values())):>8} {sum(map(len, undocumented.values())):>12}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Size and load time of openapi.yaml with inline and with shared examples/property schemas.
+
+Both variants are produced by a full update_openapi run on copies of the
+given files, and their sizes are compared with the given openapi.yaml as it
+is (inline is the default, which writes repeated examples once as YAML
+anchors and aliases). Swagger UI downloads the spec and parses it in the browser; as a
+stand-in, the raw and gzipped sizes and the time to parse the YAML (libyaml)
+and its JSON equivalent are reported. Run from the repository root:
+
+    python -m benchmarks.bench_dedupe [--openapi openapi.yaml] [--raml raml_api_details.json]
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import update_openapi
+import yaml_backend
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def build(tmp, openapi_file, raml_file, dedupe):
+    target = Path(tmp) / f"openapi-{'shared' if dedupe else 'inline'}.yaml"
+    shutil.copy(openapi_file, target)
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_openapi.main(raml_file, target, Path(tmp) / 'state.json', full=True, dedupe=dedupe)
+    return target.read_text(encoding='utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--openapi', default=update_openapi.OPENAPI_FILE)
+    parser.add_argument('--raml', default=update_openapi.RAML_FILE)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        from openapi_spec_validator import validate
+    except ImportError:
+        validate = None
+
+    print(f"{'variant':<8} {'bytes':>9} {'gzip':>8} {'yaml load ms':>13} {'json load ms':>13} {'valid':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = {}
+        for dedupe in (False, True):
+            text = build(tmp, args.openapi, args.raml, dedupe)
+            yaml_time, data = best_of(args.repeat, lambda: yaml_backend.safe_load(text))
+            json_text = json.dumps(data)
+            json_time, _ = best_of(args.repeat, lambda: json.loads(json_text))
+            valid = '-'
+            if validate is not None:
+                validate(data)
+                valid = 'yes'
+            rows[dedupe] = (len(text.encode('utf-8')), len(gzip.compress(text.encode('utf-8'))), yaml_time, json_time)
+            name = 'shared' if dedupe else 'inline'
+            print(f"{name:<8} {rows[dedupe][0]:>9} {rows[dedupe][1]:>8} {yaml_time * 1000:>13.1f} "
+                  f"{json_time * 1000:>13.1f} {valid:>6}")
+
+    baseline = Path(args.openapi).read_bytes()
+    inline, shared = rows[False], rows[True]
+    for name, row in (('inline', inline), ('shared', shared)):
+        print(f"{name} against {args.openapi} ({len(baseline)} bytes): {row[0] - len(baseline):+} bytes "
+              f"({row[0] / len(baseline) - 1:+.1%}), {row[1] - len(gzip.compress(baseline)):+} gzipped")
+    print(f"shared against inline: YAML load time {shared[2] / inline[2] - 1:+.1%}, "
+          f"JSON load time {shared[3] / inline[3] - 1:+.1%}.")
+
+if __name__ == '__main__':
+    main()
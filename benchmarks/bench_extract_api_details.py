@@ -0,0 +1,43 @@
+"""
+Timing of parse_raml.extract_api_details on synthetic RAML trees.
+
+The trees are resolved once per scale; only the extraction (resourceType and
+trait application) is timed. Run from the repository root:
+
+    python -m benchmarks.bench_extract_api_details [--scales 100 1000 5000]
+"""
+import argparse
+import contextlib
+import copy
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+import parse_raml
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'resources':>9} {'paths':>7} {'best ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            entry = synthetic.write_raml_tree(Path(tmp) / str(scale), resources=scale, include_depth=1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                raml_data = parse_raml.get_resolved_raml(entry)
+
+            timings = []
+            for _ in range(args.repeat):
+                data = copy.deepcopy(raml_data)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    details = parse_raml.extract_api_details(data)
+                    timings.append(time.perf_counter() - start)
+            print(f"{scale:>9} {len(details['paths']):>7} {min(timings) * 1000:>9.1f}")
+
+if __name__ == '__main__':
+    main()
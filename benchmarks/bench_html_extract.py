@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of the per-modal extraction step of parse_html_v2.
+
+Both documents are parsed once up front; only the extraction over every
+resource-modal block is timed: the BeautifulSoup find/find_all version
+against the single-pass lxml walk in html_extract. Run from the repository
+root:
+
+    python -m benchmarks.bench_html_extract [html_file] [--repeat N]
+"""
+import argparse
+import time
+from bs4 import BeautifulSoup
+
+import html_extract
+import parse_html_v2
+import records
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def extract_lxml(modals):
+    table = records.RecordTable()
+    return [record for modal in modals for record in html_extract.extract_modal(modal, table)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('html_file', nargs='?', default='kix_api_docs.html')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.html_file, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'lxml')
+    soup_modals = [modal
+                   for panel in soup.find_all('div', class_=html_extract.RESOURCE_PANEL_CLASS)
+                   for modal in panel.find_all('div', class_=html_extract.RESOURCE_MODAL_CLASS)]
+    lxml_modals = html_extract.RESOURCE_MODALS(html_extract.parse_document(args.html_file))
+
+    soup_time, soup_records = best_of(args.repeat, lambda: [
+        record for modal in soup_modals for record in parse_html_v2._extract_modal_soup(modal)])
+    lxml_time, lxml_records = best_of(args.repeat, lambda: extract_lxml(lxml_modals))
+
+    assert records.html_endpoints(soup_records) == lxml_records, 'extractors disagree'
+    print(f"{len(lxml_modals)} resource-modal blocks, {len(lxml_records)} records")
+    print(f"{'extractor':<14} {'best ms':>9} {'us/modal':>9}")
+    for name, seconds in (('bs4 find_all', soup_time), ('lxml 1-pass', lxml_time)):
+        print(f"{name:<14} {seconds * 1000:>9.1f} {seconds / len(lxml_modals) * 1e6:>9.1f}")
+
+if __name__ == '__main__':
+    main()
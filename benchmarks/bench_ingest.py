@@ -0,0 +1,123 @@
+"""
+Peak RSS and time of loading the large inputs, reading them into str versus mapping them.
+
+Every variant runs in a fresh interpreter, which reports its peak RSS
+(VmHWM, as ru_maxrss would include the parent it was forked from); the
+"imports only" row is the baseline of the interpreter with the modules
+loaded. Inputs are the real files and, with --scale N, synthetic ones N times
+their size: raml_api_details.json as indented JSON (as the scripts wrote it
+before) and a raml2html page from benchmarks.synthetic. With --raml-synthetic
+N, a synthetic RAML tree of N resources is resolved with an unbounded and
+with the default, bounded file cache. Run from the repository root:
+
+    python -m benchmarks.bench_ingest [--scale 10] [--raml-synthetic 400]
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks import synthetic
+import artifacts
+import parse_raml
+
+RUNNER = '''
+import json, resource, sys, time
+from pathlib import Path
+import artifacts, instrumentation, parse_html, parse_html_v2, parse_raml, sources
+
+variant, file_path = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if variant == 'json: read + json.loads':
+    with open(file_path, 'r', encoding='utf-8') as f:
+        json.load(f)
+elif variant == 'json: artifacts.read (mapped)':
+    artifacts.read(file_path)
+elif variant == 'html: read str + fromstring':
+    with open(file_path, 'r', encoding='utf-8') as f:
+        parse_html.parse_html_docs(f.read())
+elif variant == 'html: mapped + fromstring':
+    with sources.mapped(file_path) as content:
+        parse_html.parse_html_docs(content)
+elif variant == 'html: etree.parse(path)':
+    parse_html_v2.parse_html(file_path)
+elif variant == 'html: iterparse (--stream)':
+    parse_html_v2.parse_html_streaming(file_path)
+elif variant.startswith('raml: '):
+    parse_raml.file_cache.max_size = int(sys.argv[3])
+    parse_raml.extract_api_details(parse_raml.get_resolved_raml(Path(file_path), jobs=1))
+seconds = time.perf_counter() - start
+try:
+    with open('/proc/self/status') as f:
+        max_rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except OSError:
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": seconds,
+                  "max_rss_kb": max_rss_kb,
+                  "evictions": instrumentation.counters["raml.file_cache.evictions"]}))
+'''
+
+def run(variant, file_path, *extra):
+    result = subprocess.run([sys.executable, '-c', RUNNER, variant, str(file_path), *map(str, extra)],
+                            capture_output=True, text=True, check=True, cwd=os.getcwd())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def report(title, rows):
+    print(f"\n{title}")
+    print(f"{'variant':<36} {'max rss MB':>10} {'seconds':>8}")
+    for variant, result in rows:
+        print(f"{variant:<36} {result['max_rss_kb'] / 1024:>10.1f} {result['seconds']:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--json', default='raml_api_details.json')
+    parser.add_argument('--html', default='kix_api_docs.html')
+    parser.add_argument('--scale', type=int, default=10, help='size of the synthetic inputs, 0 to skip them')
+    parser.add_argument('--raml-synthetic', type=int, default=400, metavar='RESOURCES',
+                        help='resources of the synthetic RAML tree, 0 to skip it')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_files = [Path(args.json)]
+        html_files = [Path(args.html)]
+        if args.scale > 1:
+            data = artifacts.read(args.json)
+            data = {section: {f'{key}{copy_number or ""}': value
+                              for copy_number in range(args.scale) for key, value in entries.items()}
+                    for section, entries in data.items()}
+            json_files.append(Path(tmp) / f'raml_api_details_x{args.scale}.json')
+            artifacts.write(data, json_files[-1], indent=2)
+
+            # make_html_document grows linearly with the endpoints; size it to scale x the real page
+            sample = len(synthetic.make_html_document(500).encode('utf-8'))
+            endpoints = math.ceil(500 * args.scale * os.path.getsize(args.html) / sample)
+            html_files.append(Path(tmp) / f'kix_api_docs_x{args.scale}.html')
+            html_files[-1].write_text(synthetic.make_html_document(endpoints), encoding='utf-8')
+
+        baseline = ('imports only', run('none', args.json))
+        for file_path in json_files:
+            report(f"{file_path.name} ({os.path.getsize(file_path) / 1e6:.1f} MB)",
+                   [baseline] + [(variant, run(variant, file_path))
+                                 for variant in ('json: read + json.loads', 'json: artifacts.read (mapped)')])
+        for file_path in html_files:
+            report(f"{file_path.name} ({os.path.getsize(file_path) / 1e6:.1f} MB)",
+                   [baseline] + [(variant, run(variant, file_path))
+                                 for variant in ('html: read str + fromstring', 'html: mapped + fromstring',
+                                                 'html: etree.parse(path)', 'html: iterparse (--stream)')])
+
+        if args.raml_synthetic:
+            entry = synthetic.write_raml_tree(Path(tmp) / 'raml', resources=args.raml_synthetic)
+            files = sum(1 for path in entry.parent.rglob('*') if path.is_file())
+            rows = [baseline]
+            for max_size in (10 ** 9, parse_raml.FILE_CACHE_SIZE):
+                result = run('raml: resolve', entry, max_size)
+                name = 'unbounded' if max_size == 10 ** 9 else f'{max_size} files'
+                rows.append((f"raml: file cache {name}", result))
+            report(f"synthetic RAML tree, {files} files", rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Dispatch time of the mock server's route trie versus a linear scan of path regexes, and load-driver throughput.
+
+For every scale a synthetic spec (benchmarks.synthetic.make_openapi_spec) is
+compiled, and the documented URLs (path parameters filled in) are looked up:
+
+    linear scan   one compiled regex per path template, tried in order, the
+                  way a list-based router dispatches
+    trie          mock_server.RouteTrie.match
+
+Then mock_server.serve_and_drive sends `--requests` requests over
+`--concurrency` connections to the server for the same spec and reports
+requests/s and the p50/p99 latency. Run from the repository root:
+
+    python -m benchmarks.bench_mock_server [--scales 300 3000 30000] [--requests 20000]
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from benchmarks import synthetic
+import mock_server
+
+def linear_router(openapi_data):
+    routes = []
+    for path, path_item in openapi_data['paths'].items():
+        pattern = re.sub(r'\\\{[^/]+?\\\}', '[^/]+', re.escape(path))
+        routes.append((re.compile(pattern + '$'), set(path_item)))
+
+    def match(method, path):
+        for regex, methods in routes:
+            if method in methods and regex.match(path):
+                return regex
+        return None
+    return match
+
+def lookups_per_second(match, requests, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for method, path in requests:
+            match(method, path)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return len(requests) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[300, 3000, 30000], help='operations per spec')
+    parser.add_argument('--lookups', type=int, default=20000, help='lookups timed per router')
+    parser.add_argument('--requests', type=int, default=20000, help='requests sent by the load driver')
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'operations':>10} {'linear lookups/s':>17} {'trie lookups/s':>15} {'speedup':>8} "
+          f"{'requests/s':>11} {'p50 ms':>7} {'p99 ms':>7}")
+    for scale in args.scales:
+        openapi_data = synthetic.make_openapi_spec(scale, params_per_endpoint=2)
+        targets = mock_server.load_targets(openapi_data)
+        # Random lookups over the whole table, so the position a linear scan stops at averages out
+        requests = [(method.lower(), path) for method, path in random.Random(0).choices(targets, k=args.lookups)]
+
+        routes = mock_server.build_routes(openapi_data)
+        linear_match = linear_router(openapi_data)
+        assert all(linear_match(*request) for request in requests[:50])
+        linear = lookups_per_second(linear_match, requests[:max(500, args.lookups * 300 // scale)])
+        trie = lookups_per_second(routes.match, requests)
+        server = mock_server.MockServer(routes)
+        report = asyncio.run(mock_server.serve_and_drive(server, targets, args.requests, args.concurrency))
+        assert set(report['statuses']) == {200}, report['statuses']
+        print(f"{scale:>10} {linear:>17.0f} {trie:>15.0f} {trie / linear:>7.0f}x "
+              f"{report['requests_per_second']:>11} {report['p50_ms']:>7} {report['p99_ms']:>7}")
+
+if __name__ == '__main__':
+    main()
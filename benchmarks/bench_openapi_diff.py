@@ -0,0 +1,94 @@
+"""
+Time of openapi_diff on two synthetic 50k-endpoint specs that differ by a fraction of their operations.
+
+The old spec is benchmarks.synthetic.make_openapi_spec(--endpoints); the new
+one is a copy with `fraction` of its operations changed in rotation: an
+optional parameter added, a parameter made required, a parameter retyped,
+the example changed, a response added, the operation removed, and a new path
+added. Timed per fraction:
+
+    hash          openapi_diff.hash_tree of both documents
+    walk          openapi_diff.diff_trees on the hashed trees
+    full walk     a structural diff visiting every node, without hashes
+    == pruning    the same diff skipping subtrees that compare equal with ==
+
+Run from the repository root:
+
+    python -m benchmarks.bench_openapi_diff [--endpoints 50000] [--fractions 0.001 0.01 0.1]
+"""
+import argparse
+import copy
+import random
+import time
+
+from benchmarks import synthetic
+import openapi_diff
+
+def mutate(openapi_data, fraction, seed=0):
+    """Returns a copy of the spec with `fraction` of its operations changed."""
+    new = copy.deepcopy(openapi_data)
+    operations = [(path, method) for path, item in new['paths'].items() for method in item]
+    chosen = random.Random(seed).sample(operations, max(1, int(len(operations) * fraction)))
+    for number, (path, method) in enumerate(chosen):
+        operation = new['paths'][path].get(method)
+        if operation is None:
+            continue
+        change = number % 7
+        if change == 0:
+            operation['parameters'].append({'name': 'added', 'in': 'query', 'schema': {'type': 'string'}})
+        elif change == 1:
+            operation['parameters'][0]['required'] = True
+        elif change == 2:
+            operation['parameters'][-1]['schema'] = {'type': 'integer'}
+        elif change == 3:
+            operation['responses']['200']['content']['application/json']['example'] = {'changed': number}
+        elif change == 4:
+            operation['responses']['404'] = {'description': 'Not found.'}
+        elif change == 5:
+            del new['paths'][path][method]
+        else:
+            new['paths'][f"{path}/added{number}"] = {method: operation}
+    return new
+
+def full_walk(old, new, location=(), prune=False):
+    """A structural diff without hashes: returns the locations that differ."""
+    if prune and old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = [location + (key,) for key in old if key not in new]
+        for key, value in new.items():
+            changes += full_walk(old[key], value, location + (key,), prune) if key in old else [location + (key,)]
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        return [change for index, (a, b) in enumerate(zip(old, new))
+                for change in full_walk(a, b, location + (index,), prune)]
+    return [] if old == new else [location]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoints', type=int, default=50000)
+    parser.add_argument('--fractions', type=float, nargs='+', default=[0.001, 0.01, 0.1])
+    args = parser.parse_args()
+
+    old = synthetic.make_openapi_spec(args.endpoints)
+    hash_old, old_tree = timed(openapi_diff.hash_tree, old)
+    print(f"{args.endpoints} endpoints, orjson: {openapi_diff.orjson is not None}")
+    print(f"{'changed':>8} {'hash old':>9} {'hash new':>9} {'walk':>8} {'compared':>9} "
+          f"{'full walk':>10} {'== pruning':>11} {'changes':>8} {'breaking':>9}")
+    for fraction in args.fractions:
+        new = mutate(old, fraction)
+        hash_new, new_tree = timed(openapi_diff.hash_tree, new)
+        walk, (changes, stats) = timed(openapi_diff.diff_trees, old_tree, new_tree)
+        full, _ = timed(full_walk, old, new)
+        pruned, _ = timed(full_walk, old, new, (), True)
+        breaking = sum(change['breaking'] for change in changes)
+        print(f"{fraction:>8.1%} {hash_old:>9.3f} {hash_new:>9.3f} {walk:>8.4f} {stats['compared']:>9} "
+              f"{full:>10.3f} {pruned:>11.4f} {len(changes):>8} {breaking:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Scaling of the sharded, multi-process HTML parsing over the number of workers.
+
+A synthetic raml2html page of --size MB is parsed by parse_html_v2.parse_html
+(and parse_html.parse_html_file with --v1) in one process, building the whole
+DOM, and with the resource panels split over 1..N worker processes. Every
+sharded result is checked against the single-process one. Speedups beyond
+the number of CPUs are not to be expected. Run from the repository root:
+
+    python -m benchmarks.bench_parallel_html [--size 50] [--jobs 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+import parse_html
+import parse_html_v2
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def write_document(file_path, size_mb):
+    # make_html_document grows linearly with the endpoints
+    sample = len(synthetic.make_html_document(500).encode('utf-8'))
+    endpoints = round(500 * size_mb * 1e6 / sample)
+    Path(file_path).write_text(synthetic.make_html_document(endpoints), encoding='utf-8')
+    return endpoints
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=float, default=50, help='size of the synthetic page in MB')
+    parser.add_argument('--jobs', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help='worker counts to measure')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--v1', action='store_true', help='measure parse_html.parse_html_file instead')
+    args = parser.parse_args()
+
+    parse = parse_html.parse_html_file if args.v1 else parse_html_v2.parse_html
+    with tempfile.TemporaryDirectory() as tmp:
+        html_file = os.path.join(tmp, 'kix_api_docs.html')
+        endpoints = write_document(html_file, args.size)
+        print(f"{os.path.getsize(html_file) / 1e6:.1f} MB, {endpoints} endpoints, {os.cpu_count()} CPUs")
+
+        serial, expected = best_of(args.repeat, lambda: parse(html_file))
+        print(f"{'mode':<20} {'seconds':>8} {'speedup':>8} {'identical':>10}")
+        print(f"{'one process':<20} {serial:>8.2f} {1:>8.2f} {'-':>10}")
+        for jobs in args.jobs:
+            seconds, records = best_of(args.repeat, lambda: parse(html_file, jobs=jobs))
+            print(f"{f'{jobs} workers':<20} {seconds:>8.2f} {serial / seconds:>8.2f} "
+                  f"{'yes' if records == expected else 'NO':>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares the tree-building and the streaming mode of parse_html_v2.
+
+Each mode runs in a fresh interpreter so that the peak RSS reported by
+getrusage belongs to that mode alone. Run from the repository root:
+
+    python -m benchmarks.bench_parse_html_v2 [html_file] [--repeat N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+RUNNER = '''
+import json, resource, sys, time
+import parse_html_v2
+baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+records = parse_html_v2.{func}(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "records": len(records),
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "import_rss_kb": baseline_rss,
+}}))
+'''
+
+MODES = {
+    'tree': 'parse_html',
+    'stream': 'parse_html_streaming',
+}
+
+def run_mode(func, html_file):
+    output = subprocess.run([sys.executable, '-c', RUNNER.format(func=func), html_file],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('html_file', nargs='?', default='kix_api_docs.html')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'records':>8} {'best s':>8} {'peak RSS MB':>12} {'parse RSS MB':>13}")
+    for mode, func in MODES.items():
+        runs = [run_mode(func, args.html_file) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r['seconds'])
+        peak = max(r['peak_rss_kb'] for r in runs)
+        parse = max(r['peak_rss_kb'] - r['import_rss_kb'] for r in runs)
+        print(f"{mode:<8} {best['records']:>8} {best['seconds']:>8.3f} {peak / 1024:>12.1f} {parse / 1024:>13.1f}")
+
+if __name__ == '__main__':
+    main()
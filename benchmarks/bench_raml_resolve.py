@@ -0,0 +1,67 @@
+"""
+Cold vs. warm timing of a full KIX.raml resolve with parse_raml.
+
+Every run happens in a fresh interpreter, so only the on-disk parse cache can
+carry work over between runs:
+
+  serial  one process, no parse cache (the previous behaviour)
+  cold    parallel leaf parsing, empty parse cache
+  warm    parse cache written by the cold run
+
+Run from the repository root, against the real tree or a synthetic one:
+
+    python -m benchmarks.bench_raml_resolve [--entry KIX.raml | --synthetic N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks import synthetic
+import parse_raml
+
+RUNNER = '''
+import json, sys, time
+from pathlib import Path
+import instrumentation, parse_raml
+entry, jobs, cache_file = Path(sys.argv[1]), json.loads(sys.argv[2]), json.loads(sys.argv[3])
+start = time.perf_counter()
+parse_raml.get_resolved_raml(entry, jobs=jobs, cache_file=cache_file and Path(cache_file))
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "hits": instrumentation.counters['raml.parse_cache.hits'],
+                  "misses": instrumentation.counters['raml.parse_cache.misses']}))
+'''
+
+def run(entry, jobs, cache_file):
+    output = subprocess.run([sys.executable, '-c', RUNNER, str(entry), json.dumps(jobs),
+                             json.dumps(cache_file and str(cache_file))],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entry', type=Path, default=parse_raml.BASE_DIR / 'KIX.raml')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='generate a tree with N resources instead')
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entry = args.entry
+        if args.synthetic:
+            entry = synthetic.write_raml_tree(Path(tmp) / 'raml', resources=args.synthetic)
+        cache_file = Path(tmp) / 'parse_cache.pickle'
+
+        results = [
+            ('serial', run(entry, 1, None)),
+            ('cold', run(entry, args.jobs, cache_file)),
+            ('warm', run(entry, args.jobs, cache_file)),
+        ]
+
+    print(f"{'run':<8} {'seconds':>8} {'cached':>7} {'parsed':>7}")
+    for name, result in results:
+        print(f"{name:<8} {result['seconds']:>8.3f} {result['hits']:>7} {result['misses']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+End-to-end time of RAML → openapi.yaml, through raml_api_details.json versus converted directly.
+
+For every scale a synthetic RAML tree and a hand-maintained openapi.yaml
+(benchmarks.synthetic.make_openapi_spec) are generated. The two routes are
+timed from a cold parse (no parse cache) to the written openapi.yaml:
+
+    via raml_api_details.json  parse_raml.get_resolved_raml, extract_api_details,
+                               artifacts.write, then update_openapi.main --full
+                               (reads the JSON and the YAML, applies, dumps)
+    raml_to_openapi            parse_raml.get_resolved_raml, raml_to_openapi.convert
+                               with the existing openapi.yaml as overlay, dump
+
+The differences of the two outputs are summarized with raml_to_openapi.spec_diff
+and, when openapi-spec-validator is installed, both are validated. Run from the
+repository root:
+
+    python -m benchmarks.bench_raml_to_openapi [--scales 100 1000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+import artifacts
+import parse_raml
+import raml_to_openapi
+import records
+import update_openapi
+import yaml_backend
+
+try:
+    from openapi_spec_validator import validate
+except ImportError:
+    validate = None
+
+def reset_raml_caches():
+    parse_raml.file_cache.clear()
+    parse_raml.parse_cache.clear()
+    parse_raml.include_keys.clear()
+    parse_raml.content_digests.clear()
+
+def best_of(repeat, func, setup):
+    timings = []
+    for _ in range(repeat):
+        setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def via_details(entry, work_dir, openapi_file):
+    raml_data = parse_raml.get_resolved_raml(entry, jobs=1)
+    api_details = parse_raml.extract_api_details(raml_data)
+    artifacts.write(records.raml_json(api_details), work_dir / update_openapi.RAML_FILE)
+    update_openapi.main(work_dir / update_openapi.RAML_FILE, openapi_file, work_dir / 'state.json', full=True)
+
+def direct(entry, openapi_file):
+    raml_data = parse_raml.get_resolved_raml(entry, jobs=1)
+    overlay = update_openapi.load_yaml_file(openapi_file)
+    update_openapi.write_yaml_file(raml_to_openapi.convert(raml_data, overlay), openapi_file)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000], help='RAML resources per run')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            work_dir = Path(tmp) / str(scale)
+            entry = synthetic.write_raml_tree(work_dir / 'raml', resources=scale, include_depth=3)
+            original = work_dir / 'openapi.orig.yaml'
+            with open(original, 'w', encoding='utf-8') as f:
+                yaml_backend.dump(synthetic.make_openapi_spec(scale * 5), f, **update_openapi.YAML_OPTIONS)
+            old_file, new_file = work_dir / 'openapi.old.yaml', work_dir / 'openapi.new.yaml'
+
+            def restore(target):
+                return lambda: (reset_raml_caches(), shutil.copy(original, target))
+
+            old_seconds = best_of(args.repeat, lambda: via_details(entry, work_dir, old_file), restore(old_file))
+            new_seconds = best_of(args.repeat, lambda: direct(entry, new_file), restore(new_file))
+            reset_raml_caches()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                parse_raml.get_resolved_raml(entry, jobs=1)
+                resolve_seconds = time.perf_counter() - start
+
+            print(f"\n{scale} resources, {scale * 5} operations (resolving alone: {resolve_seconds:.3f}s)")
+            print(f"{'route':<28} {'seconds':>8} {'openapi.yaml KB':>16}")
+            print(f"{'via raml_api_details.json':<28} {old_seconds:>8.3f} {old_file.stat().st_size / 1024:>16.0f}")
+            print(f"{'raml_to_openapi':<28} {new_seconds:>8.3f} {new_file.stat().st_size / 1024:>16.0f}")
+            print(f"speedup {old_seconds / new_seconds:.2f}x, "
+                  f"{(old_seconds - resolve_seconds) / max(new_seconds - resolve_seconds, 1e-9):.2f}x after resolving")
+
+            old_spec, new_spec = update_openapi.load_yaml_file(old_file), update_openapi.load_yaml_file(new_file)
+            print("\nraml_to_openapi output against the output via raml_api_details.json:")
+            raml_to_openapi.print_diff(raml_to_openapi.spec_diff(old_spec, new_spec), limit=2)
+            if validate is not None:
+                for name, spec in (('via raml_api_details.json', old_spec), ('raml_to_openapi', new_spec)):
+                    try:
+                        validate(spec)
+                        print(f"{name}: valid OpenAPI 3.0")
+                    except Exception as e:
+                        print(f"{name}: INVALID, {str(e).splitlines()[0]}")
+
+if __name__ == '__main__':
+    main()
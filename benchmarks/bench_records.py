@@ -0,0 +1,101 @@
+"""
+Object count and memory of the endpoint records (records.py) against dicts.
+
+Loads the HTML endpoint records (parse_html_v2 of the page) and the paths of
+raml_api_details.json as the dicts JSON gives, and as records.Endpoint built
+through a RecordTable, and reports the distinct objects reachable from each
+and the memory they hold (tracemalloc, after the temporary dicts are freed).
+The corpus is the current documentation and a --scale times larger one,
+whose copies differ in a path prefix. Run from the repository root:
+
+    python -m benchmarks.bench_records [--html kix_api_docs.html] [--scale 100]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import parse_html_v2
+import records
+import update_openapi
+
+def count_objects(data):
+    """Returns the number of distinct objects reachable from data through dicts, lists and tuples."""
+    seen = set()
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return len(seen)
+
+def retained(build):
+    """Runs build() and returns its result, the bytes it still holds and the seconds it took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, seconds
+
+def scaled(text, scale, prefix):
+    """Returns JSON text of `scale` copies of a JSON document, through prefix(copy, document)."""
+    return json.dumps([prefix(copy, json.loads(text)) for copy in range(scale)])
+
+def report(label, text, convert):
+    dicts, dict_bytes, _ = retained(lambda: json.loads(text))
+    dict_objects = count_objects(dicts)
+    del dicts
+    endpoints, record_bytes, seconds = retained(lambda: convert(json.loads(text)))
+    record_objects = count_objects(endpoints)
+    print(f"{label:<24} {dict_objects:>10} {record_objects:>10} {dict_bytes / 2**20:>9.1f} "
+          f"{record_bytes / 2**20:>9.1f} {dict_bytes / record_bytes:>7.1f}x {seconds * 1000:>9.0f}")
+
+def html_copies(copy, data):
+    for record in data:
+        record['path'] = f'/copy{copy}{record["path"]}'
+    return data
+
+def raml_copies(copy, paths):
+    return {f'/copy{copy}{path}': methods for path, methods in paths.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--html', default='kix_api_docs.html')
+    parser.add_argument('--raml', default=update_openapi.RAML_FILE)
+    parser.add_argument('--scale', type=int, default=100)
+    args = parser.parse_args()
+
+    html_text = json.dumps(list(map(records.html_json, parse_html_v2.parse_html(args.html))))
+    raml_text = json.dumps(update_openapi.load_json_file(args.raml)['paths'])
+    corpora = [
+        ('html', html_text, records.html_endpoints),
+        ('raml paths', raml_text, lambda paths: records.raml_details({'paths': paths})['paths']),
+    ]
+
+    print(f"{'corpus':<24} {'dict objs':>10} {'rec objs':>10} {'dict MB':>9} {'rec MB':>9} {'saving':>8} "
+          f"{'build ms':>9}")
+    for name, text, convert in corpora:
+        report(name, text, convert)
+    html_scaled = scaled(html_text, args.scale, html_copies)
+    report(f'html x{args.scale}', html_scaled,
+           lambda copies: records.html_endpoints([record for copy in copies for record in copy]))
+    raml_scaled = scaled(raml_text, args.scale, raml_copies)
+    report(f'raml paths x{args.scale}', raml_scaled,
+           lambda copies: records.raml_details({'paths': {path: methods for copy in copies
+                                                          for path, methods in copy.items()}})['paths'])
+    print("Objects are the distinct dicts, lists, tuples, strings and scalars reachable from the data; MB is what "
+          "tracemalloc still traces after the build; build ms is the time to load the JSON and build the records.")
+
+if __name__ == '__main__':
+    main()
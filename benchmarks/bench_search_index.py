@@ -0,0 +1,62 @@
+"""
+Build time, size and query latency of the search index (search_index.py).
+
+Indexes openapi.yaml and synthetic specs (benchmarks.synthetic.make_openapi_spec)
+into a temporary directory and reports the build time, the number of tokens
+and shards, the total and largest shard size, the size of the largest
+endpoint file, and the latency of a set of queries through
+search_index.SearchIndex: cold (a new SearchIndex, so the manifest, the
+shards and the endpoint files of the results are read) and warm (all
+already loaded). Run from the repository root:
+
+    python -m benchmarks.bench_search_index [--scales 5000 50000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import synthetic
+import search_index
+import update_openapi
+
+QUERIES = ['ticket', 'ticket article', 'tick', 'limit', 'CommonName', 'object00042s', 'param3 object',
+           'search', 'attachments zip', 'nothing matches this']
+
+def milliseconds(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+def run(label, openapi_data, work_dir):
+    build, manifest = milliseconds(lambda: search_index.write_index(openapi_data, work_dir))
+    sizes = {name: os.path.getsize(os.path.join(work_dir, name)) for name in os.listdir(work_dir)}
+    shard_sizes = [sizes[shard['file']] for shard in manifest['shards'].values()]
+    cold = [milliseconds(lambda: search_index.SearchIndex(work_dir).search(query))[0] for query in QUERIES]
+    index = search_index.SearchIndex(work_dir)
+    for query in QUERIES:
+        index.search(query)
+    warm = [min(milliseconds(lambda: index.search(query))[0] for _ in range(5)) for query in QUERIES]
+    print(f"{label:<16} {manifest['endpoints']:>9} {build:>9.0f} {manifest['tokens']:>7} {len(shard_sizes):>6} "
+          f"{sum(sizes.values()) / 1024:>9.0f} {max(sizes[entry['file']] for entry in manifest['endpoint_files']) / 1024:>9.1f} "
+          f"{max(shard_sizes) / 1024:>9.1f} {statistics.median(cold):>8.2f} {max(cold):>8.2f} "
+          f"{statistics.median(warm):>8.3f} {max(warm):>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spec', default=update_openapi.OPENAPI_FILE)
+    parser.add_argument('--scales', type=int, nargs='+', default=[5000, 50000], help='synthetic endpoints')
+    args = parser.parse_args()
+
+    print(f"{'spec':<16} {'endpoints':>9} {'build ms':>9} {'tokens':>7} {'shards':>6} {'total KB':>9} "
+          f"{'table KB':>9} {'max shard':>9} {'cold p50':>8} {'cold max':>8} {'warm p50':>8} {'warm max':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args.spec, update_openapi.load_yaml_file(args.spec), os.path.join(tmp, 'spec'))
+        for scale in args.scales:
+            run(f'synthetic {scale}', synthetic.make_openapi_spec(scale), os.path.join(tmp, str(scale)))
+    print("Query latencies in ms; cold includes reading the manifest, the shards and the endpoint files; "
+          "table KB is the largest endpoint file.")
+
+if __name__ == '__main__':
+    main()
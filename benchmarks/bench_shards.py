@@ -0,0 +1,99 @@
+"""
+Size and parse time of the monolithic openapi.yaml against the per-resource shards.
+
+The monolithic spec is what the viewer downloaded and parsed before anything
+showed up; with the shards it needs the index, the components and one shard.
+Sizes are raw and gzipped (as GitHub Pages serves them), parse times are for
+libyaml and json in Python, a stand-in for the browser. --scale N copies every
+resource N times (/tickets -> /tickets2, ...) to see how both grow. Run from
+the repository root:
+
+    python -m benchmarks.bench_shards [--openapi openapi.yaml] [--scale 10]
+"""
+import argparse
+import copy
+import gzip
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import update_openapi
+import yaml_backend
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def scaled(spec, scale):
+    spec = copy.deepcopy(spec)
+    paths = spec['paths']
+    original = list(paths.items())
+    for copy_number in range(2, scale + 1):
+        for path, methods in original:
+            first, _, rest = path.strip('/').partition('/')
+            paths[f"/{first}{copy_number}/{rest}".rstrip('/')] = copy.deepcopy(methods)
+    return spec
+
+def measure(name, contents, parse, repeat):
+    """Returns a row of total raw and gzipped bytes and the time to parse all of `contents`."""
+    seconds = best_of(repeat, lambda: [parse(content) for content in contents])
+    return (name, sum(len(content) for content in contents),
+            sum(len(gzip.compress(content)) for content in contents), seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--openapi', default=update_openapi.OPENAPI_FILE)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--validate', action='store_true',
+                        help='check that every shard with the components is a valid document (openapi-spec-validator)')
+    args = parser.parse_args()
+
+    spec = scaled(update_openapi.load_yaml_file(args.openapi), args.scale)
+    if args.scale == 1:
+        monolithic = Path(args.openapi).read_bytes()
+    else:
+        monolithic = yaml_backend.dump(spec, **update_openapi.YAML_OPTIONS).encode('utf-8')
+    with tempfile.TemporaryDirectory() as tmp:
+        index = update_openapi.write_shards(spec, tmp)
+        files = {path.name: path.read_bytes() for path in Path(tmp).iterdir()}
+
+    shards = sorted(index['x-shards'], key=lambda shard: len(files[shard['file']]))
+    median = shards[len(shards) // 2]
+    first_view = [files[update_openapi.SHARD_INDEX], files[update_openapi.SHARD_COMPONENTS]]
+    rows = [
+        measure('openapi.yaml', [monolithic], yaml_backend.safe_load, args.repeat),
+        measure('openapi.json', [update_openapi.dump_minified(spec)], json.loads, args.repeat),
+        measure('index', [files[update_openapi.SHARD_INDEX]], json.loads, args.repeat),
+        measure(f"first view, {median['name']}", first_view + [files[median['file']]], json.loads, args.repeat),
+        measure(f"first view, {shards[-1]['name']}", first_view + [files[shards[-1]['file']]], json.loads,
+                args.repeat),
+        measure(f"all {len(files)} files", list(files.values()), json.loads, args.repeat),
+    ]
+
+    print(f"{len(spec['paths'])} paths in {len(shards)} shards, "
+          f"median shard {len(files[median['file']])} bytes")
+    print(f"{'download':<32} {'bytes':>10} {'gzip':>9} {'parse ms':>9}")
+    for name, size, gzipped, seconds in rows:
+        print(f"{name:<32} {size:>10} {gzipped:>9} {seconds * 1000:>9.1f}")
+
+    if args.validate:
+        from openapi_spec_validator import validate
+        components = json.loads(files[update_openapi.SHARD_COMPONENTS])['components']
+        base = {key: value for key, value in index.items() if not key.startswith('x-')}
+        sizes = []
+        for shard in shards:
+            paths = json.loads(files[shard['file']])['paths']
+            validate(dict(base, paths=paths, components=components))
+            sizes.append(len(files[shard['file']]))
+        print(f"All {len(shards)} shard documents are valid OpenAPI; "
+              f"shard sizes {min(sizes)}-{max(sizes)} bytes, mean {statistics.mean(sizes):.0f}.")
+
+if __name__ == '__main__':
+    main()
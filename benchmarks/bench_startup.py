@@ -0,0 +1,87 @@
+"""
+Cold-start latency and import time of the scripts and of kixdoc.py.
+
+For each subcommand of kixdoc.py, measures in fresh interpreters the median
+wall time of `--help` through the script and through kixdoc.py (startup and
+imports only), and the `-X importtime` cumulative time of the module and of
+its heavy imports. Then runs parse-html and compare on a small synthetic page
+as two script processes and as one kixdoc.py process. Run from the
+repository root:
+
+    python -m benchmarks.bench_startup [--repeat 15] [--endpoints 50]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+import update_openapi
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS = {
+    'parse-raml': 'parse_raml',
+    'parse-html': 'parse_html_v2',
+    'update': 'update_openapi',
+    'compare': 'compare_api',
+}
+HEAVY_IMPORTS = ('yaml', 'lxml.etree', 'bs4', 'orjson', 'concurrent.futures.process', 'cProfile')
+
+def wall_ms(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *command], cwd=ROOT, stdout=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def import_times(module):
+    """Returns {imported module: cumulative microseconds} of `python -X importtime -c 'import module'`."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in output.splitlines()[1:]:
+        _, cumulative, name = line.split('|')
+        times.setdefault(name.strip(), int(cumulative))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--endpoints', type=int, default=50, help='endpoints of the synthetic page')
+    args = parser.parse_args()
+
+    print(f"{'python -c pass':<30} {wall_ms(['-c', 'pass'], args.repeat):>8.1f} ms")
+    print(f"{'kixdoc.py --help':<30} {wall_ms(['kixdoc.py', '--help'], args.repeat):>8.1f} ms")
+    print()
+    print(f"{'subcommand':<12} {'script ms':>9} {'kixdoc ms':>9} {'import ms':>9}  "
+          + ' '.join(f'{name.split(".")[-1]:>8}' for name in HEAVY_IMPORTS))
+    for command, module in SCRIPTS.items():
+        script = wall_ms([f'{module}.py', '--help'], args.repeat)
+        kixdoc = wall_ms(['kixdoc.py', command, '--help'], args.repeat)
+        times = min((import_times(module) for _ in range(3)), key=lambda t: t[module])
+        print(f"{command:<12} {script:>9.1f} {kixdoc:>9.1f} {times[module] / 1000:>9.1f}  "
+              + ' '.join(f'{times[name] / 1000:>8.1f}' if name in times else f'{"-":>8}'
+                         for name in HEAVY_IMPORTS))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        html, records, spec, report = (os.path.join(tmp, name) for name in
+                                       ('kix_api_docs.html', 'parsed_api_v2.json', 'openapi.yaml', 'report.json'))
+        Path(html).write_text(synthetic.make_html_document(args.endpoints), encoding='utf-8')
+        update_openapi.write_yaml_file(synthetic.make_openapi_spec(args.endpoints), spec)
+        parse = ['--input', html, '--output', records]
+        compare = ['--html', records, '--spec', spec, '--output', report]
+        separate = (wall_ms(['parse_html_v2.py', *parse], args.repeat)
+                    + wall_ms(['compare_api.py', *compare], args.repeat))
+        combined = wall_ms(['kixdoc.py', 'parse-html', *parse, '+', 'compare', *compare], args.repeat)
+    print()
+    print(f"parse-html + compare of {args.endpoints} endpoints: {separate:.1f} ms as two scripts, "
+          f"{combined:.1f} ms as one kixdoc.py process")
+    print("Wall times are medians of --repeat runs; import times in ms are the best of 3 runs of -X importtime.")
+
+if __name__ == '__main__':
+    main()
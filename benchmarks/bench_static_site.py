@@ -0,0 +1,112 @@
+"""
+First-render cost of the static pages (static_site.py) against the Swagger UI viewer.
+
+Compares what the browser must fetch before a resource shows up. index.html
+needs its scripts, openapi/index.json, then the resource's shard and the
+components, and then runs Swagger UI; a static page needs itself and
+site.css, as site.js is deferred and the examples and schemas are fetched
+when a block is opened. There is no browser here, so the time to first
+render is a model: the round trips on the critical path times --rtt-ms plus
+the gzipped bytes at --mbps (the Swagger UI bundle is only counted when
+--swagger-dir holds swagger-ui.css, swagger-ui-bundle.js and
+swagger-ui-standalone-preset.js, and its execution never is). Also times a
+full build, a rebuild with nothing changed and one with one resource
+changed. --scale N copies every resource N times. Run from the repository
+root:
+
+    python -m benchmarks.bench_static_site [--scale 10] [--jobs 4] [--swagger-dir DIR]
+"""
+import argparse
+import copy
+import gzip
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_shards import scaled
+import instrumentation
+import static_site
+import update_openapi
+
+ROOT = Path(__file__).resolve().parent.parent
+SWAGGER_FILES = ('swagger-ui.css', 'swagger-ui-bundle.js', 'swagger-ui-standalone-preset.js')
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def build(spec, site_dir, jobs):
+    instrumentation.reset()
+    (_, rendered), seconds = timed(lambda: static_site.build_site(spec, site_dir, jobs))
+    return len(rendered), seconds
+
+def row(name, contents, round_trips, args, note=''):
+    size = sum(len(content) for content in contents)
+    gzipped = sum(len(gzip.compress(content)) for content in contents)
+    model_ms = round_trips * args.rtt_ms + gzipped * 8 / (args.mbps * 1000)
+    print(f"{name:<34} {len(contents):>5} {round_trips:>6} {size:>10} {gzipped:>9} {model_ms:>9.0f}  {note}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--openapi', default=update_openapi.OPENAPI_FILE)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--rtt-ms', type=float, default=100.0, help='round trip time of the model')
+    parser.add_argument('--mbps', type=float, default=10.0, help='bandwidth of the model')
+    parser.add_argument('--swagger-dir', help='directory with the Swagger UI files index.html loads from the CDN')
+    args = parser.parse_args()
+
+    spec = scaled(update_openapi.load_yaml_file(args.openapi), args.scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir, site_dir, serial_dir = (os.path.join(tmp, name) for name in ('openapi', 'site', 'serial'))
+        os.makedirs(shard_dir)
+        index = update_openapi.write_shards(spec, shard_dir)
+        shards = {path.name: path.read_bytes() for path in Path(shard_dir).iterdir()}
+
+        full = build(spec, serial_dir, 1)
+        parallel = build(spec, site_dir, args.jobs)
+        unchanged = build(spec, site_dir, args.jobs)
+        changed_spec = copy.deepcopy(spec)
+        path = next(iter(changed_spec['paths']))
+        method = next(iter(changed_spec['paths'][path].values()))
+        method['description'] = f"{method.get('description', '')} Changed."
+        one_changed = build(changed_spec, site_dir, args.jobs)
+        site = {str(file_path.relative_to(site_dir)): file_path.read_bytes()
+                for file_path in Path(site_dir).rglob('*') if file_path.is_file()}
+        manifest = static_site.load_manifest(site_dir)
+
+    viewer = [(ROOT / 'index.html').read_bytes(), (ROOT / 'search.js').read_bytes()]
+    if args.swagger_dir:
+        viewer += [(Path(args.swagger_dir) / name).read_bytes() for name in SWAGGER_FILES]
+        swagger_note = 'Swagger UI bundle included'
+    else:
+        swagger_note = 'Swagger UI bundle not measured (--swagger-dir)'
+    css = site[manifest['assets']['site.css']]
+    script = site[manifest['assets']['site.js']]
+
+    resources = sorted(index['x-shards'], key=lambda shard: len(shards[shard['file']]))
+    print(f"{len(spec['paths'])} paths in {len(resources)} resources; model: {args.rtt_ms:.0f} ms round trips, "
+          f"{args.mbps:.0f} Mbit/s")
+    print(f"{'first render':<34} {'files':>5} {'trips':>6} {'bytes':>10} {'gzip':>9} {'model ms':>9}")
+    for shard in (resources[len(resources) // 2], resources[-1]):
+        name = shard['name']
+        page = f'{name}.html'
+        data_files = [file_name for file_name in manifest['pages'][name]['files'] if file_name != page]
+        print(f"{name} ({len(shards[shard['file']])} bytes of shard)")
+        row('  Swagger UI', viewer + [shards[update_openapi.SHARD_INDEX], shards[shard['file']],
+                                      shards[update_openapi.SHARD_COMPONENTS]], 4, args, swagger_note)
+        row('  static page', [site[page], css], 2, args)
+        row('  static page, a block opened', [site[page], css, script] + [site[f] for f in data_files], 3, args,
+            'site.js and the data file')
+    print()
+    print(f"{'build':<34} {'pages':>5} {'seconds':>9}")
+    for label, (rendered, seconds) in [('full, 1 process', full), (f'full, {args.jobs} processes', parallel),
+                                       ('nothing changed', unchanged), ('one resource changed', one_changed)]:
+        print(f"{label:<34} {rendered:>5} {seconds:>9.3f}")
+    print("trips are the round trips before the resource shows: index.html, its scripts, openapi/index.json, then "
+          "the shard and components; the static page and site.css.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Throughput of validate_examples: examples per second, per-example schema compilation versus cached validators.
+
+The examples are those of openapi.yaml and the HTML records parsed from
+kix_api_docs.html, and those of a synthetic spec repeating every path of
+openapi.yaml `--factor` times (the HTML records repeated alike). Modes:
+
+    compile per example   jsonschema.validate for every example, which checks
+                          and compiles the schema each time
+    cached, inline        validate_examples.validate with jobs=1
+    cached, N workers     validate_examples.validate with jobs=N
+
+Run from the repository root:
+
+    python -m benchmarks.bench_validate_examples [--factor 10] [--jobs 2 4] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import parse_html_v2
+import update_openapi
+import validate_examples
+
+def scaled(openapi_data, html_data, factor):
+    """Returns copies of the spec and records with every path repeated `factor` times."""
+    paths, records = {}, []
+    for copy in range(factor):
+        suffix = f'/copy{copy}' if copy else ''
+        paths.update({path + suffix: item for path, item in openapi_data['paths'].items()})
+        records.extend(dict(record, path=record['path'] + suffix) for record in html_data)
+    return dict(openapi_data, paths=paths), records
+
+def compile_per_example(openapi_data, html_data):
+    checks = validate_examples.collect_checks(openapi_data, html_data)
+    validate_examples.init_validators(openapi_data.get('components'))
+    components = validate_examples._components
+    mismatches = 0
+    for *_, schema, example in checks:
+        try:
+            validate_examples.jsonschema.validate(
+                example, {'allOf': [validate_examples.to_json_schema(schema)], 'components': components},
+                cls=validate_examples.jsonschema.Draft4Validator)
+        except Exception:
+            mismatches += 1
+    return len(checks), mismatches
+
+def cached(openapi_data, html_data, jobs):
+    report = validate_examples.validate(openapi_data, html_data, jobs)
+    return report['checked'], len(report['mismatches'])
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spec', default=validate_examples.OPENAPI_FILE)
+    parser.add_argument('--html', default='kix_api_docs.html')
+    parser.add_argument('--factor', type=int, default=10, help='size of the synthetic spec relative to --spec')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[os.cpu_count() or 1], help='worker pool sizes')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    if validate_examples.jsonschema is None:
+        parser.exit(1, "jsonschema is not installed.\n")
+
+    openapi_data = update_openapi.load_yaml_file(args.spec)
+    html_data = parse_html_v2.parse_html(args.html)
+    print(f"{os.cpu_count()} CPUs, jsonschema {validate_examples.importlib.metadata.version('jsonschema')}")
+    for label, (spec, records) in (('current spec', (openapi_data, html_data)),
+                                   (f'{args.factor}x spec', scaled(openapi_data, html_data, args.factor))):
+        modes = [('compile per example', lambda: compile_per_example(spec, records)),
+                 ('cached, inline', lambda: cached(spec, records, 1))]
+        modes += [(f'cached, {jobs} workers', lambda jobs=jobs: cached(spec, records, jobs))
+                  for jobs in args.jobs if jobs > 1]
+        print(f"\n{label}")
+        print(f"{'mode':<22} {'seconds':>8} {'examples':>9} {'mismatches':>11} {'examples/s':>11}")
+        for name, func in modes:
+            seconds, (checked, mismatches) = best_of(args.repeat, func)
+            print(f"{name:<22} {seconds:>8.3f} {checked:>9} {mismatches:>11} {checked / seconds:>11.0f}")
+
+if __name__ == '__main__':
+    main()
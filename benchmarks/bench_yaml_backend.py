@@ -0,0 +1,51 @@
+"""
+Load and dump timings of openapi.yaml with the pure-Python and libyaml backends.
+
+The dump uses the same options as update_openapi.write_yaml_file and checks
+that both backends write byte-identical output. Run from the repository root:
+
+    python -m benchmarks.bench_yaml_backend [yaml_file] [--repeat N]
+"""
+import argparse
+import time
+
+import yaml_backend
+
+DUMP_OPTIONS = {'default_flow_style': False, 'sort_keys': False, 'indent': 2}
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('yaml_file', nargs='?', default='openapi.yaml')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.yaml_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    backends = [('pure', yaml_backend.PureSafeLoader, yaml_backend.PureSafeDumper)]
+    if yaml_backend.HAS_LIBYAML:
+        backends.append(('libyaml', yaml_backend.SafeLoader, yaml_backend.SafeDumper))
+    else:
+        print("PyYAML is not built with libyaml; only the pure-Python backend is available.")
+
+    outputs = {}
+    print(f"{'backend':<8} {'load s':>8} {'dump s':>8}")
+    for name, loader, dumper in backends:
+        load_time, data = best_of(args.repeat, lambda: yaml_backend.safe_load(text, Loader=loader))
+        dump_time, outputs[name] = best_of(args.repeat, lambda: yaml_backend.dump(data, Dumper=dumper, **DUMP_OPTIONS))
+        print(f"{name:<8} {load_time:>8.3f} {dump_time:>8.3f}")
+
+    if len(set(outputs.values())) > 1:
+        raise SystemExit("Backends produced different YAML output.")
+    print("Dumped output is byte-identical across backends.")
+
+if __name__ == '__main__':
+    main()
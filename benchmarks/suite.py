@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark suite of the pipeline scripts on synthetic inputs, with a regression check.
+
+For every scale (number of endpoints) a RAML tree, a raml2html page and an
+OpenAPI document are generated, and the following are timed (best of
+--repeat runs, inputs restored between runs):
+
+    raml_resolve         parse_raml.get_resolved_raml, cold
+    extract_api_details  parse_raml.extract_api_details
+    parse_html           parse_html_v2.parse_html
+    update_openapi       update_openapi.main with a full update
+    raml_to_openapi      raml_to_openapi.convert, the OpenAPI document as overlay
+    compare_api          compare_api.compare_api_specs
+
+The results are compared against a JSON baseline; a run fails when a
+benchmark is more than --tolerance slower than its baseline. Run from the
+repository root:
+
+    python -m benchmarks.suite [--scales 170 1000 5000] [--update-baseline]
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+import compare_api
+import parse_html_v2
+import parse_raml
+import raml_to_openapi
+import records
+import update_openapi
+import yaml_backend
+
+BASELINE_FILE = Path(__file__).with_name('baseline.json')
+# Differences below this many seconds are noise, whatever the ratio.
+NOISE_SECONDS = 0.05
+
+def reset_raml_caches():
+    parse_raml.file_cache.clear()
+    parse_raml.parse_cache.clear()
+    parse_raml.include_keys.clear()
+    parse_raml.content_digests.clear()
+
+def best_of(repeat, func, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def write_inputs(work_dir, endpoints):
+    """Writes the synthetic inputs of one scale and returns the RAML entry file."""
+    entry = synthetic.write_raml_tree(work_dir / 'raml', resources=math.ceil(endpoints / 5), include_depth=3)
+    (work_dir / 'kix_api_docs.html').write_text(synthetic.make_html_document(endpoints), encoding='utf-8')
+    with open(work_dir / 'openapi.yaml', 'w', encoding='utf-8') as f:
+        yaml_backend.dump(synthetic.make_openapi_spec(endpoints), f, **update_openapi.YAML_OPTIONS)
+    shutil.copy(work_dir / 'openapi.yaml', work_dir / 'openapi.orig.yaml')
+    return entry
+
+def run_scale(work_dir, endpoints, repeat):
+    entry = write_inputs(work_dir, endpoints)
+    results = {}
+
+    results['raml_resolve'], raml_data = best_of(repeat, lambda: parse_raml.get_resolved_raml(entry),
+                                                 setup=reset_raml_caches)
+    copies = []
+    results['extract_api_details'], api_details = best_of(
+        repeat, lambda: parse_raml.extract_api_details(copies.pop()),
+        setup=lambda: copies.append(copy.deepcopy(raml_data)))
+    with open(work_dir / update_openapi.RAML_FILE, 'w') as f:
+        json.dump(records.raml_json(api_details), f, indent=2)
+
+    html_file = str(work_dir / 'kix_api_docs.html')
+    results['parse_html'], endpoints = best_of(repeat, lambda: parse_html_v2.parse_html(html_file))
+    with open(work_dir / 'parsed_api.json', 'w') as f:
+        json.dump(list(map(records.html_json, endpoints)), f, indent=4)
+
+    openapi_file = work_dir / update_openapi.OPENAPI_FILE
+    results['update_openapi'], _ = best_of(
+        repeat,
+        lambda: update_openapi.main(work_dir / update_openapi.RAML_FILE, openapi_file,
+                                    work_dir / update_openapi.STATE_FILE, full=True),
+        setup=lambda: shutil.copy(work_dir / 'openapi.orig.yaml', openapi_file))
+
+    overlay = update_openapi.load_yaml_file(work_dir / 'openapi.orig.yaml')
+    results['raml_to_openapi'], _ = best_of(repeat, lambda: raml_to_openapi.convert(raml_data, overlay))
+
+    # Discrepancies are expected, the inputs drift on purpose
+    results['compare_api'], _ = best_of(repeat, lambda: compare_api.compare_api_specs(
+        work_dir / compare_api.HTML_FILE, work_dir / compare_api.OPENAPI_FILE, work_dir / compare_api.OUTPUT_FILE))
+    return results
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'libyaml': yaml_backend.HAS_LIBYAML,
+        'lxml': parse_html_v2.etree is not None,
+    }
+
+def check(results, baseline, tolerance):
+    """Prints the results next to the baseline and returns the regressions."""
+    regressions = []
+    print(f"{'endpoints':>9} {'benchmark':<20} {'seconds':>9} {'baseline':>9} {'ratio':>6}")
+    for scale, timings in results.items():
+        for name, seconds in timings.items():
+            reference = baseline.get(scale, {}).get(name)
+            if reference is None:
+                print(f"{scale:>9} {name:<20} {seconds:>9.3f} {'-':>9} {'-':>6}")
+                continue
+            ratio = seconds / reference if reference else float('inf')
+            regressed = seconds > reference * (1 + tolerance) and seconds - reference > NOISE_SECONDS
+            print(f"{scale:>9} {name:<20} {seconds:>9.3f} {reference:>9.3f} {ratio:>6.2f}"
+                  + ('  REGRESSION' if regressed else ''))
+            if regressed:
+                regressions.append((scale, name, seconds, reference))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[170, 1000, 5000], help='endpoints per run')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, as a fraction')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--output', type=Path, help='also write the results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            work_dir = Path(tmp) / str(scale)
+            work_dir.mkdir()
+            results[str(scale)] = run_scale(work_dir, scale, args.repeat)
+            reset_raml_caches()
+            print(f"{scale} endpoints done", file=sys.stderr)
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {'environment': {}, 'scales': {}}
+    if baseline['environment'] and baseline['environment'] != environment():
+        print(f"Note: the baseline was recorded on {baseline['environment']}, this is {environment()}.")
+    regressions = check(results, baseline['scales'], args.tolerance)
+
+    report = {'environment': environment(), 'scales': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        baseline['environment'] = environment()
+        baseline['scales'].update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}.")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Generators for synthetic KIX-like API documentation inputs.
+
+The generated trees mimic the layout of the kix-backend doc/API/V1 directory:
+an entry KIX.raml that pulls traits, resourceTypes, types and resources in via
+!include, with JSON schemas and examples as include leaves.
+"""
+import json
+import re
+from html import escape
+from pathlib import Path
+
+TRAITS = {
+    'filterable': {'filter': ('The filter to be used.', 'string')},
+    'searchable': {'search': ('The search to be used.', 'string')},
+    'pageable': {
+        'limit': ('The limit to be used to limit the number of items in the response.', 'number'),
+        'offset': ('The offset where the item list in the response will start.', 'string'),
+    },
+    'sortable': {'sort': ('The sort definition to be used to sort the items in the response.', 'string')},
+    'includable': {'include': ('The list of additional properties to be included.', 'string')},
+}
+
+COLLECTION_TYPE = '''\
+get:
+  is: [filterable, searchable, pageable, sortable, includable]
+  responses:
+    200:
+      description: The request has been finished.
+      body:
+        application/json:
+          type: <<typeName>>CollectionResponse
+    400:
+      description: Please check your request.
+      body:
+        application/json:
+          type: Error
+post:
+  responses:
+    201:
+      description: The <<typeName>> has been created successfully.
+      body:
+        application/json:
+          type: <<typeName>>PostResponse
+'''
+
+ITEM_TYPE = '''\
+get:
+  is: [includable]
+  responses:
+    200:
+      description: The request has been finished.
+      body:
+        application/json:
+          type: <<typeName>>Response
+    404:
+      description: The requested item could not be found.
+      body:
+        application/json:
+          type: Error
+patch:
+  responses:
+    200:
+      description: The <<typeName>> has been updated successfully.
+      body:
+        application/json:
+          type: <<typeName>>PatchResponse
+delete:
+  responses:
+    204:
+      description: The <<typeName>> has been deleted.
+'''
+
+def resource_name(index):
+    return f"Object{index:05d}"
+
+def _write(path: Path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+
+def _example(name, index, properties):
+    return {name: {prop: f"{prop} value {index}" for prop in properties}}
+
+def write_raml_tree(target_dir, resources=100, include_depth=3, properties=8):
+    """
+    Writes a synthetic RAML tree with `resources` collection resources below
+    target_dir and returns the path of its KIX.raml entry file.
+
+    Every resource gets a collection and an item resourceType, the five shared
+    traits, four types with JSON schemas and examples, and a description reached
+    through a chain of `include_depth` nested !include files.
+    """
+    target_dir = Path(target_dir)
+    lines = ['#%RAML 1.0', 'title: KIX REST API', 'version: v1', 'mediaType: application/json', '', 'traits:']
+    for trait, params in TRAITS.items():
+        lines.append(f"  {trait}: !include traits/{trait}.raml")
+        trait_lines = ['queryParameters:']
+        for name, (description, param_type) in params.items():
+            trait_lines += [f"  {name}:", f"    description: {description}",
+                            f"    type: {param_type}", "    required: false"]
+        _write(target_dir / 'traits' / f"{trait}.raml", '\n'.join(trait_lines) + '\n')
+
+    lines += ['', 'resourceTypes:',
+              '  collection: !include resourceTypes/collection.raml',
+              '  item: !include resourceTypes/item.raml', '', 'types:',
+              '  Error: !include types/Error.raml']
+    _write(target_dir / 'resourceTypes' / 'collection.raml', COLLECTION_TYPE)
+    _write(target_dir / 'resourceTypes' / 'item.raml', ITEM_TYPE)
+    _write(target_dir / 'types' / 'Error.raml',
+           'type: object\nproperties:\n  Code: string\n  Message: string\n'
+           'example: !include ../examples/Error.json\n')
+    _write(target_dir / 'examples' / 'Error.json', json.dumps({'Code': 'Object.NotFound', 'Message': 'Not found'}))
+
+    prop_names = [f"Attribute{i}" for i in range(properties)]
+    resource_lines = []
+    for index in range(resources):
+        name = resource_name(index)
+        slug = name.lower()
+        for suffix in ('Response', 'CollectionResponse', 'PostResponse', 'PatchResponse'):
+            type_name = f"{name}{suffix}"
+            lines.append(f"  {type_name}: !include types/{type_name}.raml")
+            schema = {'type': 'object', 'properties': {prop: {'type': 'string'} for prop in prop_names}}
+            _write(target_dir / 'schemas' / f"{type_name}.json", json.dumps(schema, indent=3))
+            _write(target_dir / 'examples' / f"{type_name}.json",
+                   json.dumps(_example(name, index, prop_names), indent=3))
+            _write(target_dir / 'types' / f"{type_name}.raml",
+                   f"type: !include ../schemas/{type_name}.json\n"
+                   f"example: !include ../examples/{type_name}.json\n")
+
+        resource_lines.append(f"/{slug}s: !include resources/{slug}.raml")
+        chain_dir = target_dir / 'descriptions' / slug
+        for depth in range(include_depth):
+            body = f"text: {name} description level {depth}\n"
+            if depth + 1 < include_depth:
+                body += f"detail: !include {depth + 1}.raml\n"
+            _write(chain_dir / f"{depth}.raml", body)
+
+        description = f"description: !include ../descriptions/{slug}/0.raml\n" if include_depth else ''
+        _write(target_dir / 'resources' / f"{slug}.raml",
+               f"type: {{ collection: {{ typeName: {name} }} }}\n{description}"
+               f"/{{{name}ID}}:\n  type: {{ item: {{ typeName: {name} }} }}\n")
+
+    _write(target_dir / 'KIX.raml', '\n'.join(lines + [''] + resource_lines) + '\n')
+    return target_dir / 'KIX.raml'
+
+def endpoint_paths(count):
+    """Returns `count` (path, method) pairs spread over collection and item resources."""
+    pairs = []
+    index = 0
+    while len(pairs) < count:
+        name = resource_name(index)
+        collection = f"/{name.lower()}s"
+        item = f"{collection}/{{{name}ID}}"
+        for pair in ((collection, 'get'), (collection, 'post'), (item, 'get'), (item, 'patch'), (item, 'delete')):
+            pairs.append(pair)
+        index += 1
+    return pairs[:count]
+
+def make_openapi_spec(endpoints, params_per_endpoint=5):
+    """Returns an OpenAPI 3.0 document with `endpoints` operations, query parameters and 200 examples."""
+    paths = {}
+    for path, method in endpoint_paths(endpoints):
+        paths.setdefault(path, {})[method] = {
+            'summary': f"{method.upper()} {path}",
+            'parameters': [{'name': f"param{i}", 'in': 'query', 'schema': {'type': 'string'}}
+                           for i in range(params_per_endpoint)],
+            'responses': {'200': {
+                'description': 'The request has been finished.',
+                'content': {'application/json': {'example': {'path': path}}},
+            }},
+        }
+    return {'openapi': '3.0.0', 'info': {'title': 'Synthetic KIX API', 'version': '1.0.0'}, 'paths': paths}
+
+def make_html_records(endpoints, params_per_endpoint=5, drift=0.01):
+    """
+    Returns parse_html_v2-style endpoint records matching make_openapi_spec,
+    with a `drift` fraction of them changed to produce discrepancies.
+    """
+    records = []
+    step = int(1 / drift) if drift else 0
+    for number, (path, method) in enumerate(endpoint_paths(endpoints)):
+        params = [{'name': f"param{i}", 'type': 'string', 'description': ''} for i in range(params_per_endpoint)]
+        if step and number % step == 0:
+            params.append({'name': 'undocumented', 'type': 'string', 'description': ''})
+            path = path + '/extra' if number % (2 * step) == 0 else path
+        records.append({'path': path, 'method': method.upper(), 'query_params': params,
+                        'response_examples': {'200': {}}})
+    return records
+
+HTML_HEAD = ('<!DOCTYPE HTML><html><head><meta charset="utf-8"><title>KIX REST API documentation</title></head>'
+             '<body><div class="container"><div class="row"><div class="col-md-9" role="main">'
+             '<div class="page-header"><h1>KIX REST API documentation <small>version v1</small></h1></div>'
+             '<div class="chapter"><h2 id="resources"><a href="#resources">Resources</a></h2>')
+HTML_TAIL = '</div></div></div></div></body></html>\n'
+
+def _html_modal(record, anchor):
+    method = record['method'].lower()
+    rows = ''.join(
+        f'<tr><td class="uri">{escape(param["name"])}</td><td><center>no</center></td>'
+        f'<td>{escape(param["type"])}</td><td><ul></ul></td><td>{escape(param["description"])}</td></tr>'
+        for param in record['query_params'])
+    table = (f'<h3>Query Parameters</h3><table class="param-table"><thead><tr><th>Parameter</th>'
+             f'<th><center>Required</center></th><th>Type</th><th>Special</th><th>Description</th></tr></thead>'
+             f'<tbody>{rows}</tbody></table>') if rows else ''
+    responses = ''.join(
+        f'<h2 class="response-title" id="{anchor}_{method}_response_http{code}">HTTP status code '
+        f'<a href="http://httpstatus.es/{code}" target="_blank">{code}</a></h2><div class="response"><h3>Body</h3>'
+        f'<p><strong>Media type</strong>: application/json</p><p><strong>Example</strong>:</p>'
+        f'<div class="examples toggleable"><pre><code>{escape(json.dumps({"path": record["path"]}, indent=2))}'
+        f'</code></pre></div></div>'
+        for code in record['response_examples'])
+    return (f'<div class="modal fade" tabindex="0" id="{anchor}_{method}"><div class="modal-dialog modal-lg">'
+            f'<div class="modal-content"><div class="modal-header"><h4 class="modal-title">'
+            f'<span class="badge badge_{method}">{method}</span> <span class="uri">{escape(record["path"])}</span>'
+            f'</h4></div><div class="modal-body"><div class="tab-content">'
+            f'<div class="tab-pane active" id="{anchor}_{method}_request">{table}</div>'
+            f'<div class="tab-pane" id="{anchor}_{method}_response">{responses}</div>'
+            f'</div></div></div></div></div>')
+
+def make_html_document(endpoints, params_per_endpoint=5, drift=0.01):
+    """
+    Returns a raml2html page in the layout of kix_api_docs.html documenting the
+    make_html_records endpoints: a resource panel per top-level resource and a
+    resource-modal with one modal per method for every path.
+    """
+    groups = {}
+    for record in make_html_records(endpoints, params_per_endpoint, drift):
+        groups.setdefault(record['path'], []).append(record)
+
+    resources = {}
+    for path, records in groups.items():
+        resources.setdefault(path.split('/')[1], []).append((path, records))
+
+    parts = [HTML_HEAD]
+    for resource, paths in resources.items():
+        parts.append(f'<div class="panel panel-default resource"><div class="panel-heading">'
+                     f'<h3 id="{resource}" class="panel-title">{resource}</h3></div><div class="panel-body">'
+                     f'<div class="panel-group">')
+        for path, records in paths:
+            anchor = re.sub(r'\W+', '_', path).strip('_')
+            parent, _, uri = path.rpartition('/')
+            badges = ' '.join(f'<a href="#{anchor}_{record["method"].lower()}"><span class="badge badge_'
+                              f'{record["method"].lower()}">{record["method"].lower()}</span></a>'
+                              for record in records)
+            parts.append(f'<div class="panel panel-white resource-modal"><div id="panel_{anchor}" class="panel">'
+                         f'</div><div class="panel-heading"><h4 class="panel-title"><span class="parent uri">'
+                         f'{escape(parent)}</span><span class="uri">/{escape(uri)}</span> <span class="methods">'
+                         f'{badges}</span></h4></div>')
+            parts.extend(_html_modal(record, anchor) for record in records)
+            parts.append('</div>')
+        parts.append('</div></div></div>')
+    parts.append(HTML_TAIL)
+    return ''.join(parts)
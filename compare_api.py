@@ -1,32 +1,72 @@
+import argparse
+import artifacts
+import contextlib
+import gc
+import instrumentation
 import json
-import yaml
+import records
 import sys
+import yaml_backend
 
-def compare_api_specs():
+# The keys of an OpenAPI path item that are operations; the others
+# (parameters, summary, description, servers, $ref) are not
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'patch', 'options', 'head', 'trace')
+
+@contextlib.contextmanager
+def gc_paused():
     """
-    Compares API specifications from parsed HTML documentation against an OpenAPI YAML file.
+    Pauses the cyclic garbage collector. Building an index allocates a few
+    containers per endpoint, which would otherwise trigger repeated full
+    traversals of the whole loaded spec.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
 
-    This function reads API endpoint details from `parsed_api.json` and compares them
-    with the definitions in `openapi.yaml`. It checks for missing paths, methods,
-    query parameters, and response examples.
+def build_openapi_index(openapi_data):
+    """
+    Indexes an OpenAPI document in one pass.
 
-    All discrepancies are recorded in `comparison_output.json`. If any discrepancies
-    are found, the script prints a message and exits with a status code of 1.
+    Returns a dict mapping `(path, method)` to a tuple of the set of query
+    parameter names and a flag telling whether the `200` response has an
+    `application/json` example, for every operation (HTTP_METHODS). Every path also gets a `(path, None)` entry,
+    so that path lookups are O(1) as well.
     """
-    try:
-        with open('parsed_api.json', 'r') as f:
-            html_data = json.load(f)
-    except FileNotFoundError:
-        print("Error: parsed_api.json not found. Please run the parsing script first.")
-        sys.exit(1)
+    index = {}
+    with gc_paused():
+        for path, path_item in (openapi_data.get('paths') or {}).items():
+            index[(path, None)] = True
+            for method, operation in (path_item or {}).items():
+                if method not in HTTP_METHODS:
+                    continue
+                if not isinstance(operation, dict):
+                    index[(path, method)] = (set(), False)
+                    continue
+                query_params = {p['name'] for p in operation.get('parameters') or [] if p.get('in') == 'query'}
+                response = (operation.get('responses') or {}).get('200')
+                has_example = isinstance(response, dict) and \
+                    'example' in (response.get('content') or {}).get('application/json', {})
+                index[(path, method)] = (query_params, has_example)
+    return index
 
-    try:
-        with open('openapi.yaml', 'r') as f:
-            openapi_data = yaml.safe_load(f)
-    except FileNotFoundError:
-        print("Error: openapi.yaml not found.")
-        sys.exit(1)
+def has_response_example(endpoint, status_code):
+    """
+    Tells whether an HTML endpoint has a response example under a status code,
+    as `status_code in response_examples` of its JSON record always did: only
+    examples keyed by status code count, not the list parse_html_v2 writes.
+    """
+    return any(response.status_code == status_code and response.extra == records.KEYED_EXAMPLE
+               for response in endpoint.responses)
 
+def diff_specs(html_data, openapi_index):
+    """
+    Returns the items of the HTML documentation (records.Endpoint) that are
+    missing from the indexed OpenAPI spec.
+    """
     missing_items = {
         "missing_paths": [],
         "missing_methods": [],
@@ -35,56 +75,153 @@ def compare_api_specs():
     }
 
     for endpoint in html_data:
-        path = endpoint['path']
-        method = endpoint['method'].lower()
-        html_params = endpoint.get('query_params', [])
-        html_examples = endpoint.get('response_examples', {})
+        path = endpoint.path
+        method = endpoint.method
 
         # Check for missing paths
-        if path not in openapi_data.get('paths', {}):
+        if (path, None) not in openapi_index:
             missing_items["missing_paths"].append({"path": path})
             continue  # If path is missing, no need to check for methods, params, etc.
 
         # Check for missing methods
-        if method not in openapi_data['paths'][path]:
+        entry = openapi_index.get((path, method))
+        if entry is None:
             missing_items["missing_methods"].append({
                 "path": path,
                 "method": method.upper()
             })
             continue  # If method is missing, no need to check for params, etc.
 
-        openapi_endpoint = openapi_data['paths'][path][method]
+        openapi_param_names, has_example = entry
 
         # Check for missing parameters
-        openapi_params = openapi_endpoint.get('parameters', [])
-        openapi_param_names = [p['name'] for p in openapi_params if p.get('in') == 'query']
-        for param in html_params:
-            if param['name'] not in openapi_param_names:
+        for param in endpoint.parameters:
+            if param.name not in openapi_param_names:
                 missing_items["missing_parameters"].append({
                     "path": path,
                     "method": method.upper(),
-                    "parameter": param['name']
+                    "parameter": param.name
                 })
 
         # Check for missing response examples
-        if '200' in html_examples:
-            responses = openapi_endpoint.get('responses', {})
-            if '200' not in responses or \
-               'content' not in responses['200'] or \
-               'application/json' not in responses['200']['content'] or \
-               'example' not in responses['200']['content']['application/json']:
-                missing_items["missing_examples"].append({
-                    "path": path,
-                    "method": method.upper()
-                })
+        if has_response_example(endpoint, '200') and not has_example:
+            missing_items["missing_examples"].append({
+                "path": path,
+                "method": method.upper()
+            })
+
+    return missing_items
+
+def reverse_diff_specs(html_data, openapi_index):
+    """Returns the paths, methods and query parameters of the OpenAPI spec that the HTML documentation lacks."""
+    html_params = {}
+    with gc_paused():
+        for endpoint in html_data:
+            names = html_params.setdefault((endpoint.path, endpoint.method), set())
+            names.update(param.name for param in endpoint.parameters)
+    html_paths = {path for path, _ in html_params}
+
+    undocumented = {
+        "undocumented_paths": [],
+        "undocumented_methods": [],
+        "undocumented_parameters": []
+    }
+    for (path, method), entry in openapi_index.items():
+        if method is None:
+            if path not in html_paths:
+                undocumented["undocumented_paths"].append({"path": path})
+        elif path in html_paths:
+            if (path, method) not in html_params:
+                undocumented["undocumented_methods"].append({"path": path, "method": method.upper()})
+            else:
+                for name in sorted(entry[0] - html_params[(path, method)]):
+                    undocumented["undocumented_parameters"].append({
+                        "path": path,
+                        "method": method.upper(),
+                        "parameter": name
+                    })
+    return undocumented
+
+HTML_FILE = 'parsed_api.json'
+OPENAPI_FILE = 'openapi.yaml'
+OUTPUT_FILE = 'comparison_output.json'
+REVERSE_OUTPUT_FILE = 'reverse_comparison_output.json'
+
+def _write_json(data, file_path):
+    with open(file_path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+def compare_api_specs(html_data=HTML_FILE, openapi_data=OPENAPI_FILE, output=OUTPUT_FILE, reverse=False,
+                      reverse_output=REVERSE_OUTPUT_FILE):
+    """
+    Compares API specifications from parsed HTML documentation against an OpenAPI YAML file.
+
+    `html_data` is the endpoint list of the parsing scripts (records or JSON) and
+    `openapi_data` the OpenAPI document, each either loaded already or the
+    path of the file to read (`parsed_api.json` and `openapi.yaml` by default).
+    It checks for missing paths, methods, query parameters, and response examples.
+
+    Returns `(missing_items, undocumented)`. The discrepancies are also written
+    to `output` unless it is None. With `reverse`, `undocumented` holds the items
+    of the OpenAPI spec that the HTML documentation does not document, written to
+    `reverse_output` unless it is None; otherwise it is None. Missing input files
+    raise FileNotFoundError.
+    """
+    if not isinstance(html_data, list):
+        with instrumentation.phase('compare.load_html'):
+            html_data = artifacts.read(html_data)
+    html_data = records.html_endpoints(html_data)
+    if not isinstance(openapi_data, dict):
+        with open(openapi_data, 'r') as f, instrumentation.phase('compare.load_openapi'):
+            openapi_data = yaml_backend.safe_load(f)
+
+    with instrumentation.phase('compare.index'):
+        openapi_index = build_openapi_index(openapi_data)
+    with instrumentation.phase('compare.diff'):
+        missing_items = diff_specs(html_data, openapi_index)
+    instrumentation.count('compare.endpoints', len(html_data))
+    if output is not None:
+        _write_json(missing_items, output)
+
+    undocumented = None
+    if reverse:
+        with instrumentation.phase('compare.reverse_diff'):
+            undocumented = reverse_diff_specs(html_data, openapi_index)
+        if reverse_output is not None:
+            _write_json(undocumented, reverse_output)
+    return missing_items, undocumented
+
+def main(argv=None):
+    """
+    Compares the files given on the command line and returns the exit status:
+    1 if an input is missing or discrepancies were found, 0 otherwise. The
+    items the HTML documentation lacks (`--reverse`) do not affect it.
+    """
+    parser = argparse.ArgumentParser(description='Compare parsed_api.json against openapi.yaml.')
+    parser.add_argument('--html', default=HTML_FILE, help='endpoints parsed from the HTML documentation')
+    parser.add_argument('--spec', default=OPENAPI_FILE, help='OpenAPI file')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='JSON report of the discrepancies')
+    parser.add_argument('--reverse', action='store_true',
+                        help='also report OpenAPI entries missing from the HTML documentation')
+    parser.add_argument('--reverse-output', default=REVERSE_OUTPUT_FILE, help='JSON report of --reverse')
+    instrumentation.add_arguments(parser, 'compare_api_profile.json')
+    args = parser.parse_args(argv)
 
-    with open('comparison_output.json', 'w') as f:
-        json.dump(missing_items, f, indent=4)
+    with instrumentation.profiling(args):
+        try:
+            missing_items, _ = compare_api_specs(args.html, args.spec, args.output, args.reverse,
+                                                 args.reverse_output)
+        except FileNotFoundError as e:
+            if e.filename == args.html:
+                print(f"Error: {args.html} not found. Please run the parsing script first.")
+            else:
+                print(f"Error: {e.filename} not found.")
+            return 1
 
-    # Exit with a non-zero status code if any discrepancies were found
     if any(missing_items.values()):
-        print("Discrepancies found. See comparison_output.json for details.")
-        sys.exit(1)
+        print(f"Discrepancies found. See {args.output} for details.")
+        return 1
+    return 0
 
 if __name__ == '__main__':
-    compare_api_specs()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Shared single-pass extraction of endpoint data from the raml2html documentation.
+
+Both HTML parsers used to locate every piece of a modal with its own
+find/find_all call, plus a find_previous_sibling/find_next_sibling scan per
+response or heading. The helpers here walk each subtree exactly once with
+lxml and collect everything in document order. BeautifulSoup is only used as
+a fallback when lxml is not installed.
+"""
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - exercised only without lxml
+    etree = None
+
+import os
+import re
+
+import instrumentation
+import records
+import sources
+
+RESOURCE_PANEL_CLASS = 'panel panel-default resource'
+RESOURCE_MODAL_CLASS = 'panel panel-white resource-modal'
+METHOD_BADGE_CLASSES = {'badge_get', 'badge_post', 'badge_patch', 'badge_delete'}
+
+# Pre-scan of the raw page for parse_sharded: div tags, skipping comments,
+# scripts and styles, and the opening tags of the resource panels.
+DIV_TOKENS = re.compile(rb'<!--.*?-->|<(script|style)\b.*?</\1\s*>|<(/?)div\b', re.S | re.I)
+RESOURCE_PANEL_TAG = re.compile(rb'''<div\b[^>]*?\sclass\s*=\s*(["'])\s*panel\s+panel-default\s+resource\s*\1''',
+                                re.I)
+RESOURCE_CONTENT = re.compile(rb'''\sclass\s*=\s*(["'])[^"']*\b(panel-heading|resource-modal)\b''', re.I)
+
+instrumentation.track_rate('html.endpoints', 'html.parse')
+instrumentation.track_rate('html.modals', 'html.parse')
+
+if etree is not None:
+    RESOURCE_MODALS = etree.XPath(
+        f"//div[normalize-space(@class)='{RESOURCE_MODAL_CLASS}']"
+        f"[ancestor::div[normalize-space(@class)='{RESOURCE_PANEL_CLASS}']]"
+    )
+    PANEL_HEADINGS = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' panel-heading ')]")
+
+def classes(elem):
+    return (elem.get('class') or '').split()
+
+def class_is(elem, class_string):
+    """Matches a multi-word class attribute exactly, like BeautifulSoup does."""
+    return ' '.join(classes(elem)) == class_string
+
+def text(elem, strip=False):
+    """Equivalent of BeautifulSoup's `.text` / `get_text(strip=True)`."""
+    if strip:
+        return ''.join(s.strip() for s in elem.itertext())
+    return ''.join(elem.itertext())
+
+def parse_document(file_path):
+    """Parses an HTML file into an lxml tree."""
+    return etree.parse(file_path, etree.HTMLParser(encoding='utf-8'))
+
+def extract_modal(method_panel, table=None):
+    """
+    Returns the endpoint records (records.Endpoint, built through `table`) of
+    one resource-modal element.
+
+    The modal is walked once with start/end events. The path and methods come
+    from the first `h4.panel-title`; query parameters and response examples
+    come from the first `div.modal`. Each `div.response` is paired with the
+    nearest preceding `h2.response-title` sibling, which is remembered per
+    parent while walking instead of being searched for.
+    """
+    h4_title = modal = param_table = param_tbody = None
+    title_done = modal_done = in_tbody = False
+    path_parts, methods = [], []
+    query_params, responses = [], []
+    rows = []
+    open_responses = []
+    last_title = {}
+    instrumentation.count('html.modals')
+
+    for event, elem in etree.iterwalk(method_panel, events=('start', 'end')):
+        if elem is method_panel or not isinstance(elem.tag, str):
+            continue
+        tag = elem.tag
+
+        if event == 'end':
+            if elem is h4_title:
+                title_done = True
+            elif elem is modal:
+                modal_done = True
+            elif elem is param_tbody:
+                in_tbody = False
+            elif rows and elem is rows[-1][0]:
+                row, cols = rows.pop()
+                if len(cols) >= 4:
+                    query_params.append(records.Parameter(text(cols[0]).strip(), text(cols[2]).strip(),
+                                                          text(cols[4]).strip()))
+            elif open_responses and elem is open_responses[-1]['div']:
+                open_responses.pop()
+            else:
+                for response in open_responses:
+                    if response['examples'] is elem:
+                        response['examples_open'] = False
+            if title_done and modal_done:
+                break
+            continue
+
+        if h4_title is not None and not title_done:
+            if tag == 'span':
+                elem_classes = classes(elem)
+                if 'uri' in elem_classes:
+                    path_parts.append(text(elem))
+                if METHOD_BADGE_CLASSES.intersection(elem_classes):
+                    methods.append(text(elem).strip())
+        elif h4_title is None and tag == 'h4' and 'panel-title' in classes(elem):
+            h4_title = elem
+
+        if modal is None:
+            if tag == 'div' and 'modal' in classes(elem):
+                modal = elem
+            continue
+        if modal_done:
+            continue
+
+        if tag == 'table' and param_table is None and 'param-table' in classes(elem):
+            param_table = elem
+        elif tag == 'tbody' and param_table is not None and param_tbody is None \
+                and param_table in elem.iterancestors('table'):
+            param_tbody = elem
+            in_tbody = True
+        elif tag == 'tr' and in_tbody:
+            rows.append((elem, []))
+        elif tag == 'td':
+            for row, cols in rows:
+                cols.append(elem)
+        elif tag == 'h2' and 'response-title' in classes(elem):
+            last_title[elem.getparent()] = elem
+        elif tag == 'div' and 'response' in classes(elem):
+            response = {'div': elem, 'title': last_title.get(elem.getparent()),
+                        'examples': None, 'examples_open': False, 'code': None}
+            open_responses.append(response)
+            responses.append(response)
+        elif tag == 'div' and class_is(elem, 'examples toggleable'):
+            for response in open_responses:
+                if response['examples'] is None:
+                    response['examples'] = elem
+                    response['examples_open'] = True
+        elif tag == 'code':
+            for response in open_responses:
+                if response['examples_open'] and response['code'] is None:
+                    response['code'] = elem
+
+    if h4_title is None or modal is None:
+        return []
+
+    path = ''.join(path_parts).strip()
+    response_examples = [
+        records.Response(text(response['title']).strip().split(' ')[-1], example=text(response['code']).strip())
+        for response in responses if response['title'] is not None and response['code'] is not None]
+
+    instrumentation.count('html.endpoints', len(methods))
+    table = table or records.RecordTable()
+    return [table.endpoint(path, method, query_params, response_examples) for method in methods]
+
+def iter_modal_records(root, table=None):
+    """Yields the endpoint records of every resource-modal below `root`, sharing one RecordTable."""
+    table = table or records.RecordTable()
+    for method_panel in RESOURCE_MODALS(root):
+        yield from extract_modal(method_panel, table)
+
+def iter_panel_sections(root):
+    """
+    Yields `(panel_heading, panel_body)` pairs for every `div.panel-heading`.
+
+    `panel_body` is the nearest following `div.panel-body` sibling, or None.
+    The children of each parent are scanned once for all of its headings.
+    """
+    bodies = {}
+    scanned = set()
+    for heading in PANEL_HEADINGS(root):
+        parent = heading.getparent()
+        if parent not in scanned:
+            scanned.add(parent)
+            pending = []
+            for child in parent:
+                if child.tag != 'div':
+                    continue
+                child_classes = classes(child)
+                if 'panel-body' in child_classes:
+                    for pending_heading in pending:
+                        bodies[pending_heading] = child
+                    pending = []
+                if 'panel-heading' in child_classes:
+                    pending.append(child)
+        yield heading, bodies.pop(heading, None)
+
+def next_sibling(elem, tag):
+    """Returns the nearest following sibling with the given tag, or None."""
+    return next(elem.itersiblings(tag), None)
+
+def resource_panel_ranges(content):
+    """
+    Pre-scans the raw page and returns the (start, end) byte ranges of the
+    outermost resource panels, in document order.
+
+    Only div tags are looked at, to keep track of nesting. Returns None
+    if any panel heading or modal lies outside the panels, or if the div
+    tags do not balance, since the panels could not then be parsed on their own.
+    """
+    ranges = []
+    depth = 0
+    panel_depth = start = None
+    for match in DIV_TOKENS.finditer(content):
+        if match.group(2) is None:
+            continue
+        if match.group(2):
+            depth -= 1
+            if depth == panel_depth:
+                end = content.find(b'>', match.end())
+                if end < 0:
+                    return None
+                ranges.append((start, end + 1))
+                panel_depth = None
+        else:
+            if panel_depth is None and RESOURCE_PANEL_TAG.match(content, match.start()):
+                panel_depth, start = depth, match.start()
+            depth += 1
+    if panel_depth is not None:
+        return None
+
+    gaps = zip([0] + [end for _, end in ranges], [start for start, _ in ranges] + [len(content)])
+    if any(RESOURCE_CONTENT.search(content, gap_start, gap_end) for gap_start, gap_end in gaps):
+        return None
+    return ranges
+
+def _parse_shard(parse_range, file_path, start, end):
+    """Process pool worker: maps the page and parses one byte range of it."""
+    instrumentation.reset()
+    with sources.mapped(file_path) as content, memoryview(content) as view:
+        result = parse_range(view[start:end])
+    return result, instrumentation.snapshot()
+
+def parse_sharded(file_path, parse_range, jobs=None):
+    """
+    Parses a page in a process pool, one group of consecutive resource panels
+    per task, and returns the concatenated results in document order.
+
+    `parse_range(buffer)` parses the bytes of a group (a fragment holding
+    whole panels) and returns a list. The groups are found with
+    resource_panel_ranges, so the whole DOM is never built in one process.
+    Returns None if the page cannot be split; the caller parses it whole.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    with sources.mapped(file_path) as content, instrumentation.phase('html.prescan'):
+        ranges = resource_panel_ranges(content)
+        size = len(content)
+    if not ranges:
+        return None
+
+    # A few tasks per worker balances panels of very different sizes
+    target = max(1, size // (jobs * 4))
+    groups = []
+    for start, end in ranges:
+        if groups and end - groups[-1][0] <= target:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+    instrumentation.count('html.shards', len(groups))
+
+    # Imported here so that single-process parsing does not pay for it
+    from concurrent.futures import ProcessPoolExecutor
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for result, recorded in executor.map(_parse_shard, [parse_range] * len(groups), [file_path] * len(groups),
+                                             *zip(*groups)):
+            results.extend(result)
+            instrumentation.merge(recorded)
+    return results
@@ -0,0 +1,127 @@
+import contextlib
+import json
+import resource
+import sys
+import time
+from collections import Counter
+
+# Counters, maxima and per-phase times of the current process. They are always
+# collected, as they are cheap; --profile only decides whether they are written.
+counters = Counter()
+maxima = {}
+phases = {}
+# Pairs of (counter, phase) reported as "<counter> per second of <phase>".
+rates = []
+# True while profiling() writes a report. Counters in the hottest loops are
+# only collected then, as even a Counter update adds up there.
+detailed = False
+
+def count(name, n=1):
+    counters[name] += n
+
+def record_max(name, value):
+    if value > maxima.get(name, 0):
+        maxima[name] = value
+
+def track_rate(counter, phase):
+    """Reports `counter` per second of wall time spent in `phase`."""
+    if (counter, phase) not in rates:
+        rates.append((counter, phase))
+
+@contextlib.contextmanager
+def phase(name):
+    """Adds the wall and CPU time spent in the block to the phase `name`."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        stats = phases.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+        stats['calls'] += 1
+        stats['wall_seconds'] += time.perf_counter() - wall_start
+        stats['cpu_seconds'] += time.process_time() - cpu_start
+
+def hit_rate(hits, misses):
+    """Returns counters[hits] / (counters[hits] + counters[misses]), or None without lookups."""
+    total = counters[hits] + counters[misses]
+    return counters[hits] / total if total else None
+
+def report():
+    """Returns everything recorded so far as a JSON-serialisable dict."""
+    computed_rates = {}
+    for counter, phase_name in rates:
+        wall_seconds = phases.get(phase_name, {}).get('wall_seconds')
+        if wall_seconds and counter in counters:
+            computed_rates[f'{counter}_per_second'] = counters[counter] / wall_seconds
+    hit_rates = {}
+    for name in counters:
+        if name.endswith('.hits'):
+            prefix = name[:-len('.hits')]
+            hit_rates[prefix] = hit_rate(name, f'{prefix}.misses')
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'argv': sys.argv,
+        'phases': phases,
+        'counters': dict(counters),
+        'maxima': maxima,
+        'rates': computed_rates,
+        'hit_rates': hit_rates,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime,
+        'max_rss_kb': usage.ru_maxrss,
+    }
+
+def reset():
+    counters.clear()
+    maxima.clear()
+    phases.clear()
+
+def snapshot():
+    """Returns the counters, maxima and phases, e.g. to send them from a worker process."""
+    return {'counters': dict(counters), 'maxima': dict(maxima), 'phases': phases}
+
+def merge(recorded):
+    """Adds a snapshot taken in another process to the records of this one."""
+    counters.update(recorded['counters'])
+    for name, value in recorded['maxima'].items():
+        record_max(name, value)
+    for name, stats in recorded['phases'].items():
+        total = phases.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+        for field, value in stats.items():
+            total[field] += value
+
+def add_arguments(parser, default_report):
+    """Adds the --profile and --pstats options to an argparse parser."""
+    parser.add_argument('--profile', nargs='?', const=default_report, default=None, metavar='REPORT',
+                        help=f'write timers and counters as JSON (default: {default_report})')
+    parser.add_argument('--pstats', default=None, metavar='FILE',
+                        help='also run under cProfile and write the stats to FILE (implies --profile)')
+    parser.set_defaults(profile_default=default_report)
+
+@contextlib.contextmanager
+def profiling(args):
+    """
+    Writes the report to `args.profile` when the block exits, also on
+    sys.exit(), and captures a cProfile of the block into `args.pstats`.
+    """
+    global detailed
+    report_file = args.profile or (args.profile_default if args.pstats else None)
+    previous, detailed = detailed, bool(report_file)
+    profiler = None
+    if args.pstats:
+        import cProfile
+        profiler = cProfile.Profile()
+    if profiler:
+        profiler.enable()
+    try:
+        with phase('total'):
+            yield
+    finally:
+        detailed = previous
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.pstats)
+        if report_file:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report(), f, indent=2)
+            print(f"Profile written to {report_file}" + (f" and {args.pstats}" if profiler else ""),
+                  file=sys.stderr)
@@ -0,0 +1,79 @@
+"""
+Single entry point of the documentation scripts, for CI and pre-commit hooks.
+
+    python kixdoc.py parse-raml + update --full + parse-html + compare --html parsed_api_v2.json
+
+Each subcommand takes the options of its script (`python kixdoc.py compare
+--help`). Subcommands separated by `+` run one after the other in the same
+process, which stops at the first one that fails and exits with its status.
+The module of a subcommand, and with it yaml, lxml or bs4, is only imported
+when the subcommand runs.
+"""
+import argparse
+import sys
+
+import instrumentation
+
+SEPARATOR = '+'
+
+def run_parse_raml(argv):
+    import parse_raml
+    return 0 if parse_raml.main(argv) is not None else 1
+
+def run_parse_html(argv):
+    import parse_html_v2
+    parse_html_v2.main(argv)
+    return 0
+
+def run_update(argv):
+    import update_openapi
+    update_openapi.cli(argv)
+    return 0
+
+def run_compare(argv):
+    import compare_api
+    return compare_api.main(argv)
+
+def run_site(argv):
+    import static_site
+    return static_site.main(argv)
+
+COMMANDS = {
+    'parse-raml': (run_parse_raml, 'extract the API details from the RAML documentation (parse_raml.py)'),
+    'parse-html': (run_parse_html, 'parse the raml2html page into endpoint records (parse_html_v2.py)'),
+    'update': (run_update, 'update openapi.yaml with the RAML API details (update_openapi.py)'),
+    'compare': (run_compare, 'compare the endpoint records against openapi.yaml (compare_api.py)'),
+    'site': (run_site, 'render openapi.yaml to static HTML pages (static_site.py)'),
+}
+
+def split_commands(argv):
+    """Splits the command line at each SEPARATOR into the argument lists of the subcommands."""
+    commands = [[]]
+    for arg in argv:
+        if arg == SEPARATOR:
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return commands
+
+def main(argv=None):
+    """Runs the subcommands of the command line in order and returns the exit status."""
+    parser = argparse.ArgumentParser(
+        usage='%(prog)s [-h] COMMAND [OPTIONS] [+ COMMAND [OPTIONS] ...]',
+        description='Run the KIX documentation scripts; separate several subcommands with "+".',
+        epilog='\n'.join(f'  {name:<12}{help}' for name, (_, help) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS, help='subcommand, followed by the options of its script')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    # Parse every subcommand name before running the first one
+    commands = [parser.parse_args(command) for command in split_commands(sys.argv[1:] if argv is None else argv)]
+    for args in commands:
+        # Each subcommand's --profile report covers that subcommand only
+        instrumentation.reset()
+        status = COMMANDS[args.command][0](args.args)
+        if status:
+            return status
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
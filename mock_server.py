@@ -0,0 +1,449 @@
+"""
+Local mock of the KIX REST API, generated from openapi.yaml (or
+raml_api_details.json), to point clients and load generators at without a
+live backend.
+
+Every documented path and method answers with its documented success
+response: the status code and the first example of the lowest 2xx response,
+encoded once when the routes are compiled. Paths are dispatched by a trie of
+their segments, so the cost of a lookup depends on the depth of the path and
+not on the number of endpoints; templated segments such as `{TicketID}` match
+any value. Query and path parameters are checked against the documented ones:
+unknown or missing required parameters, and values not of the documented
+type or enum, get a 400 in the format of the KIX errors.
+
+The server speaks enough HTTP/1.1 for clients and benchmarks (keep-alive,
+Content-Length bodies, no chunked requests). `--load` starts it and runs the
+built-in load driver against it, which reports requests/s and the p50/p99
+latency.
+"""
+import argparse
+import asyncio
+import contextlib
+import http
+import io
+import itertools
+import json
+import math
+import sys
+import time
+from collections import Counter, namedtuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import instrumentation
+import update_openapi
+
+METHODS = ('get', 'put', 'post', 'delete', 'options', 'patch')
+MEDIA_TYPE = 'application/json'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+# Requests whose header section is larger are refused
+MAX_HEADER_BYTES = 64 * 1024
+# The value substituted for path parameters by the load driver when none is documented
+SAMPLE_PARAMETER = '1'
+
+# A compiled operation: the response sent as is, and the parameters as {(location, name): (required, schema)}
+Endpoint = namedtuple('Endpoint', ['status', 'body', 'parameters'])
+
+def _example(openapi_data, media):
+    if 'example' in media:
+        return media['example']
+    for example in (media.get('examples') or {}).values():
+        example = update_openapi.resolve_ref(openapi_data, example)
+        if isinstance(example, dict) and 'value' in example:
+            return example['value']
+    return {}
+
+def compile_endpoint(openapi_data, path_item, operation):
+    """Returns the Endpoint of an operation: its documented success response and parameters."""
+    status, body = 200, b''
+    responses = {str(code): response for code, response in (operation.get('responses') or {}).items()}
+    successes = sorted(code for code in responses if code.isdigit() and code.startswith('2'))
+    if successes:
+        status = int(successes[0])
+        response = update_openapi.resolve_ref(openapi_data, responses[successes[0]])
+        media = ((response or {}).get('content') or {}).get(MEDIA_TYPE) if isinstance(response, dict) else None
+        if isinstance(media, dict) and status != 204:
+            body = json.dumps(_example(openapi_data, media), ensure_ascii=False).encode('utf-8')
+
+    parameters = {}
+    # Operation parameters override those of the path item with the same name and location
+    for parameter in list(path_item.get('parameters') or []) + list(operation.get('parameters') or []):
+        parameter = update_openapi.resolve_ref(openapi_data, parameter)
+        if isinstance(parameter, dict) and parameter.get('in') in ('query', 'path') and parameter.get('name'):
+            schema = update_openapi.resolve_ref(openapi_data, parameter.get('schema')) or {}
+            parameters[(parameter['in'], parameter['name'])] = (
+                parameter['in'] == 'path' or bool(parameter.get('required')), schema)
+    return Endpoint(status, body, parameters)
+
+def segments(path):
+    return [segment for segment in path.split('/') if segment]
+
+def is_template(segment):
+    return segment.startswith('{') and segment.endswith('}')
+
+class _Node:
+    __slots__ = ('children', 'param', 'endpoints')
+
+    def __init__(self):
+        self.children = {}
+        # The child matching any segment, for the templated segments
+        self.param = None
+        # {method: (Endpoint, path template, names of the path parameters)}
+        self.endpoints = {}
+
+class RouteTrie:
+    """
+    The routes of a spec by path segment. Literal segments are matched before
+    templated ones, so /tickets/search wins over /tickets/{TicketID}; a
+    literal branch that does not document the method falls back to the
+    template.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self.routes = 0
+
+    def add(self, path, method, endpoint):
+        node, names = self.root, []
+        for segment in segments(path):
+            if is_template(segment):
+                node.param = node.param or _Node()
+                node = node.param
+                names.append(segment[1:-1])
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.endpoints[method] = (endpoint, path, tuple(names))
+        self.routes += 1
+
+    def _find(self, node, parts, index, values, method):
+        if index == len(parts):
+            return node if (method in node.endpoints if method else node.endpoints) else None
+        child = node.children.get(parts[index])
+        if child is not None:
+            found = self._find(child, parts, index + 1, values, method)
+            if found is not None:
+                return found
+        if node.param is not None:
+            values.append(parts[index])
+            found = self._find(node.param, parts, index + 1, values, method)
+            if found is not None:
+                return found
+            values.pop()
+        return None
+
+    def match(self, method, path):
+        """
+        Returns (Endpoint, path template, {path parameter: value}) for a request
+        path, (None, allowed methods, None) if only the method is not
+        documented, or (None, None, None) if the path is unknown.
+        """
+        values, parts = [], [unquote(part) for part in segments(path)]
+        node = self._find(self.root, parts, 0, values, method)
+        if node is None:
+            node = self._find(self.root, parts, 0, [], None)
+            return None, sorted(node.endpoints) if node else None, None
+        endpoint, template, names = node.endpoints[method]
+        return endpoint, template, dict(zip(names, values))
+
+def build_routes(openapi_data):
+    """Compiles the operations of an OpenAPI document into a RouteTrie."""
+    trie = RouteTrie()
+    for path, path_item in (openapi_data.get('paths') or {}).items():
+        path_item = update_openapi.resolve_ref(openapi_data, path_item) or {}
+        for method, operation in path_item.items():
+            if method in METHODS and isinstance(operation, dict):
+                trie.add(path, method, compile_endpoint(openapi_data, path_item, operation))
+    return trie
+
+def openapi_from_raml_details(raml_data):
+    """
+    Builds an OpenAPI document from raml_api_details.json: an operation per
+    RAML method, filled in by update_openapi.update_full.
+    """
+    openapi_data = {'paths': {}}
+    for path, methods in (raml_data.get('paths') or {}).items():
+        path_parameters = [{'name': segment[1:-1], 'in': 'path', 'required': True, 'schema': {'type': 'string'}}
+                           for segment in segments(path) if is_template(segment)]
+        openapi_data['paths'][path] = {method: {'parameters': list(path_parameters), 'responses': {}}
+                                       for method in methods if method in METHODS}
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_openapi.update_full(raml_data, openapi_data)
+    return openapi_data
+
+def load_spec(file_path):
+    """Loads openapi.yaml, or converts raml_api_details.json (any .json file)."""
+    if str(file_path).endswith('.json'):
+        return openapi_from_raml_details(update_openapi.load_json_file(file_path))
+    return update_openapi.load_yaml_file(file_path)
+
+def check_value(value, schema):
+    """Returns why a parameter value does not match its schema, or None."""
+    if schema.get('type') == 'array':
+        return next(filter(None, (check_value(item, schema.get('items') or {}) for item in value.split(','))), None)
+    if 'enum' in schema and value not in [str(item) for item in schema['enum']]:
+        return f"must be one of {', '.join(str(item) for item in schema['enum'])}"
+    kind = schema.get('type')
+    try:
+        if kind == 'integer':
+            int(value)
+        elif kind == 'number':
+            float(value)
+    except ValueError:
+        return f"must be of type {kind}"
+    if kind == 'boolean' and value not in ('true', 'false', '0', '1'):
+        return "must be of type boolean"
+    return None
+
+def check_parameters(endpoint, path_values, query):
+    """Returns the problems with the parameters of a request, as messages."""
+    problems = []
+    given = {('path', name): [value] for name, value in path_values.items()}
+    for name, value in query:
+        given.setdefault(('query', name), []).append(value)
+    for key, values in given.items():
+        if key not in endpoint.parameters:
+            if key[0] == 'path':
+                # Undocumented path parameters are plain strings
+                continue
+            problems.append(f"Unknown {key[0]} parameter '{key[1]}'.")
+            continue
+        for value in values:
+            problem = check_value(value, endpoint.parameters[key][1])
+            if problem:
+                problems.append(f"The {key[0]} parameter '{key[1]}' {problem}.")
+    problems += [f"The {location} parameter '{name}' is required."
+                 for (location, name), (required, _) in endpoint.parameters.items()
+                 if required and (location, name) not in given]
+    return problems
+
+def error_body(code, message):
+    return json.dumps({'Code': code, 'Message': message}).encode('utf-8')
+
+# Reason phrases of the status codes http.HTTPStatus does not know, by class
+GENERIC_REASONS = {1: 'Informational', 2: 'Success', 3: 'Redirection', 4: 'Client Error', 5: 'Server Error'}
+
+def reason_phrase(status):
+    try:
+        return http.HTTPStatus(status).phrase
+    except ValueError:
+        return GENERIC_REASONS.get(status // 100, 'Unknown')
+
+class MockServer:
+    """Serves the compiled routes of a spec. `base_path` is stripped from request paths that start with it."""
+
+    def __init__(self, routes, base_path=''):
+        self.routes = routes
+        self.base_path = base_path.rstrip('/')
+        self.statuses = Counter()
+
+    def respond(self, method, target):
+        """Returns (status, body, extra headers) for a request."""
+        url = urlsplit(target)
+        path = url.path
+        if self.base_path and (path == self.base_path or path.startswith(self.base_path + '/')):
+            path = path[len(self.base_path):] or '/'
+        endpoint, template, path_values = self.routes.match(method.lower(), path)
+        if endpoint is None:
+            if template:
+                return 405, error_body('Method.NotAllowed', f"{method} is not documented for {path}."), \
+                    [('Allow', ', '.join(name.upper() for name in template))]
+            return 404, error_body('Object.NotFound', f"{path} is not documented."), []
+        problems = check_parameters(endpoint, path_values, parse_qsl(url.query, keep_blank_values=True))
+        if problems:
+            return 400, error_body('BadRequest', ' '.join(problems)), []
+        return endpoint.status, endpoint.body, []
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Where the next request starts is unknown, so the connection is closed
+                    status, body, extra = 400, error_body('BadRequest', "Invalid Content-Length."), []
+                    keep_alive = False
+                else:
+                    if length:
+                        await reader.readexactly(length)
+                    status, body, extra = self.respond(method, target)
+
+                self.statuses[status] += 1
+                response = [f"HTTP/1.1 {status} {reason_phrase(status)}",
+                            f"Content-Length: {len(body)}",
+                            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if body:
+                    response.append(f"Content-Type: {MEDIA_TYPE}")
+                response += [f"{name}: {value}" for name, value in extra]
+                writer.write('\r\n'.join(response).encode('latin-1') + b'\r\n\r\n' + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts listening; port 0 picks a free port, see server.sockets."""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+
+def server_base_path(openapi_data):
+    """The path of the first server URL of the spec (e.g. /kix-rest), which requests may be prefixed with."""
+    servers = openapi_data.get('servers') or [{}]
+    return urlsplit(servers[0].get('url', '')).path.rstrip('/')
+
+def load_targets(openapi_data, methods=None):
+    """
+    Returns the (method, URL path) pairs the load driver requests: every
+    documented operation (of `methods`, if given), with its path parameters
+    filled in from their examples or SAMPLE_PARAMETER, and its required query
+    parameters likewise.
+    """
+    targets = []
+    for path, path_item in (openapi_data.get('paths') or {}).items():
+        path_item = update_openapi.resolve_ref(openapi_data, path_item) or {}
+        for method, operation in path_item.items():
+            if method not in METHODS or not isinstance(operation, dict) or (methods and method not in methods):
+                continue
+            url, query = path, []
+            for parameter in list(path_item.get('parameters') or []) + list(operation.get('parameters') or []):
+                parameter = update_openapi.resolve_ref(openapi_data, parameter) or {}
+                schema = update_openapi.resolve_ref(openapi_data, parameter.get('schema')) or {}
+                value = str(parameter.get('example', (schema.get('enum') or [SAMPLE_PARAMETER])[0]))
+                if parameter.get('in') == 'path':
+                    url = url.replace('{' + parameter.get('name', '') + '}', value)
+                elif parameter.get('in') == 'query' and parameter.get('required'):
+                    query.append(f"{parameter['name']}={value}")
+            targets.append((method.upper(), url + ('?' + '&'.join(query) if query else '')))
+    return targets
+
+def percentile(sorted_values, fraction):
+    """The nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+async def drive(host, port, targets, requests=10000, concurrency=32):
+    """
+    Sends `requests` requests cycling through `targets` over `concurrency`
+    keep-alive connections, and returns the throughput, the p50/p99 latency
+    and the number of responses per status code.
+    """
+    order = itertools.cycle(targets)
+    remaining = itertools.count()
+    latencies, statuses = [], Counter()
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_HEADER_BYTES)
+        try:
+            while next(remaining) < requests:
+                method, url = next(order)
+                start = time.perf_counter()
+                writer.write(f"{method} {url} HTTP/1.1\r\nHost: {host}\r\nContent-Length: 0\r\n\r\n"
+                             .encode('latin-1'))
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line[:15].lower() == b'content-length:':
+                        length = int(line[15:])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+                statuses[int(head[9:12])] += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(min(concurrency, requests) or 1)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds) if seconds else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+async def serve_and_drive(server, targets, requests, concurrency, host=DEFAULT_HOST):
+    """Starts the server on a free port, drives the load against it and stops it."""
+    listener = await server.start(host, 0)
+    try:
+        return await drive(host, listener.sockets[0].getsockname()[1], targets, requests, concurrency)
+    finally:
+        listener.close()
+        await listener.wait_closed()
+
+async def serve_forever(server, host, port):
+    listener = await server.start(host, port)
+    print(f"Serving {server.routes.routes} operations on http://{host}:{port}{server.base_path} "
+          f"(and without the {server.base_path or '/'} prefix). Ctrl-C to stop.")
+    async with listener:
+        await listener.serve_forever()
+
+def print_load_report(report):
+    print(f"{report['requests']} requests over {report['concurrency']} connections in {report['seconds']}s: "
+          f"{report['requests_per_second']} requests/s, p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms")
+    print("Responses by status: " + ', '.join(f"{status}: {count}" for status, count in report['statuses'].items()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the documented endpoints with their examples, or '
+                                                 'load-test them.')
+    parser.add_argument('--spec', default=update_openapi.OPENAPI_FILE,
+                        help='openapi.yaml, or raml_api_details.json (any .json file)')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--load', type=int, metavar='REQUESTS',
+                        help='start the server on a free port, send REQUESTS requests to it and exit')
+    parser.add_argument('--target', metavar='HOST:PORT',
+                        help='with --load, drive a server that is already running instead')
+    parser.add_argument('--concurrency', type=int, default=32, help='connections of the load driver')
+    parser.add_argument('--methods', nargs='+', help='methods the load driver requests (default: all)')
+    instrumentation.add_arguments(parser, 'mock_server_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        with instrumentation.phase('mock.load_spec'):
+            openapi_data = load_spec(args.spec)
+        with instrumentation.phase('mock.compile_routes'):
+            server = MockServer(build_routes(openapi_data), server_base_path(openapi_data))
+        instrumentation.count('mock.routes', server.routes.routes)
+        if args.load is None:
+            with contextlib.suppress(KeyboardInterrupt):
+                asyncio.run(serve_forever(server, args.host, args.port))
+            return 0
+
+        targets = load_targets(openapi_data, [method.lower() for method in args.methods or []])
+        if not targets:
+            print("No documented operations to request.")
+            return 1
+        with instrumentation.phase('mock.load'):
+            if args.target:
+                host, _, port = args.target.rpartition(':')
+                report = asyncio.run(drive(host or DEFAULT_HOST, int(port), targets, args.load, args.concurrency))
+            else:
+                report = asyncio.run(serve_and_drive(server, targets, args.load, args.concurrency))
+        instrumentation.count('mock.requests', report['requests'])
+    print_load_report(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
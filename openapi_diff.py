@@ -0,0 +1,349 @@
+"""
+Structural diff of two versions of openapi.yaml, for release-to-release change
+reports.
+
+Both documents are hashed bottom-up into a Merkle tree following the levels
+the report is organized by: paths → methods → parameters (keyed by location
+and name), request body, responses (by status code) and the other fields of
+the operation; components → sections (schemas, examples, ...) → entries; and
+the remaining top-level fields. Below those levels a subtree is one leaf,
+hashed from its canonical JSON. Diffing walks both trees from the root and
+descends only into subtrees whose hashes differ, so once the documents are
+hashed the walk costs in the size of the change, not of the spec.
+
+Operations are hashed from their canonical JSON in one go, as leaves; their
+parameters and responses are only hashed when the walk finds the operation
+changed. Hashing every parameter upfront costs five times as much on large
+specs, for subtrees that are almost all skipped.
+
+Every change is reported as added, removed or modified, and classified as
+breaking or not for clients: removed operations, parameters, responses and
+schemas, new required parameters or request bodies, changed types, narrowed
+enums, properties that became required or were removed, and references that
+now point elsewhere are breaking; everything else (descriptions, examples,
+new optional parameters, new responses) is not.
+"""
+import argparse
+import hashlib
+import json
+import sys
+from collections import namedtuple
+
+import instrumentation
+import update_openapi
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+REPORT_FILE = 'openapi_changes.json'
+MARKDOWN_FILE = 'openapi_changes.md'
+DIGEST_SIZE = 16
+COMPONENT_REFS = ('#/components/parameters/', '#/components/requestBodies/')
+
+# A subtree: its hash, its children by key (None for leaves) and, for leaves, the value
+Node = namedtuple('Node', ['digest', 'children', 'value'])
+
+def canonical(value):
+    """The bytes a leaf is hashed from: its JSON with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+def leaf(value):
+    return Node(hashlib.blake2b(canonical(value), digest_size=DIGEST_SIZE).digest(), None, value)
+
+def branch(children):
+    digest = hashlib.blake2b(b'{', digest_size=DIGEST_SIZE)
+    for key in sorted(children):
+        digest.update(key.encode('utf-8'))
+        digest.update(children[key].digest)
+    return Node(digest.digest(), children, None)
+
+def parameter_key(parameter):
+    if not isinstance(parameter, dict):
+        return repr(parameter)
+    if '$ref' in parameter:
+        return parameter['$ref']
+    return f"{parameter.get('in')}:{parameter.get('name')}"
+
+def hash_operation(operation):
+    if not isinstance(operation, dict):
+        return leaf(operation)
+    children = {}
+    for field, value in operation.items():
+        if field == 'parameters' and isinstance(value, list):
+            children[field] = branch({parameter_key(parameter): leaf(parameter) for parameter in value})
+        elif field == 'responses' and isinstance(value, dict):
+            children[field] = branch({str(status): leaf(response) for status, response in value.items()})
+        else:
+            children[field] = leaf(value)
+    return branch(children)
+
+def hash_path_item(path_item):
+    if not isinstance(path_item, dict):
+        return leaf(path_item)
+    children = {}
+    for field, value in path_item.items():
+        if field in METHODS:
+            # Expanded with hash_operation by the walk if it changed
+            children[field] = leaf(value)
+        elif field == 'parameters' and isinstance(value, list):
+            children[field] = branch({parameter_key(parameter): leaf(parameter) for parameter in value})
+        else:
+            children[field] = leaf(value)
+    return branch(children)
+
+def hash_tree(openapi_data):
+    """Returns the Merkle tree of an OpenAPI document."""
+    children = {}
+    for field, value in openapi_data.items():
+        if field == 'paths' and isinstance(value, dict):
+            children[field] = branch({path: hash_path_item(item) for path, item in value.items()})
+        elif field == 'components' and isinstance(value, dict):
+            children[field] = branch({
+                section: branch({str(name): leaf(entry) for name, entry in entries.items()})
+                if isinstance(entries, dict) else leaf(entries)
+                for section, entries in value.items()})
+        else:
+            children[field] = leaf(value)
+    instrumentation.count('diff.hashed_documents')
+    return branch(children)
+
+def _type(schema):
+    if not isinstance(schema, dict):
+        return None
+    return schema.get('$ref') or schema.get('type')
+
+def schema_changes(old, new, where=''):
+    """Returns the reasons a change of schema breaks clients, descending into properties and items."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [] if old == new else [f"{where or 'schema'} changed"]
+    reasons = []
+    if _type(old) != _type(new):
+        reasons.append(f"{where or 'type'} changed from {_type(old)} to {_type(new)}")
+    old_enum, new_enum = old.get('enum'), new.get('enum')
+    if old_enum is not None and new_enum is not None:
+        removed = sorted(set(map(str, old_enum)) - set(map(str, new_enum)))
+        if removed:
+            reasons.append(f"{where or 'enum'} no longer allows {', '.join(removed)}")
+    elif new_enum is not None:
+        reasons.append(f"{where or 'value'} restricted to an enum")
+    for name in sorted(set(new.get('required') or []) - set(old.get('required') or [])):
+        reasons.append(f"{where}.{name} became required" if where else f"{name} became required")
+    old_properties, new_properties = old.get('properties') or {}, new.get('properties') or {}
+    for name in sorted(old_properties):
+        path = f"{where}.{name}" if where else name
+        if name not in new_properties:
+            reasons.append(f"{path} removed")
+        else:
+            reasons += schema_changes(old_properties[name], new_properties[name], path)
+    if 'items' in old or 'items' in new:
+        reasons += schema_changes(old.get('items'), new.get('items'), f"{where}[]")
+    return reasons
+
+def _body_schema(body):
+    content = (body or {}).get('content') if isinstance(body, dict) else None
+    return {media: (media_type or {}).get('schema') for media, media_type in (content or {}).items()} \
+        if isinstance(content, dict) else {}
+
+def classify(category, kind, old, new):
+    """Returns (breaking, detail) for a change of a subtree of the given category."""
+    if category == 'example' or category == 'other':
+        return False, ''
+    if kind == 'added':
+        if category == 'parameter' and isinstance(new, dict) and new.get('required'):
+            return True, 'new required parameter'
+        if category == 'request_body' and isinstance(new, dict) and new.get('required'):
+            return True, 'new required request body'
+        return False, ''
+    if kind == 'removed':
+        return category in ('path', 'operation', 'parameter', 'response', 'schema', 'request_body'), ''
+
+    reasons = []
+    if category == 'parameter' and isinstance(old, dict) and isinstance(new, dict):
+        if new.get('required') and not old.get('required'):
+            reasons.append('became required')
+        if old.get('in') != new.get('in'):
+            reasons.append(f"moved from {old.get('in')} to {new.get('in')}")
+        reasons += schema_changes(old.get('schema'), new.get('schema'))
+    elif category in ('request_body', 'response'):
+        if category == 'request_body' and isinstance(new, dict) and new.get('required') \
+                and not (old or {}).get('required'):
+            reasons.append('became required')
+        old_schemas, new_schemas = _body_schema(old), _body_schema(new)
+        for media in sorted(old_schemas):
+            if media not in new_schemas:
+                reasons.append(f"{media} removed")
+            else:
+                reasons += [f"{media} {reason}" for reason in schema_changes(old_schemas[media], new_schemas[media])]
+    elif category == 'schema':
+        reasons = schema_changes(old, new)
+    return bool(reasons), '; '.join(reasons)
+
+def _category(location):
+    """The category of the subtree at a location (a tuple of keys from the root)."""
+    if location[0] == 'paths':
+        if len(location) == 2:
+            return 'path'
+        if len(location) == 3:
+            return 'operation' if location[2] in METHODS else 'parameter' if location[2] == 'parameters' else 'other'
+        if location[3:4] == ('parameters',) or location[2] == 'parameters':
+            return 'parameter'
+        if location[3:4] == ('responses',):
+            return 'response'
+        if location[3:4] == ('requestBody',):
+            return 'request_body'
+        return 'other'
+    if location[0] == 'components' and len(location) >= 3:
+        return {'schemas': 'schema', 'examples': 'example', 'parameters': 'parameter',
+                'responses': 'response', 'requestBodies': 'request_body'}.get(location[1], 'other')
+    return 'other'
+
+def _value(node):
+    """The document value of a subtree, rebuilt from the leaves (only needed for added/removed branches)."""
+    if node.children is None:
+        return node.value
+    return {key: _value(child) for key, child in node.children.items()}
+
+def _resolve(value, root):
+    """
+    Returns the component a parameter or request body given as a $ref points
+    to, looked up in the hashed document `root`, or the value itself.
+    """
+    ref = value.get('$ref') if isinstance(value, dict) else None
+    if not isinstance(ref, str) or not ref.startswith(COMPONENT_REFS):
+        return value
+    node = root
+    for key in ref[2:].split('/', 2):
+        node = node.children.get(key) if node is not None and node.children is not None else None
+    return value if node is None else _value(node)
+
+def _change(kind, location, old, new, roots):
+    category = _category(location)
+    if category in ('parameter', 'request_body'):
+        breaking, detail = classify(category, kind, _resolve(old, roots[0]), _resolve(new, roots[1]))
+    else:
+        breaking, detail = classify(category, kind, old, new)
+    change = {'kind': kind, 'category': category, 'location': list(location), 'breaking': breaking}
+    if location[0] == 'paths' and len(location) >= 2:
+        change['path'] = location[1]
+        if len(location) >= 3 and location[2] in METHODS:
+            change['method'] = location[2]
+    if detail:
+        change['detail'] = detail
+    return change
+
+def _walk(old, new, location, changes, stats, roots):
+    stats['compared'] += 1
+    if old.digest == new.digest:
+        stats['skipped'] += 1
+        return
+    if len(location) == 3 and location[0] == 'paths' and location[2] in METHODS:
+        old, new = hash_operation(old.value), hash_operation(new.value)
+    if old.children is None or new.children is None:
+        # Leaves, or a leaf replaced by a branch
+        changes.append(_change('modified', location, _value(old), _value(new), roots))
+        return
+    for key in old.children:
+        if key not in new.children:
+            changes.extend(_expand('removed', location + (key,), old.children[key], roots))
+    for key, child in new.children.items():
+        if key not in old.children:
+            changes.extend(_expand('added', location + (key,), child, roots))
+        else:
+            _walk(old.children[key], child, location + (key,), changes, stats, roots)
+
+def _expand(kind, location, node, roots):
+    """Reports a whole added or removed subtree once, or per entry for containers such as 'parameters'."""
+    container = len(location) == 1 or location[-1] in ('parameters', 'responses') \
+        or (location[0] == 'components' and len(location) == 2)
+    if node.children is not None and container:
+        for key, child in node.children.items():
+            yield from _expand(kind, location + (key,), child, roots)
+        return
+    value = _value(node)
+    yield _change(kind, location, None if kind == 'added' else value, value if kind == 'added' else None, roots)
+
+def diff_trees(old_tree, new_tree):
+    """Returns the changes between two hashed documents and how many subtrees were compared and skipped."""
+    changes, stats = [], {'compared': 0, 'skipped': 0}
+    # Parameters and request bodies given as $refs are classified as the components they point to
+    _walk(old_tree, new_tree, (), changes, stats, (old_tree, new_tree))
+    return changes, stats
+
+def diff(old_data, new_data):
+    """
+    Returns the change report between two OpenAPI documents: a summary of the
+    counts, the statistics of the walk, and the changes sorted by location.
+    """
+    with instrumentation.phase('diff.hash'):
+        old_tree, new_tree = hash_tree(old_data), hash_tree(new_data)
+    with instrumentation.phase('diff.walk'):
+        changes, stats = diff_trees(old_tree, new_tree)
+    instrumentation.count('diff.subtrees_compared', stats['compared'])
+    changes.sort(key=lambda change: [str(key) for key in change['location']])
+    summary = {kind: sum(change['kind'] == kind for change in changes) for kind in ('added', 'removed', 'modified')}
+    summary['breaking'] = sum(change['breaking'] for change in changes)
+    summary['non_breaking'] = len(changes) - summary['breaking']
+    return {'summary': summary, 'stats': stats, 'changes': changes}
+
+def _title(change):
+    location = change['location']
+    if 'path' in change:
+        rest = location[3:] if 'method' in change else location[2:]
+        name = f"{change['method'].upper()} {change['path']}" if 'method' in change else change['path']
+        return name + (f" {' '.join(str(key) for key in rest)}" if rest else '')
+    return ' '.join(str(key) for key in location)
+
+def to_markdown(report, title='OpenAPI changes'):
+    """Renders a change report as Markdown: the summary, then the breaking and the other changes by category."""
+    summary = report['summary']
+    lines = [f"# {title}", "",
+             f"{summary['added']} added, {summary['removed']} removed, {summary['modified']} modified; "
+             f"**{summary['breaking']} breaking**, {summary['non_breaking']} non-breaking.", ""]
+    for breaking, heading in ((True, 'Breaking changes'), (False, 'Non-breaking changes')):
+        selected = [change for change in report['changes'] if change['breaking'] == breaking]
+        if not selected:
+            continue
+        lines += [f"## {heading}", ""]
+        categories = sorted({change['category'] for change in selected})
+        for category in categories:
+            lines += [f"### {category.replace('_', ' ').capitalize()}", ""]
+            for change in selected:
+                if change['category'] == category:
+                    detail = f": {change['detail']}" if change.get('detail') else ''
+                    lines.append(f"- {change['kind']} `{_title(change)}`{detail}")
+            lines.append("")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report the changes between two versions of openapi.yaml.')
+    parser.add_argument('old', help='previous openapi.yaml')
+    parser.add_argument('new', nargs='?', default=update_openapi.OPENAPI_FILE,
+                        help=f'new openapi.yaml (default: {update_openapi.OPENAPI_FILE})')
+    parser.add_argument('--output', default=REPORT_FILE, help='JSON change report')
+    parser.add_argument('--markdown', default=MARKDOWN_FILE, help='Markdown change report')
+    parser.add_argument('--fail-on-breaking', action='store_true', help='exit with 1 if a change is breaking')
+    instrumentation.add_arguments(parser, 'openapi_diff_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        with instrumentation.phase('diff.load'):
+            old_data = update_openapi.load_yaml_file(args.old)
+            new_data = update_openapi.load_yaml_file(args.new)
+        report = diff(old_data, new_data)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    with open(args.markdown, 'w', encoding='utf-8') as f:
+        f.write(to_markdown(report, f"Changes from {args.old} to {args.new}"))
+
+    summary = report['summary']
+    print(f"{summary['added']} added, {summary['removed']} removed, {summary['modified']} modified "
+          f"({summary['breaking']} breaking). See {args.output} and {args.markdown}.")
+    return 1 if args.fail_on_breaking and summary['breaking'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
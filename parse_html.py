@@ -1,71 +1,147 @@
 import json
-from bs4 import BeautifulSoup
+import argparse
+import html_extract
+import instrumentation
+import sources
+from html_extract import etree
+
+instrumentation.track_rate('html.sections', 'html.parse')
+
+def _endpoint_from_section(heading_text, table_rows, examples):
+    """Builds an endpoint from a heading text, parameter rows and example texts."""
+    instrumentation.count('html.sections')
+    endpoint_data = {
+        'path': '',
+        'method': '',
+        'parameters': [],
+        'responses': {}
+    }
+
+    # Extract endpoint path and method from the panel-heading div
+    text = heading_text.strip()
+    if 'GET /' in text or 'POST /' in text:
+        parts = text.split()
+        endpoint_data['method'] = parts[0]
+        endpoint_data['path'] = parts[1]
+
+        for param_name, param_description in table_rows:
+            endpoint_data['parameters'].append({
+                'name': param_name,
+                'in': 'query',
+                'description': param_description,
+                'schema': {'type': 'string'}
+            })
+
+        for example in examples:
+            try:
+                # Assuming the example is for a 200 response
+                response_body = json.loads(example)
+                endpoint_data['responses']['200'] = {
+                    'description': 'Successful response',
+                    'content': {
+                        'application/json': {
+                            'example': response_body
+                        }
+                    }
+                }
+            except json.JSONDecodeError:
+                # Handle cases where the example is not valid JSON
+                pass
+
+    return endpoint_data
 
 def parse_html_docs(html_content):
-    soup = BeautifulSoup(html_content, 'lxml')
+    """Returns the endpoints of the page; html_content is a str or a UTF-8 bytes-like object (e.g. a mapping)."""
+    if etree is None:
+        return _parse_html_docs_soup(html_content)
+
+    root = etree.fromstring(html_content, etree.HTMLParser(encoding='utf-8'))
     endpoints = []
 
-    for panel_heading in soup.find_all('div', class_='panel-heading'):
-        endpoint_data = {
-            'path': '',
-            'method': '',
-            'parameters': [],
-            'responses': {}
-        }
-
-        # Extract endpoint path and method from the panel-heading div
-        text = panel_heading.get_text().strip()
-        if 'GET /' in text or 'POST /' in text:
-            parts = text.split()
-            endpoint_data['method'] = parts[0]
-            endpoint_data['path'] = parts[1]
-
-            # Find the panel-body which should contain parameters
-            panel_body = panel_heading.find_next_sibling('div', class_='panel-body')
-            if panel_body:
-                table = panel_body.find('table')
-                if table:
-                    for row in table.find_all('tr')[1:]:  # Skip header row
-                        cols = row.find_all('td')
-                        if len(cols) >= 2:
-                            param_name = cols[0].get_text(strip=True)
-                            param_description = cols[1].get_text(strip=True)
-                            endpoint_data['parameters'].append({
-                                'name': param_name,
-                                'in': 'query',
-                                'description': param_description,
-                                'schema': {'type': 'string'}
-                            })
+    for panel_heading, panel_body in html_extract.iter_panel_sections(root):
+        table_rows, examples = [], []
+        if panel_body is not None:
+            # Find the table in the panel-body which should contain parameters
+            table = next(panel_body.iter('table'), None)
+            if table is not None:
+                for row in list(table.iter('tr'))[1:]:  # Skip header row
+                    cols = list(row.iter('td'))
+                    if len(cols) >= 2:
+                        table_rows.append((html_extract.text(cols[0], strip=True),
+                                           html_extract.text(cols[1], strip=True)))
 
             # Find response examples
-            if panel_body:
-                for h3 in panel_body.find_all('h3'):
-                    if 'Example' in h3.get_text():
-                        pre = h3.find_next_sibling('pre')
+            for h3 in panel_body.iter('h3'):
+                if 'Example' in html_extract.text(h3):
+                    pre = html_extract.next_sibling(h3, 'pre')
+                    if pre is not None:
+                        examples.append(html_extract.text(pre))
+
+        endpoint_data = _endpoint_from_section(html_extract.text(panel_heading), table_rows, examples)
+        if endpoint_data['path']:
+            endpoints.append(endpoint_data)
+
+    instrumentation.count('html.endpoints', len(endpoints))
+    return endpoints
+
+def parse_html_file(file_path, jobs=1):
+    """
+    Returns the endpoints of a page file. With `jobs` other than 1, the
+    resource panels are parsed in that many processes (None: one per CPU);
+    the endpoints are the same.
+    """
+    if etree is not None and jobs != 1:
+        endpoints = html_extract.parse_sharded(file_path, parse_html_docs, jobs)
+        if endpoints is not None:
+            return endpoints
+    with sources.mapped(file_path) as html:
+        return parse_html_docs(html)
+
+def _parse_html_docs_soup(html_content):
+    """BeautifulSoup implementation of `parse_html_docs`, used when lxml is not installed."""
+    from bs4 import BeautifulSoup
+
+    if not isinstance(html_content, (str, bytes)):
+        html_content = bytes(html_content)
+    soup = BeautifulSoup(html_content, 'html.parser')
+    endpoints = []
+
+    for panel_heading in soup.find_all('div', class_='panel-heading'):
+        table_rows, examples = [], []
+        panel_body = panel_heading.find_next_sibling('div', class_='panel-body')
+        if panel_body:
+            table = panel_body.find('table')
+            if table:
+                for row in table.find_all('tr')[1:]:  # Skip header row
+                    cols = row.find_all('td')
+                    if len(cols) >= 2:
+                        table_rows.append((cols[0].get_text(strip=True), cols[1].get_text(strip=True)))
+
+            for h3 in panel_body.find_all('h3'):
+                if 'Example' in h3.get_text():
+                    pre = h3.find_next_sibling('pre')
                     if pre:
-                        try:
-                            # Assuming the example is for a 200 response
-                            response_body = json.loads(pre.get_text())
-                            endpoint_data['responses']['200'] = {
-                                'description': 'Successful response',
-                                'content': {
-                                    'application/json': {
-                                        'example': response_body
-                                    }
-                                }
-                            }
-                        except json.JSONDecodeError:
-                            # Handle cases where the example is not valid JSON
-                            pass
+                        examples.append(pre.get_text())
 
+        endpoint_data = _endpoint_from_section(panel_heading.get_text(), table_rows, examples)
         if endpoint_data['path']:
             endpoints.append(endpoint_data)
 
+    instrumentation.count('html.endpoints', len(endpoints))
     return endpoints
 
-if __name__ == '__main__':
-    with open('kix_api_docs.html', 'r') as f:
-        html = f.read()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parse the API sections of kix_api_docs.html and print them as JSON.')
+    parser.add_argument('--input', default='kix_api_docs.html', help='raml2html page to parse')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for parsing the resources in parallel')
+    instrumentation.add_arguments(parser, 'parse_html_profile.json')
+    args = parser.parse_args(argv)
 
-    api_endpoints = parse_html_docs(html)
-    print(json.dumps(api_endpoints, indent=2))
\ No newline at end of file
+    with instrumentation.profiling(args):
+        with instrumentation.phase('html.parse'):
+            api_endpoints = parse_html_file(args.input, args.jobs)
+        print(json.dumps(api_endpoints, indent=2))
+    return api_endpoints
+
+if __name__ == '__main__':
+    main()
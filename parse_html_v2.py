@@ -1,72 +1,159 @@
-import json
-from bs4 import BeautifulSoup
+import argparse
+import artifacts
+import html_extract
+import instrumentation
+import records
+from html_extract import etree, RESOURCE_PANEL_CLASS, RESOURCE_MODAL_CLASS
+
+def parse_html(file_path, jobs=1):
+    """
+    Returns the endpoint records (records.Endpoint) of every resource-modal
+    of the page. With `jobs` other than 1, the resource panels are parsed in
+    that many processes (None: one per CPU); the records are the same.
+    """
+    if etree is None:
+        return _parse_html_soup(file_path)
+    if jobs != 1:
+        endpoints = html_extract.parse_sharded(file_path, _parse_range, jobs)
+        if endpoints is not None:
+            # Share what the workers built separately
+            table = records.RecordTable()
+            return [table.endpoint(*endpoint) for endpoint in endpoints]
+    return list(html_extract.iter_modal_records(html_extract.parse_document(file_path)))
+
+def _parse_range(content):
+    """Returns the records of a fragment of the page holding whole resource panels."""
+    return list(html_extract.iter_modal_records(etree.fromstring(content, etree.HTMLParser(encoding='utf-8'))))
+
+def _parse_html_soup(file_path):
+    """BeautifulSoup implementation of `parse_html`, used when lxml is not installed."""
+    from bs4 import BeautifulSoup
 
-def parse_html(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
 
-    soup = BeautifulSoup(html_content, 'lxml')
+    soup = BeautifulSoup(html_content, 'html.parser')
     api_data = []
 
     for resource_panel in soup.find_all('div', class_='panel panel-default resource'):
         for method_panel in resource_panel.find_all('div', class_='panel panel-white resource-modal'):
-            h4_title = method_panel.find('h4', class_='panel-title')
-            if not h4_title:
-                continue
-
-            path_tags = h4_title.find_all('span', class_='uri')
-            path = ''.join(tag.text for tag in path_tags).strip()
-
-            methods = [span.text.strip() for span in h4_title.find_all('span', class_=['badge_get', 'badge_post', 'badge_patch', 'badge_delete'])]
-
-            modal = method_panel.find('div', class_='modal')
-            if not modal:
-                continue
-
-            # Extract query parameters
-            query_params = []
-            param_table = modal.find('table', class_='param-table')
-            if param_table:
-                for row in param_table.find('tbody').find_all('tr'):
-                    cols = row.find_all('td')
-                    if len(cols) >= 4:
-                        param_name = cols[0].text.strip()
-                        param_type = cols[2].text.strip()
-                        param_desc = cols[4].text.strip()
-                        query_params.append({
-                            'name': param_name,
-                            'type': param_type,
-                            'description': param_desc
-                        })
-
-            # Extract response examples
-            response_examples = []
-            for response_div in modal.find_all('div', class_='response'):
-                status_code_tag = response_div.find_previous_sibling('h2', class_='response-title')
-                if status_code_tag:
-                    status_code_text = status_code_tag.text.strip()
-                    status_code = status_code_text.split(' ')[-1]
-
-                    example_pre = response_div.find('div', class_='examples toggleable')
-                    if example_pre:
-                        example_code = example_pre.find('code')
-                        if example_code:
-                            response_examples.append({
-                                'status_code': status_code,
-                                'example': example_code.text.strip()
-                            })
-
-            for method in methods:
-                api_data.append({
-                    'path': path,
-                    'method': method.upper(),
-                    'query_params': query_params,
-                    'response_examples': response_examples
+            api_data.extend(_extract_modal_soup(method_panel))
+
+    return records.html_endpoints(api_data)
+
+def _extract_modal_soup(method_panel):
+    """Returns the endpoint records of one resource-modal BeautifulSoup tag, in their JSON form."""
+    instrumentation.count('html.modals')
+    h4_title = method_panel.find('h4', class_='panel-title')
+    if not h4_title:
+        return []
+
+    path_tags = h4_title.find_all('span', class_='uri')
+    path = ''.join(tag.text for tag in path_tags).strip()
+
+    methods = [span.text.strip() for span in h4_title.find_all('span', class_=['badge_get', 'badge_post', 'badge_patch', 'badge_delete'])]
+
+    modal = method_panel.find('div', class_='modal')
+    if not modal:
+        return []
+
+    # Extract query parameters
+    query_params = []
+    param_table = modal.find('table', class_='param-table')
+    if param_table:
+        for row in param_table.find('tbody').find_all('tr'):
+            cols = row.find_all('td')
+            if len(cols) >= 4:
+                param_name = cols[0].text.strip()
+                param_type = cols[2].text.strip()
+                param_desc = cols[4].text.strip()
+                query_params.append({
+                    'name': param_name,
+                    'type': param_type,
+                    'description': param_desc
                 })
 
-    return api_data
+    # Extract response examples
+    response_examples = []
+    for response_div in modal.find_all('div', class_='response'):
+        status_code_tag = response_div.find_previous_sibling('h2', class_='response-title')
+        if status_code_tag:
+            status_code_text = status_code_tag.text.strip()
+            status_code = status_code_text.split(' ')[-1]
+
+            example_pre = response_div.find('div', class_='examples toggleable')
+            if example_pre:
+                example_code = example_pre.find('code')
+                if example_code:
+                    response_examples.append({
+                        'status_code': status_code,
+                        'example': example_code.text.strip()
+                    })
+
+    instrumentation.count('html.endpoints', len(methods))
+    return [{
+        'path': path,
+        'method': method.upper(),
+        'query_params': query_params,
+        'response_examples': response_examples
+    } for method in methods]
+
+def iter_endpoints(file_path):
+    """
+    Yields endpoint records one resource-modal at a time.
+
+    The document is parsed incrementally with lxml's iterparse, so only the
+    modal currently being processed is kept in memory; every finished subtree
+    is cleared and detached from its parent as soon as its end tag is seen.
+    The records are identical to the ones returned by `parse_html`.
+    """
+    resource_depth = 0
+    modal_depth = 0
+    table = records.RecordTable()
+    for event, elem in etree.iterparse(file_path, events=('start', 'end'), tag='div', html=True, encoding='utf-8'):
+        is_resource = html_extract.class_is(elem, RESOURCE_PANEL_CLASS)
+        is_modal = resource_depth > 0 and html_extract.class_is(elem, RESOURCE_MODAL_CLASS)
+
+        if event == 'start':
+            resource_depth += is_resource
+            modal_depth += is_modal
+            continue
+
+        if is_modal:
+            modal_depth -= 1
+            yield from html_extract.extract_modal(elem, table)
+        resource_depth -= is_resource
+
+        # Everything outside an open modal is finished and can be discarded.
+        if modal_depth == 0:
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            while parent is not None and elem.getprevious() is not None:
+                del parent[0]
+
+def parse_html_streaming(file_path):
+    """Same as `parse_html`, built on the incremental `iter_endpoints` parser."""
+    return list(iter_endpoints(file_path))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parse the raml2html documentation into parsed_api_v2.json.')
+    parser.add_argument('--input', default='kix_api_docs.html', help='raml2html page to parse')
+    parser.add_argument('--output', default='parsed_api_v2.json', help='file to write the endpoint records to')
+    parser.add_argument('--stream', action='store_true', help='use the incremental, low-memory parser')
+    parser.add_argument('--jobs', type=int, default=1, help='worker processes for parsing the resources in parallel')
+    artifacts.add_arguments(parser)
+    instrumentation.add_arguments(parser, 'parse_html_v2_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        with instrumentation.phase('html.parse'):
+            if args.stream:
+                parsed_data = parse_html_streaming(args.input)
+            else:
+                parsed_data = parse_html(args.input, args.jobs)
+        with instrumentation.phase('html.write_json'):
+            artifacts.write(list(map(records.html_json, parsed_data)), args.output, **artifacts.options(args))
+    return parsed_data
 
 if __name__ == '__main__':
-    parsed_data = parse_html('kix_api_docs.html')
-    with open('parsed_api_v2.json', 'w') as f:
-        json.dump(parsed_data, f, indent=4)
\ No newline at end of file
+    main()
@@ -1,79 +1,605 @@
 import os
+import re
 import yaml
 import json
+import yaml_backend
+import pickle
+import records
+import sources
+import hashlib
+import argparse
+import artifacts
 import traceback
+import instrumentation
 from pathlib import Path
-from collections.abc import MutableMapping
-
-def deep_merge(d1, d2):
-    """Merges d2 into d1, modifying d1 in-place."""
-    for k, v in d2.items():
-        if k in d1 and isinstance(d1[k], dict) and isinstance(v, MutableMapping):
-            deep_merge(d1[k], v)
-        else:
-            d1[k] = v
-    return d1
 
 BASE_DIR = Path('/tmp/kix-backend/doc/API/V1/')
-file_cache = {}
+CACHE_FILE = Path('.raml_parse_cache.pickle')
+# The path of an !include: quoted (and then it may hold spaces) or bare
+INCLUDE_PATTERN = re.compile(rb'''!include\s+(?:"([^"]+)"|'([^']+)'|([^\s"'#,\]}]+))''')
+# Mapped RAML files. Every mapping holds a file descriptor, so the cache is
+# bounded well below the usual limit of 1024 open files.
+FILE_CACHE_SIZE = 256
+file_cache = sources.LRUCache(FILE_CACHE_SIZE, 'raml.file_cache')
+
+# Resolved files as {path: (content key, pickled object)}. Unpickling hands
+# every !include a fresh copy, so later in-place merges never leak between
+# resources that include the same file.
+parse_cache = {}
+# Content keys of the files reachable from the entry file in the current run.
+include_keys = {}
+# sha256 of the content of every file seen by discover_includes (None if missing),
+# so the keys can be computed after the files have left file_cache.
+content_digests = {}
 
 def get_local_file_content_cached(file_path: Path):
-    """Fetches content from a local file, using a cache to avoid re-reads."""
+    """
+    Returns a read-only mapping of a local file, or None if it does not
+    exist. Recently used files are served from file_cache.
+    """
     str_path = str(file_path)
     if str_path in file_cache:
+        instrumentation.count('raml.file_cache.hits')
         return file_cache[str_path]
 
+    instrumentation.count('raml.file_cache.misses')
     if not file_path.is_file():
         return None
 
-    content = file_path.read_text(encoding='utf-8')
+    content = sources.map_file(file_path)
     file_cache[str_path] = content
     return content
 
-class CustomLoader(yaml.SafeLoader):
+class CustomLoader(yaml_backend.SafeLoader):
     """Custom YAML loader to keep track of the current file's directory."""
     pass
 
-def include_constructor(loader, node):
-    """Handles !include tags by resolving the path and parsing the content."""
-    include_path_str = loader.construct_scalar(node)
-    new_file_path = (loader.current_dir / include_path_str).resolve()
+class IncludeRef:
+    """Placeholder for an !include that is resolved after all files have been parsed."""
+    __slots__ = ('path',)
 
-    content = get_local_file_content_cached(new_file_path)
-    if content is None: return None
+    def __init__(self, path):
+        self.path = path
 
-    if new_file_path.suffix in ['.yaml', '.raml']:
+class DeferredIncludeLoader(CustomLoader):
+    """Loader that records !include tags as IncludeRef placeholders instead of following them."""
+    pass
+
+def parse_included_content(content, file_path: Path, loader_class=CustomLoader):
+    """
+    Parses the (bytes-like) content of an included file according to its
+    suffix; other files and files that do not parse are included as text.
+    """
+    if file_path.suffix in ['.yaml', '.raml']:
         try:
-            return load_yaml_with_context(content, new_file_path)
+            return load_yaml_with_context(content, file_path, loader_class)
         except yaml.YAMLError:
-            return content
-    elif new_file_path.suffix == '.json':
+            pass
+    elif file_path.suffix == '.json':
         try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            return content
-    else:
-        return content
+            return json.loads(bytes(content))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass
+    return str(content, 'utf-8')
+
+def load_file_cached(file_path: Path, parse):
+    """Returns parse(content, file_path), served from parse_cache while the file's content key matches."""
+    str_path = str(file_path)
+    key = include_keys.get(str_path)
+    cached = parse_cache.get(str_path)
+    if key is not None and cached is not None and cached[0] == key:
+        instrumentation.count('raml.parse_cache.hits')
+        return pickle.loads(cached[1])
+
+    content = get_local_file_content_cached(file_path)
+    if content is None: return None
+
+    instrumentation.count('raml.parse_cache.misses')
+    return parse(content, file_path)
+
+def include_constructor(loader, node):
+    """Handles !include tags by resolving the path and parsing the content."""
+    include_path_str = loader.construct_scalar(node)
+    new_file_path = (loader.current_dir / include_path_str).resolve()
+    return load_file_cached(new_file_path, parse_included_content)
+
+def deferred_include_constructor(loader, node):
+    """Handles !include tags by recording the resolved path only."""
+    include_path_str = loader.construct_scalar(node)
+    return IncludeRef(str((loader.current_dir / include_path_str).resolve()))
 
 yaml.add_constructor('!include', include_constructor, Loader=CustomLoader)
+yaml.add_constructor('!include', deferred_include_constructor, Loader=DeferredIncludeLoader)
 
-def load_yaml_with_context(content, file_path: Path):
+def load_yaml_with_context(content, file_path: Path, loader_class=CustomLoader):
     """Loads YAML content using a loader that has file path context."""
-    loader = CustomLoader(content)
+    # The loaders take str or bytes, not other buffers
+    loader = loader_class(content if isinstance(content, (str, bytes)) else bytes(content))
     loader.current_dir = file_path.parent
     try:
         return loader.get_single_data()
     finally:
         loader.dispose()
 
-def get_resolved_raml(entry_file: Path):
-    """Parses a RAML file from the local filesystem, resolving all !include tags."""
+def content_digest(str_path):
+    """Returns the sha256 of a file's content, or None if it does not exist."""
+    if str_path not in content_digests:
+        content = get_local_file_content_cached(Path(str_path))
+        content_digests[str_path] = None if content is None else hashlib.sha256(content).digest()
+    return content_digests[str_path]
+
+def discover_includes(entry_file: Path):
+    """
+    Returns the include graph {path: [included paths]} of every file reachable
+    from entry_file, and records their content digests on the way.
+    """
+    graph = {}
+    pending = [entry_file]
+    while pending:
+        file_path = pending.pop()
+        str_path = str(file_path)
+        if str_path in graph:
+            continue
+
+        content = get_local_file_content_cached(file_path)
+        content_digests[str_path] = None if content is None else hashlib.sha256(content).digest()
+        children = []
+        if content is not None and file_path.suffix in ['.yaml', '.raml']:
+            children = [str((file_path.parent / match.group(match.lastindex).decode('utf-8')).resolve())
+                        for match in INCLUDE_PATTERN.finditer(content)]
+        graph[str_path] = children
+        pending.extend(Path(child) for child in children)
+    return graph
+
+def compute_include_keys(graph):
+    """
+    Computes a content key per file: a hash of its path, its content and the keys
+    of everything it includes, so a key changes whenever anything below it does.
+    Files on an include cycle get no key and are never cached.
+
+    Returns the keys and the files in dependency order (includes first).
+    """
+    keys = {}
+    order = []
+    for root in graph:
+        stack = [(root, False)]
+        visiting = set()
+        while stack:
+            path, children_done = stack.pop()
+            if path in keys:
+                continue
+            if not children_done:
+                if path in visiting:
+                    keys[path] = None
+                    continue
+                visiting.add(path)
+                stack.append((path, True))
+                stack.extend((child, False) for child in graph[path] if child not in keys)
+                continue
+
+            visiting.discard(path)
+            order.append(path)
+            child_keys = [keys.get(child) for child in graph[path]]
+            if None in child_keys:
+                keys[path] = None
+                continue
+            file_digest = content_digest(path)
+            digest = hashlib.sha256(path.encode('utf-8'))
+            digest.update(b'\0missing' if file_digest is None else b'\0' + file_digest)
+            for child_key in child_keys:
+                digest.update(b'\0' + child_key.encode('ascii'))
+            keys[path] = digest.hexdigest()
+    return keys, order
+
+def _parse_file(str_path):
+    """Process pool worker: parses one file with its includes left as IncludeRef placeholders."""
+    with sources.mapped(str_path) as content:
+        data = parse_included_content(content, Path(str_path), DeferredIncludeLoader)
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+def _substitute_includes(data, seen):
+    """Replaces the IncludeRef placeholders in data by the (cached) included content."""
+    if isinstance(data, IncludeRef):
+        return load_file_cached(Path(data.path), parse_included_content)
+    if id(data) in seen:
+        return data
+    if isinstance(data, dict):
+        seen.add(id(data))
+        for k, v in data.items():
+            data[k] = _substitute_includes(v, seen)
+    elif isinstance(data, list):
+        seen.add(id(data))
+        for i, v in enumerate(data):
+            data[i] = _substitute_includes(v, seen)
+    return data
+
+def resolve_include_graph(graph, order, jobs=None):
+    """
+    Fills parse_cache with the fully resolved content of every file in graph.
+
+    All files that are not cached under their current key are parsed in a
+    process pool, each on its own with placeholders for its includes; the
+    workers map the files themselves rather than being sent their content. The
+    placeholders are then filled in dependency order from the entries of the
+    included files, which are already resolved at that point.
+    """
+    stale = [path for path in order
+             if include_keys.get(path) is not None and os.path.isfile(path)
+             and parse_cache.get(path, (None,))[0] != include_keys[path]]
+    if not stale:
+        return
+
+    if jobs == 1 or len(stale) < 2:
+        blobs = list(map(_parse_file, stale))
+    else:
+        # Imported only here: it pulls in multiprocessing, a large part of the startup time
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(stale) // ((jobs or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            blobs = list(executor.map(_parse_file, stale, chunksize=chunksize))
+
+    instrumentation.count('raml.parse_cache.misses', len(stale))
+    for path, blob in zip(stale, blobs):
+        if graph[path]:
+            data = _substitute_includes(pickle.loads(blob), set())
+            blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        parse_cache[path] = (include_keys[path], blob)
+
+def load_parse_cache(cache_file: Path):
+    """Loads the persistent parse cache written by a previous run, if there is a usable one."""
+    try:
+        with open(cache_file, 'rb') as f:
+            entries = pickle.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError, ImportError) as e:
+        print(f"Ignoring unreadable parse cache {cache_file}: {e}")
+        return
+    if isinstance(entries, dict):
+        parse_cache.update(entries)
+    else:
+        print(f"Ignoring unreadable parse cache {cache_file}: not a cache of this script")
+
+def save_parse_cache(cache_file: Path, graph):
+    """Writes the cache entries of the files in graph, dropping entries of files no longer included."""
+    entries = {path: entry for path, entry in parse_cache.items() if path in graph}
+    tmp_file = Path(f"{cache_file}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        tmp_file.unlink(missing_ok=True)
+        print(f"Could not write parse cache {cache_file}: {e}")
+
+def get_resolved_raml(entry_file: Path, jobs=None, cache_file=None):
+    """
+    Parses a RAML file from the local filesystem, resolving all !include tags.
+
+    Resolution runs in two phases. The include graph is discovered first and
+    every file in it is parsed in a process pool; the includes are then
+    stitched together bottom-up. With a cache_file, the resolved content of
+    each file is persisted between runs keyed by path and content hash, so
+    unchanged files are neither parsed nor resolved again.
+    """
     print("Resolving main RAML file from local clone...")
-    content = get_local_file_content_cached(entry_file)
-    return load_yaml_with_context(content, entry_file)
+    if cache_file:
+        load_parse_cache(cache_file)
+
+    entry_file = entry_file.resolve()
+    with instrumentation.phase('raml.discover_includes'):
+        graph = discover_includes(entry_file)
+        keys, order = compute_include_keys(graph)
+    instrumentation.count('raml.files', len(graph))
+    include_keys.update(keys)
+    with instrumentation.phase('raml.parse_includes'):
+        resolve_include_graph(graph, order, jobs)
+        raml_data = load_file_cached(entry_file, load_yaml_with_context)
+
+    if cache_file:
+        save_parse_cache(cache_file, graph)
+    return raml_data
+
+class FrozenDict(dict):
+    """A dict that refuses in-place changes; used for shared, resolved RAML definitions."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("resolved RAML definitions are shared and read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+class FrozenList(list):
+    """A list that refuses in-place changes; used for shared, resolved RAML definitions."""
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("resolved RAML definitions are shared and read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+def merged(base, override, _depth=1):
+    """
+    Returns base deep-merged with override, without modifying either: nested
+    dicts are merged, any other value of override replaces that of base.
+    """
+    if instrumentation.detailed:
+        instrumentation.count('raml.merge_calls')
+        instrumentation.record_max('raml.merge_depth', _depth)
+    if not isinstance(base, dict) or not isinstance(override, dict):
+        return override
+    result = dict(base)
+    for k, v in override.items():
+        if k in result and isinstance(result[k], dict) and isinstance(v, dict):
+            result[k] = merged(result[k], v, _depth + 1)
+        else:
+            result[k] = v
+    return FrozenDict(result)
+
+PARAM_PATTERN = re.compile(r'<<\s*([^|>\s]+)\s*((?:\|\s*!\w+\s*)*)>>')
+
+def singularize(value):
+    """
+    Best-effort singular of an English resource name, for the RAML
+    !singularize function: -ies becomes -y, -sses, -xes, -ches and -shes lose
+    the -es, and any other trailing s is dropped unless it follows s, u or i
+    (Address, Status and Analysis stay as they are). Irregular plurals are
+    not handled.
+    """
+    if value.endswith('ies') and len(value) > 3:
+        return value[:-3] + 'y'
+    if value.endswith(('sses', 'xes', 'ches', 'shes')):
+        return value[:-2]
+    if value.endswith('s') and not value.endswith(('ss', 'us', 'is')):
+        return value[:-1]
+    return value
+
+def _split_words(value):
+    return re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', value)
+
+PARAM_FUNCTIONS = {
+    'singularize': singularize,
+    'pluralize': lambda v: v if v.endswith('s') else v + 's',
+    'uppercase': str.upper,
+    'lowercase': str.lower,
+    'lowercamelcase': lambda v: (lambda w: w[0].lower() + ''.join(x.capitalize() for x in w[1:]) if w else v)(_split_words(v)),
+    'uppercamelcase': lambda v: ''.join(x.capitalize() for x in _split_words(v)) or v,
+    'lowerunderscorecase': lambda v: '_'.join(_split_words(v)).lower(),
+    'upperunderscorecase': lambda v: '_'.join(_split_words(v)).upper(),
+    'lowerhyphencase': lambda v: '-'.join(_split_words(v)).lower(),
+    'upperhyphencase': lambda v: '-'.join(_split_words(v)).upper(),
+}
+
+def _placeholder(match):
+    """Returns (name, functions, text) of a matched <<param | !function>> placeholder."""
+    functions = tuple(PARAM_FUNCTIONS[function] for function in re.findall(r'!(\w+)', match.group(2))
+                      if function in PARAM_FUNCTIONS)
+    return match.group(1), functions, match.group(0)
+
+def _param_value(placeholder, params):
+    name, functions, text = placeholder
+    if name not in params:
+        return text
+    value = params[name]
+    for function in functions:
+        value = function(str(value))
+    return value
+
+def compile_template(data):
+    """
+    Compiles data into a function of params that returns a frozen copy of data
+    with its RAML <<param>> placeholders replaced. Subtrees without placeholders
+    are frozen once and shared by all results.
+    """
+    constant, substitute = _compile(data)
+    if substitute is None:
+        return lambda params: constant
+    return substitute
+
+def _compile(data):
+    """Returns (frozen data, None) if data has no placeholders, else (None, substitute function)."""
+    if isinstance(data, str):
+        if '<<' not in data or not PARAM_PATTERN.search(data):
+            return data, None
+        match = PARAM_PATTERN.fullmatch(data)
+        if match:
+            placeholder = _placeholder(match)
+            return None, lambda params: _param_value(placeholder, params)
+        # Literal text and placeholders, alternating
+        parts = []
+        position = 0
+        for match in PARAM_PATTERN.finditer(data):
+            parts.extend((data[position:match.start()], _placeholder(match)))
+            position = match.end()
+        parts.append(data[position:])
+        return None, lambda params: ''.join([part if type(part) is str else str(_param_value(part, params))
+                                             for part in parts])
+
+    if isinstance(data, dict):
+        entries = [_compile(k) + _compile(v) for k, v in data.items()]
+        if all(k_sub is None and v_sub is None for _, k_sub, _, v_sub in entries):
+            return FrozenDict((k, v) for k, _, v, _ in entries), None
+        if all(k_sub is None for _, k_sub, _, _ in entries):
+            keys = [k for k, _, _, _ in entries]
+            values = [(v, v_sub) for _, _, v, v_sub in entries]
+            return None, lambda params: FrozenDict(zip(keys, [v_sub(params) if v_sub else v for v, v_sub in values]))
+        return None, lambda params: FrozenDict(
+            [(k_sub(params) if k_sub else k, v_sub(params) if v_sub else v) for k, k_sub, v, v_sub in entries])
+
+    if isinstance(data, list):
+        entries = [_compile(v) for v in data]
+        if all(v_sub is None for _, v_sub in entries):
+            return FrozenList(v for v, _ in entries), None
+        return None, lambda params: FrozenList([v_sub(params) if v_sub else v for v, v_sub in entries])
+
+    return data, None
+
+def substitute_params(data, params):
+    """Returns a frozen copy of data with RAML <<param>> placeholders replaced from params."""
+    return compile_template(data)(params)
+
+def used_params(data):
+    """Returns the names of all <<param>> placeholders used anywhere in data."""
+    if isinstance(data, str):
+        return {match.group(1) for match in PARAM_PATTERN.finditer(data)} if '<<' in data else set()
+    if isinstance(data, dict):
+        return set().union(*(used_params(k) | used_params(v) for k, v in data.items()))
+    if isinstance(data, list):
+        return set().union(*(used_params(v) for v in data))
+    return set()
+
+def _reference(ref):
+    """Splits a type or trait reference (`name` or `{name: {param: value}}`) into name and params."""
+    if isinstance(ref, dict):
+        name = list(ref.keys())[0]
+        return name, ref[name] if isinstance(ref[name], dict) else {}
+    return ref, {}
+
+def _freeze_key(params, names):
+    return tuple(sorted((name, json.dumps(params[name], sort_keys=True, default=str))
+                        for name in names if name in params))
+
+class TypeResolver:
+    """
+    Applies resourceTypes and traits to resources and methods.
+
+    Every resourceType and every trait combination is resolved once per set of
+    parameter values it actually uses; the results are memoized and handed out
+    as frozen structures, so no resource can modify a shared base definition.
+    Merging never works in place. Inheritance cycles between resourceTypes
+    raise a ValueError.
+    """
+
+    def __init__(self, resource_types, traits):
+        self.resource_types = resource_types
+        self.traits = traits
+        self._type_params = {}
+        self._trait_params = {}
+        self._templates = {}
+        self._resolved_types = {}
+        self._resolved_traits = {}
+        self._resolving = []
+
+    def _template(self, definitions, name):
+        key = (id(definitions), name)
+        if key not in self._templates:
+            self._templates[key] = compile_template(definitions[name])
+        return self._templates[key]
+
+    def _params_of_type(self, type_name):
+        """Parameter names used by a resourceType, including the ones its base types pass through."""
+        if type_name not in self._type_params:
+            if type_name in self._resolving:
+                cycle = ' -> '.join(self._resolving[self._resolving.index(type_name):] + [type_name])
+                raise ValueError(f"Cycle in resourceTypes: {cycle}")
+            self._resolving.append(type_name)
+            try:
+                type_def = self.resource_types[type_name]
+                names = used_params(type_def)
+                if isinstance(type_def, dict) and 'type' in type_def:
+                    refs = type_def['type'] if isinstance(type_def['type'], list) else [type_def['type']]
+                    for base_name, _ in map(_reference, refs):
+                        if base_name in self.resource_types:
+                            names |= self._params_of_type(base_name)
+            finally:
+                self._resolving.pop()
+            self._type_params[type_name] = names
+        return self._type_params[type_name]
+
+    def resolve_type(self, type_name, params):
+        """Returns the frozen, fully inherited definition of a resourceType for the given parameters."""
+        key = (type_name, _freeze_key(params, self._params_of_type(type_name)))
+        if key not in self._resolved_types:
+            type_def = self._template(self.resource_types, type_name)(params)
+            self._resolved_types[key] = self._apply_types(type_def, params, resource=False)
+        return self._resolved_types[key]
+
+    def _apply_types(self, definition, params, resource=True):
+        if not isinstance(definition, dict) or 'type' not in definition:
+            return definition
+
+        type_ref = definition.get('type')
+        refs = type_ref if isinstance(type_ref, list) else [type_ref]
+        bases = []
+        for type_name, type_params in map(_reference, refs):
+            if type_name in self.resource_types:
+                bases.append(self.resolve_type(type_name, {**params, **type_params}))
+        if not bases:
+            return definition
+
+        base = FrozenDict()
+        for resolved_base in bases:
+            base = merged(base, resolved_base)
+        return merged(self._optional_methods(base, definition, resource), definition)
+
+    @staticmethod
+    def _optional_methods(base, definition, resource=True):
+        """
+        Applies the `method?` keys of a resourceType to the methods the
+        definition has. The others are dropped from a resource, and kept for
+        the resources of a resourceType that inherits them.
+        """
+        if not any(isinstance(k, str) and k.endswith('?') for k in base):
+            return base
+        result = {}
+        for k, v in base.items():
+            if isinstance(k, str) and k.endswith('?'):
+                if k[:-1] in definition:
+                    result[k[:-1]] = merged(result.get(k[:-1], FrozenDict()), v)
+                elif not resource:
+                    result[k] = v
+            else:
+                result[k] = merged(result[k], v) if k in result else v
+        return FrozenDict(result)
+
+    def resolve_resource(self, path, resource_def):
+        """Returns resource_def with its resourceType(s) applied."""
+        return self._apply_types(resource_def, resource_params(path))
+
+    def _resolve_traits(self, trait_refs, params):
+        refs = []
+        for trait_name, trait_params in map(_reference, trait_refs):
+            if trait_name in self.traits and self.traits[trait_name]:
+                if trait_name not in self._trait_params:
+                    self._trait_params[trait_name] = used_params(self.traits[trait_name])
+                trait_params = {**params, **trait_params}
+                refs.append((trait_name, trait_params, _freeze_key(trait_params, self._trait_params[trait_name])))
+
+        key = tuple((trait_name, frozen) for trait_name, _, frozen in refs)
+        if key not in self._resolved_traits:
+            combined = FrozenDict()
+            for trait_name, trait_params, _ in refs:
+                combined = merged(combined, self._template(self.traits, trait_name)(trait_params))
+            self._resolved_traits[key] = combined
+        return self._resolved_traits[key]
+
+    def resolve_method(self, path, method, method_def):
+        """Returns method_def with the traits listed in its `is` applied."""
+        if not isinstance(method_def, dict) or 'is' not in method_def:
+            return method_def
+        trait_refs = method_def.get('is') or []
+        combined = self._resolve_traits(trait_refs, {**resource_params(path), 'methodName': method})
+        return merged(combined, method_def)
+
+def resource_params(path):
+    """The reserved RAML parameters of a resource: resourcePath and resourcePathName."""
+    segments = [segment for segment in path.split('/') if segment and not segment.startswith('{')]
+    return {'resourcePath': path, 'resourcePathName': segments[-1] if segments else ''}
 
 def extract_api_details(raml_data):
-    """Extracts schemas, paths, methods, parameters, and responses from the resolved RAML data."""
+    """
+    Extracts schemas, paths, methods, parameters, and responses from the
+    resolved RAML data: {"paths": {path: {method: records.Endpoint}},
+    "schemas": {...}}. records.raml_json gives raml_api_details.json.
+    """
     print("Extracting API details...")
     api_details = {"paths": {}, "schemas": {}}
     traits = raml_data.get('traits', {}) or {}
@@ -95,64 +621,44 @@ def extract_api_details(raml_data):
             }
 
     # 2. Extract path and method details, resolving inheritance
-    def resolve_resource(resource_def):
-        if not isinstance(resource_def, dict) or 'type' not in resource_def:
-            return resource_def
-
-        type_ref = resource_def.get('type')
-
-        if isinstance(type_ref, list):
-            merged_base = {}
-            for single_type_ref in type_ref:
-                type_name = list(single_type_ref.keys())[0] if isinstance(single_type_ref, dict) else single_type_ref
-                if type_name in resource_types:
-                    base_type_def = resource_types[type_name]
-                    resolved_base = resolve_resource(base_type_def)
-                    deep_merge(merged_base, resolved_base)
-            return deep_merge(merged_base, resource_def)
-
-        type_name = type_ref if isinstance(type_ref, str) else list(type_ref.keys())[0]
-        if type_name in resource_types:
-            base_type_def = resource_types[type_name]
-            resolved_base = resolve_resource(base_type_def)
-            return deep_merge(resolved_base.copy(), resource_def)
-
-        return resource_def
-
-    def resolve_method(method_def):
-        if not isinstance(method_def, dict) or 'is' not in method_def:
-            return method_def
-
-        final_def = {}
-        if method_def.get('is'):
-            for trait_ref in method_def['is']:
-                trait_name = list(trait_ref.keys())[0] if isinstance(trait_ref, dict) else trait_ref
-                if trait_name in traits and traits[trait_name]:
-                    trait_def = traits[trait_name]
-                    deep_merge(final_def, trait_def)
-
-        deep_merge(final_def, method_def)
-        return final_def
+    resolver = TypeResolver(resource_types, traits)
+    table = records.RecordTable()
+    # Resolved parameters and responses are frozen and mostly shared between
+    # methods (trait parameters, common error responses), so each object is
+    # turned into a record once
+    built = {}
+
+    def record(build, key, definition):
+        if type(definition) is not FrozenDict:
+            return build(key, definition)
+        entry = built.get((key, id(definition)))
+        if entry is None:
+            # The definition is kept, so its id is not reused
+            entry = built[(key, id(definition))] = (definition, build(key, definition))
+        return entry[1]
 
     def process_resource(path, resource_def):
         if not isinstance(resource_def, dict):
             return
 
-        resolved_res = resolve_resource(resource_def)
+        resolved_res = resolver.resolve_resource(path, resource_def)
 
         for key, value in resolved_res.items():
             if key in ['get', 'post', 'put', 'patch', 'delete']:
                 method = key
-                method_def = resolve_method(value or {})
+                method_def = resolver.resolve_method(path, method, value or {})
 
                 params = method_def.get('queryParameters')
                 responses = method_def.get('responses')
 
+                instrumentation.count('raml.endpoints')
+                parameters = [record(table.raml_parameter, name, definition)
+                              for name, definition in (params or {}).items()]
+                responses = [record(table.raml_response, code, definition)
+                             for code, definition in (responses or {}).items()]
                 path_details = api_details["paths"].setdefault(path, {})
-                path_details[method] = {
-                    "parameters": params or {},
-                    "responses": responses or {}
-                }
+                path_details[method] = table.endpoint(path, method, [p for p in parameters if p is not None],
+                                                      [r for r in responses if r is not None])
 
             elif key.startswith('/'):
                 new_path = path.rstrip('/') + key
@@ -165,28 +671,50 @@ def extract_api_details(raml_data):
     print("Finished extracting API details.")
     return api_details
 
-def main():
+def main(argv=None):
     """Main function to parse RAML and save details to JSON."""
+    parser = argparse.ArgumentParser(description='Extract API details from the KIX RAML documentation.')
+    parser.add_argument('--entry', type=Path, default=BASE_DIR / "KIX.raml", help='RAML entry file')
+    parser.add_argument('--output', default="raml_api_details.json", help='file to write the API details to')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes for parsing included files')
+    parser.add_argument('--cache-file', type=Path, default=CACHE_FILE, help='persistent parse cache')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the parse cache')
+    artifacts.add_arguments(parser)
+    instrumentation.add_arguments(parser, 'parse_raml_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        return run(args)
+
+def run(args):
+    """Resolves the RAML tree and writes its API details; returns them, or None if that failed."""
     print("Starting comprehensive RAML parsing...")
-    entry_point = BASE_DIR / "KIX.raml"
     try:
-        raml_data = get_resolved_raml(entry_point)
+        with instrumentation.phase('raml.resolve'):
+            raml_data = get_resolved_raml(args.entry, jobs=args.jobs,
+                                          cache_file=None if args.no_cache else args.cache_file)
+        print(f"Resolved {args.entry.name} in {instrumentation.phases['raml.resolve']['wall_seconds']:.3f}s "
+              f"({instrumentation.counters['raml.parse_cache.hits']} files from cache, "
+              f"{instrumentation.counters['raml.parse_cache.misses']} parsed).")
 
         if not raml_data:
             print("Failed to parse RAML data. Exiting.")
-            return
+            return None
 
-        api_details = extract_api_details(raml_data)
+        with instrumentation.phase('raml.extract_api_details'):
+            api_details = extract_api_details(raml_data)
 
-        print("Saving data to raml_api_details.json...")
-        with open("raml_api_details.json", "w") as f:
-            json.dump(api_details, f, indent=2)
+        print(f"Saving data to {args.output}...")
+        with instrumentation.phase('raml.write_json'):
+            artifacts.write(records.raml_json(api_details), args.output, **artifacts.options(args))
 
         print("Successfully extracted comprehensive API details.")
+        return api_details
 
     except Exception as e:
         print(f"An error occurred: {e}")
         traceback.print_exc()
+        return None
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
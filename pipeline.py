@@ -0,0 +1,305 @@
+import argparse
+import artifacts
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import compare_api
+import html_extract
+import instrumentation
+import parse_html_v2
+import parse_raml
+import raml_to_openapi
+import records
+import search_index
+import static_site
+import update_openapi
+import validate_examples
+import yaml_backend
+
+STATE_FILE = '.pipeline_state.json'
+HTML_FILE = 'kix_api_docs.html'
+HTML_RECORDS_FILE = 'parsed_api_v2.json'
+COMPARISON_FILE = 'comparison_output.json'
+
+# A stage of the pipeline. `inputs(options)` returns the digests of the files
+# and code the stage reads besides the outputs of its `deps`, or None if they are not
+# available. `run(options, *dep_values)` does the work and writes `outputs`;
+# `load()` reads the value back from `outputs` when the stage is skipped.
+Stage = namedtuple('Stage', ['name', 'deps', 'inputs', 'outputs', 'run', 'load'])
+
+def file_digest(file_path):
+    """Returns the sha256 of a file, or None if it does not exist."""
+    try:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def file_digests(*file_paths):
+    return [file_digest(file_path) for file_path in file_paths]
+
+def raml_tree_digest(entry_file):
+    """
+    Returns a digest of the RAML entry file and everything it includes, using
+    the content keys parse_raml computes for its parse cache.
+    """
+    entry_file = Path(entry_file).resolve()
+    if not entry_file.is_file():
+        return None
+    graph = parse_raml.discover_includes(entry_file)
+    keys, order = parse_raml.compute_include_keys(graph)
+    if keys[str(entry_file)] is not None:
+        return keys[str(entry_file)]
+
+    # Include cycles have no key; fall back to hashing every file in the graph
+    digest = hashlib.sha256()
+    for path in sorted(graph):
+        digest.update(path.encode('utf-8') + b'\0' + (parse_raml.content_digest(path) or b'') + b'\0')
+    return digest.hexdigest()
+
+def artifact_format(options):
+    """The format the intermediate files are written in, as an input of the stages that write them."""
+    return repr(sorted(artifacts.options(options).items()))
+
+def raml_inputs(options):
+    tree_digest = raml_tree_digest(options.raml_entry)
+    if tree_digest is None:
+        return None
+    return [tree_digest] + file_digests(update_openapi.OPENAPI_FILE, raml_to_openapi.__file__,
+                                        parse_raml.__file__, update_openapi.__file__, yaml_backend.__file__,
+                                        search_index.__file__)
+
+def run_raml_to_openapi(options):
+    raml_data = parse_raml.get_resolved_raml(Path(options.raml_entry), cache_file=parse_raml.CACHE_FILE)
+    if not raml_data:
+        raise RuntimeError(f"Failed to parse {options.raml_entry}")
+    overlay = update_openapi.load_yaml_file(update_openapi.OPENAPI_FILE) \
+        if os.path.exists(update_openapi.OPENAPI_FILE) else None
+    openapi_data = raml_to_openapi.convert(raml_data, overlay)
+    update_openapi.write_yaml_file(openapi_data, update_openapi.OPENAPI_FILE)
+    update_openapi.write_shards(openapi_data, update_openapi.SHARD_DIR)
+    search_index.write_index(openapi_data, search_index.SEARCH_DIR)
+    return openapi_data
+
+def run_parse_html(options):
+    parsed_data = parse_html_v2.parse_html(HTML_FILE)
+    artifacts.write(list(map(records.html_json, parsed_data)), HTML_RECORDS_FILE, **artifacts.options(options))
+    return parsed_data
+
+def run_validate_examples(options, html_data, openapi_data):
+    # Stages run in the pipeline's pool, so the examples are validated in one process
+    report = validate_examples.validate(openapi_data, html_data, jobs=1)
+    with open(validate_examples.REPORT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def run_static_site(options, openapi_data):
+    # Stages run in the pipeline's pool, so the pages are rendered in one process
+    return static_site.build_site(openapi_data, static_site.SITE_DIR, jobs=1)[0]
+
+def run_compare_api(options, html_data, openapi_data):
+    missing_items, _ = compare_api.compare_api_specs(html_data, openapi_data, COMPARISON_FILE)
+    return missing_items
+
+STAGES = [
+    Stage('raml_to_openapi', (), raml_inputs,
+          (update_openapi.OPENAPI_FILE, os.path.join(update_openapi.SHARD_DIR, update_openapi.SHARD_INDEX),
+           os.path.join(search_index.SEARCH_DIR, search_index.MANIFEST_FILE)),
+          run_raml_to_openapi, lambda: update_openapi.load_yaml_file(update_openapi.OPENAPI_FILE)),
+    Stage('parse_html_v2', (),
+          lambda options: file_digests(HTML_FILE, parse_html_v2.__file__, html_extract.__file__, records.__file__)
+          + [artifact_format(options)],
+          (HTML_RECORDS_FILE,),
+          run_parse_html, lambda: records.html_endpoints(artifacts.read(HTML_RECORDS_FILE))),
+    # Informational: the mismatching examples are reported, they do not fail the run
+    Stage('validate_examples', ('parse_html_v2', 'raml_to_openapi'),
+          lambda options: file_digests(validate_examples.__file__),
+          (validate_examples.REPORT_FILE,),
+          run_validate_examples, lambda: update_openapi.load_json_file(validate_examples.REPORT_FILE)),
+    Stage('static_site', ('raml_to_openapi',),
+          lambda options: file_digests(static_site.__file__,
+                                       *(static_site.ROOT / asset for asset in static_site.ASSETS)),
+          (os.path.join(static_site.SITE_DIR, static_site.MANIFEST_FILE),),
+          run_static_site, lambda: static_site.load_manifest(static_site.SITE_DIR)),
+    # Last, as run_pipeline returns its value
+    Stage('compare_api', ('parse_html_v2', 'raml_to_openapi'),
+          lambda options: file_digests(compare_api.__file__),
+          (COMPARISON_FILE,),
+          run_compare_api, lambda: update_openapi.load_json_file(COMPARISON_FILE)),
+]
+
+def stage_key(stage, options, output_digests):
+    """
+    Returns the key of everything a stage depends on: its own input files and
+    the outputs of the stages it depends on. None if its inputs are missing.
+    """
+    inputs = stage.inputs(options)
+    if inputs is None or None in inputs:
+        return None
+    digest = hashlib.sha256(stage.name.encode('utf-8'))
+    for part in inputs:
+        digest.update(b'\0' + part.encode('ascii'))
+    for dep in stage.deps:
+        for part in output_digests[dep]:
+            digest.update(b'\0' + (part or 'missing').encode('ascii'))
+    return digest.hexdigest()
+
+def load_state(state_file):
+    try:
+        return update_openapi.load_json_file(state_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(state_file, state):
+    tmp_file = f'{state_file}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+def _timed_run(stage_name, run, options, *args):
+    start = time.perf_counter()
+    with instrumentation.phase(f'pipeline.{stage_name}'):
+        value = run(options, *args)
+    return value, time.perf_counter() - start, None
+
+def _run_in_worker(stage_name, run, options, *args):
+    """Runs a stage in a pool process and sends its instrumentation back."""
+    instrumentation.reset()
+    value, seconds, _ = _timed_run(stage_name, run, options, *args)
+    return value, seconds, instrumentation.snapshot()
+
+def run_pipeline(options, stages=STAGES, state_file=STATE_FILE):
+    """
+    Runs the stages in dependency order and returns a report row per stage.
+
+    A stage is skipped when the digests of its inputs and of its outputs match
+    the previous run; stages whose inputs are not available (e.g. no RAML
+    checkout) reuse their existing outputs. Ready stages run in parallel in a
+    process pool, and values are handed to the dependent stages in memory.
+    Skipped stages are only loaded from disk if a dependent stage runs.
+
+    Also returns the value of the last stage.
+    """
+    state = load_state(state_file)
+    pending = list(stages)
+    output_digests = {}
+    values = {}
+    report = {}
+    failed = set()
+    running = {}
+    executor = ProcessPoolExecutor(options.jobs) if options.jobs > 1 else None
+
+    def value_of(name):
+        if name not in values:
+            start = time.perf_counter()
+            values[name] = next(stage for stage in stages if stage.name == name).load()
+            report[name]['seconds'] += time.perf_counter() - start
+        return values[name]
+
+    def finish(stage, key, run_result):
+        try:
+            value, seconds, recorded = run_result()
+        except Exception as e:
+            print(f"Stage {stage.name} failed: {e}")
+            failed.add(stage.name)
+            report[stage.name] = {'status': 'failed', 'seconds': 0.0}
+            return
+        if recorded:
+            instrumentation.merge(recorded)
+        values[stage.name] = value
+        output_digests[stage.name] = file_digests(*stage.outputs)
+        # Stages may update their own inputs in place (openapi.yaml), so the
+        # key is taken after the run, as the next run will see it
+        state[stage.name] = {'key': stage_key(stage, options, output_digests) or key,
+                             'outputs': output_digests[stage.name]}
+        report[stage.name] = {'status': 'ran', 'seconds': seconds}
+
+    try:
+        while pending or running:
+            for stage in [stage for stage in pending
+                          if any(dep in failed for dep in stage.deps)]:
+                pending.remove(stage)
+                failed.add(stage.name)
+                report[stage.name] = {'status': 'blocked', 'seconds': 0.0}
+
+            to_run = []
+            for stage in [stage for stage in pending if all(dep in output_digests for dep in stage.deps)]:
+                pending.remove(stage)
+                key = stage_key(stage, options, output_digests)
+                previous = state.get(stage.name, {})
+                if key is None:
+                    if None in file_digests(*stage.outputs):
+                        failed.add(stage.name)
+                        report[stage.name] = {'status': 'unavailable', 'seconds': 0.0}
+                    else:
+                        output_digests[stage.name] = file_digests(*stage.outputs)
+                        report[stage.name] = {'status': 'no inputs, reused', 'seconds': 0.0}
+                elif (not options.force and previous.get('key') == key
+                        and previous.get('outputs') == file_digests(*stage.outputs)):
+                    output_digests[stage.name] = previous['outputs']
+                    report[stage.name] = {'status': 'cached', 'seconds': 0.0}
+                else:
+                    to_run.append((stage, key))
+
+            for stage, key in to_run:
+                args = [value_of(dep) for dep in stage.deps]
+                if executor is None or (not running and len(to_run) == 1):
+                    # Nothing to overlap with, so avoid copying the values to a worker
+                    finish(stage, key, lambda: _timed_run(stage.name, stage.run, options, *args))
+                else:
+                    running[executor.submit(_run_in_worker, stage.name, stage.run, options, *args)] = (stage, key)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, key = running.pop(future)
+                finish(stage, key, future.result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        save_state(state_file, state)
+
+    last = stages[-1].name
+    result = None if last in failed else value_of(last)
+    return [dict(report[stage.name], stage=stage.name) for stage in stages], result
+
+def print_report(rows, wall_time):
+    print(f"\n{'stage':<16} {'status':<24} {'seconds':>8}")
+    for row in rows:
+        print(f"{row['stage']:<16} {row['status']:<24} {row['seconds']:>8.3f}")
+    hits = sum(row['status'] == 'cached' for row in rows)
+    print(f"{hits}/{len(rows)} stages up to date, {wall_time:.3f}s in total.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run raml_to_openapi, parse_html_v2, validate_examples, static_site '
+                                                 'and compare_api, skipping the stages whose inputs did not change.')
+    parser.add_argument('--raml-entry', type=Path, default=parse_raml.BASE_DIR / 'KIX.raml', help='RAML entry file')
+    parser.add_argument('--jobs', type=int, default=2, help='worker processes for independent stages')
+    parser.add_argument('--force', action='store_true', help='run every stage whose inputs are available')
+    artifacts.add_arguments(parser)
+    instrumentation.add_arguments(parser, 'pipeline_profile.json')
+    options = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with instrumentation.profiling(options):
+        rows, missing_items = run_pipeline(options)
+        instrumentation.count('pipeline.cache_hits', sum(row['status'] == 'cached' for row in rows))
+        instrumentation.count('pipeline.cache_misses', sum(row['status'] == 'ran' for row in rows))
+    print_report(rows, time.perf_counter() - start)
+
+    if any(row['status'] in ('failed', 'blocked', 'unavailable') for row in rows):
+        return 1
+    if missing_items and any(missing_items.values()):
+        print(f"Discrepancies found. See {COMPARISON_FILE} for details.")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
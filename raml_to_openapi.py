@@ -0,0 +1,493 @@
+"""
+Converts the resolved RAML tree straight into the OpenAPI 3.0 document.
+
+Unlike parse_raml.py + update_openapi.py, nothing is flattened into
+raml_api_details.json first: the resolved RAML data is walked once and every
+path, method, path/query parameter, request body, response and type is
+converted with the facets RAML gives it (types, enums, defaults, `required`).
+
+The fields RAML does not describe (operationId, tags, summary, security, info
+and servers) are taken from an existing spec, the `overlay`, usually the
+previous openapi.yaml, for the operations that are still there.
+"""
+import argparse
+import json
+import os
+import traceback
+from pathlib import Path
+
+import instrumentation
+import parse_raml
+import search_index
+import update_openapi
+
+METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+OPENAPI_VERSION = '3.0.0'
+DEFAULT_MEDIA_TYPE = 'application/json'
+# RAML built-in types and the OpenAPI schemas they map to
+SCALAR_TYPES = {
+    'string': {'type': 'string'},
+    'number': {'type': 'number'},
+    'integer': {'type': 'integer'},
+    'boolean': {'type': 'boolean'},
+    'object': {'type': 'object'},
+    'array': {'type': 'array', 'items': {}},
+    'date-only': {'type': 'string', 'format': 'date'},
+    'time-only': {'type': 'string', 'format': 'time'},
+    'datetime-only': {'type': 'string', 'format': 'date-time'},
+    'datetime': {'type': 'string', 'format': 'date-time'},
+    'file': {'type': 'string', 'format': 'binary'},
+    'nil': {'nullable': True},
+    'any': {},
+}
+# Facets copied unchanged from a RAML type declaration into its schema
+SCHEMA_FACETS = ('description', 'enum', 'default', 'pattern', 'format', 'minLength', 'maxLength',
+                 'minimum', 'maximum', 'multipleOf', 'minItems', 'maxItems', 'uniqueItems',
+                 'minProperties', 'maxProperties', 'additionalProperties')
+# Keys of an included JSON schema that are not valid in an OpenAPI schema object
+JSON_SCHEMA_ONLY = ('$schema', 'id', '$id')
+# Keys that make a dict under `type:` a JSON schema rather than an inline RAML type declaration
+JSON_SCHEMA_KEYS = JSON_SCHEMA_ONLY + ('$ref', 'definitions', 'allOf', 'anyOf', 'oneOf', 'not')
+# Operation fields RAML has nothing for (tags only as a guess); they are kept from the overlay
+OVERLAY_FIELDS = ('operationId', 'tags', 'security', 'deprecated', 'externalDocs')
+# Operation fields taken from the overlay when RAML does not set them
+OVERLAY_DEFAULTS = ('summary', 'description', 'requestBody')
+
+def _plain(value):
+    """Deep copy of value with the frozen dicts/lists of parse_raml turned into plain ones."""
+    if isinstance(value, dict):
+        return {str(key) if isinstance(key, int) else key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+def _is_json_schema(definition):
+    """Whether a dict is a JSON schema; in RAML, `required` of a type is a boolean, in JSON Schema a list."""
+    return any(key in definition for key in JSON_SCHEMA_KEYS) or isinstance(definition.get('required'), list)
+
+class Converter:
+    """Converts one resolved RAML document; see convert."""
+
+    def __init__(self, raml_data, dedupe=True):
+        self.raml_data = raml_data
+        self.types = raml_data.get('types') or {}
+        self.media_type = raml_data.get('mediaType') or DEFAULT_MEDIA_TYPE
+        if isinstance(self.media_type, list):
+            self.media_type = self.media_type[0]
+        self.resolver = parse_raml.TypeResolver(raml_data.get('resourceTypes') or {}, raml_data.get('traits') or {})
+        self.components = {'schemas': {}}
+        self.shared = self.components if dedupe else None
+        self._examples = {}
+        # Top-level resource -> its paths, in document order
+        self.paths_by_resource = {}
+
+    def schema(self, definition):
+        """Returns the OpenAPI schema of a RAML type declaration (a type expression or a dict of facets)."""
+        if definition is None:
+            return {'type': 'string'}
+        if isinstance(definition, str):
+            return self._type_expression(definition.strip())
+        if isinstance(definition, list):
+            schemas = [self.schema(item) for item in definition]
+            return schemas[0] if len(schemas) == 1 else {'allOf': schemas}
+        if not isinstance(definition, dict):
+            return {}
+        if '$schema' in definition:
+            return self._json_schema(definition)
+
+        type_ref = definition.get('type', definition.get('schema'))
+        if isinstance(type_ref, dict) and _is_json_schema(type_ref):
+            # `type: !include schemas/X.json`
+            schema = self._json_schema(type_ref)
+        elif type_ref is None:
+            schema = {'type': 'object'} if 'properties' in definition else \
+                {'type': 'array', 'items': {}} if 'items' in definition else {'type': 'string'}
+        else:
+            schema = self.schema(type_ref)
+
+        facets = {facet: _plain(definition[facet]) for facet in SCHEMA_FACETS if facet in definition}
+        if isinstance(facets.get('additionalProperties'), (str, dict)):
+            facets['additionalProperties'] = self.schema(definition['additionalProperties'])
+        if 'items' in definition:
+            facets['items'] = self.schema(definition['items'])
+        if isinstance(definition.get('properties'), dict):
+            facets['properties'] = {}
+            required = []
+            for name, prop in definition['properties'].items():
+                optional = name.endswith('?')
+                name = name[:-1] if optional else name
+                facets['properties'][name] = self.schema(prop)
+                if not optional and (prop.get('required', True) if isinstance(prop, dict) else True):
+                    required.append(name)
+            if required:
+                facets['required'] = required
+        elif isinstance(definition.get('required'), list):
+            facets['required'] = list(definition['required'])
+        if not facets:
+            return schema
+        if '$ref' in schema or 'allOf' in schema:
+            return {'allOf': schema.get('allOf', [schema]), **facets}
+        return {**schema, **facets}
+
+    def _type_expression(self, expression):
+        if expression.startswith('{'):
+            # A JSON schema included as text
+            try:
+                return self._json_schema(json.loads(expression))
+            except json.JSONDecodeError:
+                return {'type': 'string'}
+        if '|' in expression:
+            return {'oneOf': [self._type_expression(part.strip()) for part in expression.split('|')]}
+        if expression.endswith('[]'):
+            return {'type': 'array', 'items': self._type_expression(expression[:-2].strip('() '))}
+        if expression.endswith('?'):
+            return {**self._type_expression(expression[:-1]), 'nullable': True}
+        if expression in self.types:
+            return {'$ref': f'#/components/schemas/{expression}'}
+        return _plain(SCALAR_TYPES.get(expression, {'type': 'string'}))
+
+    def _json_schema(self, schema):
+        return {key: _plain(value) for key, value in schema.items() if key not in JSON_SCHEMA_ONLY}
+
+    def examples(self, type_name):
+        """The examples of a RAML type as OpenAPI example objects, shared through components with dedupe."""
+        cached = self._examples.get(type_name)
+        if cached is None or any(_dangling(self.components, example) for example in cached.values()):
+            type_def = self.types.get(type_name)
+            examples = {}
+            if isinstance(type_def, dict):
+                for name, example in (type_def.get('examples') or {}).items():
+                    examples[name] = _plain(example if isinstance(example, dict) and 'value' in example
+                                            else {'value': example})
+                if 'example' in type_def and 'default' not in examples:
+                    examples['default'] = {'value': _plain(type_def['example'])}
+            if self.shared is not None:
+                examples = {name: update_openapi.share(self.shared, 'examples', f'{type_name}.{name}', example)
+                            for name, example in examples.items()}
+            self._examples[type_name] = examples
+        return self._examples[type_name]
+
+    def content(self, body):
+        """The OpenAPI content map of a RAML body, with or without media types."""
+        if not isinstance(body, dict):
+            return {self.media_type: {'schema': self.schema(body)}} if body else {}
+        if not any('/' in str(key) for key in body):
+            body = {self.media_type: body}
+
+        content = {}
+        for media_type, definition in body.items():
+            media = {}
+            if definition:
+                media['schema'] = self.schema(definition)
+            type_ref = definition.get('type') if isinstance(definition, dict) else definition
+            if isinstance(definition, dict) and 'example' in definition:
+                media['example'] = _plain(definition['example'])
+            elif isinstance(type_ref, str) and self.examples(type_ref.strip()):
+                media['examples'] = _plain(self.examples(type_ref.strip()))
+            content[media_type] = media
+        return content
+
+    def parameter(self, name, definition, location):
+        """Returns the OpenAPI parameter of a RAML uri or query parameter."""
+        optional = name.endswith('?')
+        name = name[:-1] if optional else name
+        definition = definition if isinstance(definition, dict) else {'type': definition}
+        param = {'name': name, 'in': location}
+        description = definition.get('description') or definition.get('displayName')
+        if description and description != name:
+            param['description'] = description
+        param['required'] = location == 'path' or (not optional and bool(definition.get('required', True)))
+        schema = self.schema({key: value for key, value in definition.items()
+                              if key not in ('description', 'displayName', 'required', 'example')})
+        param['schema'] = schema
+        if 'example' in definition:
+            param['example'] = _plain(definition['example'])
+        return param
+
+    def operation(self, method_def, path_params, tag):
+        operation = {}
+        if method_def.get('displayName'):
+            operation['summary'] = method_def['displayName']
+        if method_def.get('description'):
+            operation['description'] = method_def['description']
+        if tag:
+            operation['tags'] = [tag]
+
+        parameters = _plain(path_params)
+        for name, definition in (method_def.get('queryParameters') or {}).items():
+            parameters.append(self.parameter(name, definition, 'query'))
+        for name, definition in (method_def.get('headers') or {}).items():
+            parameters.append(self.parameter(name, definition, 'header'))
+        if parameters:
+            operation['parameters'] = parameters
+
+        if method_def.get('body'):
+            operation['requestBody'] = {'content': self.content(method_def['body']), 'required': True}
+
+        responses = {}
+        for code, response_def in (method_def.get('responses') or {}).items():
+            response_def = response_def if isinstance(response_def, dict) else {}
+            response = {'description': response_def.get('description') or "No description provided."}
+            if response_def.get('body'):
+                response['content'] = self.content(response_def['body'])
+            responses[str(code)] = response
+        operation['responses'] = responses or {'default': {'description': "No description provided."}}
+        instrumentation.count('convert.operations')
+        return operation
+
+    def walk(self, path, resource_def, uri_params, tag, paths):
+        """Converts a resource and its nested resources into paths."""
+        if not isinstance(resource_def, dict):
+            return
+        resolved = self.resolver.resolve_resource(path, resource_def)
+        uri_params = {**uri_params, **(resolved.get('uriParameters') or {})}
+        path_params = [self.parameter(name, uri_params.get(name), 'path')
+                       for name in _path_param_names(path)]
+
+        for key, value in resolved.items():
+            if key in METHODS:
+                method_def = self.resolver.resolve_method(path, key, value or {})
+                paths.setdefault(path, {})[key] = self.operation(method_def, path_params, tag)
+            elif isinstance(key, str) and key.startswith('/'):
+                self.walk(path.rstrip('/') + key, value, uri_params, tag, paths)
+
+    def resource_paths(self, key, resource_def):
+        """Returns the paths of one top-level resource of the RAML document and everything nested in it."""
+        paths = {}
+        tag = resource_def.get('displayName') if isinstance(resource_def, dict) else None
+        self.walk(key, resource_def, {}, tag or key.strip('/').split('/')[0], paths)
+        return paths
+
+    def convert(self):
+        raml_data = self.raml_data
+        with instrumentation.phase('convert.types'):
+            for type_name, type_def in self.types.items():
+                self.components['schemas'][type_name] = self.schema(type_def)
+            instrumentation.count('convert.schemas', len(self.types))
+
+        with instrumentation.phase('convert.paths'):
+            paths = {}
+            for key, resource_def in raml_data.items():
+                if isinstance(key, str) and key.startswith('/'):
+                    resource = self.resource_paths(key, resource_def)
+                    self.paths_by_resource[key] = list(resource)
+                    paths.update(resource)
+
+        info = {'title': raml_data.get('title') or 'API', 'version': str(raml_data.get('version') or '')}
+        if isinstance(raml_data.get('description'), str):
+            info['description'] = raml_data['description']
+        openapi_data = {'openapi': OPENAPI_VERSION, 'info': info}
+        if raml_data.get('baseUri'):
+            openapi_data['servers'] = [_server(raml_data)]
+        openapi_data['paths'] = paths
+        openapi_data['components'] = self.components
+        return openapi_data
+
+def _dangling(components, example):
+    """Whether example is a $ref to a shared example that prune_shared has removed since."""
+    ref = example.get('$ref')
+    return ref is not None and ref.rsplit('/', 1)[-1] not in components.get('examples', {})
+
+def _path_param_names(path):
+    return [segment[1:-1] for segment in path.split('/') if segment.startswith('{') and segment.endswith('}')]
+
+def _server(raml_data):
+    url = raml_data['baseUri'].replace('{version}', str(raml_data.get('version') or ''))
+    server = {'url': url}
+    variables = {}
+    for name, definition in (raml_data.get('baseUriParameters') or {}).items():
+        definition = definition if isinstance(definition, dict) else {}
+        variable = {'default': str(definition.get('default', (definition.get('enum') or [''])[0]))}
+        if definition.get('enum'):
+            variable['enum'] = [str(value) for value in definition['enum']]
+        if definition.get('description'):
+            variable['description'] = definition['description']
+        variables[name] = variable
+    if variables:
+        server['variables'] = variables
+    return server
+
+def apply_overlay(openapi_data, overlay):
+    """
+    Copies what RAML does not describe from the overlay spec: info, servers and
+    security, the OVERLAY_FIELDS of every operation that still exists, its
+    OVERLAY_DEFAULTS when RAML has none, and the schemas those refer to.
+    Running again with the output as the overlay gives the same document.
+    """
+    for key in ('info', 'servers', 'security', 'tags', 'externalDocs'):
+        if key in overlay:
+            openapi_data[key] = overlay[key]
+
+    for path, methods in openapi_data['paths'].items():
+        overlay_methods = (overlay.get('paths') or {}).get(path) or {}
+        for method, operation in methods.items():
+            overlay_operation = overlay_methods.get(method)
+            if not isinstance(overlay_operation, dict):
+                continue
+            for field in OVERLAY_FIELDS:
+                if field in overlay_operation:
+                    operation[field] = overlay_operation[field]
+            for field in OVERLAY_DEFAULTS:
+                if field in overlay_operation and field not in operation:
+                    operation[field] = overlay_operation[field]
+
+    schemas = openapi_data['components']['schemas']
+    overlay_schemas = (overlay.get('components') or {}).get('schemas') or {}
+    missing = [name for name in overlay_schemas if name not in schemas]
+    while missing:
+        refs = update_openapi.collect_refs(openapi_data, set())
+        missing = [name for name in missing if f'#/components/schemas/{name}' in refs]
+        for name in missing:
+            schemas[name] = overlay_schemas[name]
+        missing = [name for name in overlay_schemas if name not in schemas] if missing else []
+    return openapi_data
+
+def convert(raml_data, overlay=None, dedupe=True):
+    """
+    Returns the OpenAPI 3.0 document of the resolved RAML data (see
+    parse_raml.get_resolved_raml), completed from the overlay spec if given.
+    With `dedupe`, large examples are stored once under components.
+    """
+    openapi_data = Converter(raml_data, dedupe).convert()
+    if overlay:
+        apply_overlay(openapi_data, overlay)
+    if dedupe:
+        update_openapi.prune_shared(openapi_data)
+    return openapi_data
+
+def _operations(openapi_data):
+    return {(path, method): operation
+            for path, methods in (openapi_data.get('paths') or {}).items()
+            for method, operation in (methods or {}).items() if method in METHODS}
+
+def spec_diff(old, new):
+    """
+    Summarizes how the `new` spec differs from the `old` one: the operations
+    and schemas only in either, and for common operations the parameters,
+    response codes and request bodies that were added or removed.
+    """
+    old_operations, new_operations = _operations(old), _operations(new)
+    diff = {
+        'operations_removed': sorted(set(old_operations) - set(new_operations)),
+        'operations_added': sorted(set(new_operations) - set(old_operations)),
+        'parameters_removed': [], 'parameters_added': [],
+        'responses_removed': [], 'responses_added': [],
+        'request_bodies_removed': [], 'request_bodies_added': [],
+    }
+    for key in sorted(set(old_operations) & set(new_operations)):
+        old_operation, new_operation = old_operations[key] or {}, new_operations[key] or {}
+        old_params = {(p.get('in'), p.get('name')) for p in old_operation.get('parameters') or [] if '$ref' not in p}
+        new_params = {(p.get('in'), p.get('name')) for p in new_operation.get('parameters') or [] if '$ref' not in p}
+        diff['parameters_removed'] += [(*key, *param) for param in sorted(old_params - new_params)]
+        diff['parameters_added'] += [(*key, *param) for param in sorted(new_params - old_params)]
+        old_codes = {str(code) for code in old_operation.get('responses') or {}}
+        new_codes = {str(code) for code in new_operation.get('responses') or {}}
+        diff['responses_removed'] += [(*key, code) for code in sorted(old_codes - new_codes)]
+        diff['responses_added'] += [(*key, code) for code in sorted(new_codes - old_codes)]
+        if 'requestBody' in old_operation and 'requestBody' not in new_operation:
+            diff['request_bodies_removed'].append(key)
+        if 'requestBody' in new_operation and 'requestBody' not in old_operation:
+            diff['request_bodies_added'].append(key)
+
+    old_schemas = set((old.get('components') or {}).get('schemas') or {})
+    new_schemas = set((new.get('components') or {}).get('schemas') or {})
+    diff['schemas_removed'] = sorted(old_schemas - new_schemas)
+    diff['schemas_added'] = sorted(new_schemas - old_schemas)
+    return diff
+
+def print_diff(diff, limit=5):
+    """Prints the counts of a spec_diff and the first `limit` entries of each."""
+    for name, entries in diff.items():
+        print(f"{name.replace('_', ' '):<24} {len(entries):>6}")
+        for entry in entries[:limit]:
+            print(f"    {' '.join(map(str, entry)) if isinstance(entry, tuple) else entry}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the KIX RAML documentation straight into openapi.yaml.')
+    parser.add_argument('--entry', type=Path, default=parse_raml.BASE_DIR / 'KIX.raml', help='RAML entry file')
+    parser.add_argument('--output', default=update_openapi.OPENAPI_FILE, help='OpenAPI file to write')
+    parser.add_argument('--overlay', default=None,
+                        help='spec to keep operationIds, tags, summaries, info and servers from '
+                             '(default: the existing output file)')
+    parser.add_argument('--no-overlay', action='store_true', help='build the spec from the RAML data alone')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='copy examples inline instead of referencing shared components')
+    parser.add_argument('--shards', nargs='?', const=update_openapi.SHARD_DIR, default=None, metavar='DIR',
+                        help='also write the spec as per-resource JSON shards for index.html '
+                             f'(default: {update_openapi.SHARD_DIR})')
+    parser.add_argument('--search-index', nargs='?', const=search_index.SEARCH_DIR, default=None, metavar='DIR',
+                        help=f'also write the search index for index.html (default: {search_index.SEARCH_DIR})')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes for parsing included files')
+    parser.add_argument('--cache-file', type=Path, default=parse_raml.CACHE_FILE, help='persistent parse cache')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the parse cache')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and update the output whenever a RAML file changes')
+    parser.add_argument('--poll', action='store_true', help='with --watch, poll the files instead of using inotify')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between two polls (default: 0.5)')
+    instrumentation.add_arguments(parser, 'raml_to_openapi_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        return run(args)
+
+def load_overlay(args):
+    """Returns the previous output file and the overlay chosen with the options, each loaded or None."""
+    previous = None
+    if os.path.exists(args.output):
+        with instrumentation.phase('convert.load_previous'):
+            previous = update_openapi.load_yaml_file(args.output)
+    overlay_file = args.overlay or args.output
+    overlay = None
+    if not args.no_overlay and os.path.exists(overlay_file):
+        overlay = previous if overlay_file == args.output else update_openapi.load_yaml_file(overlay_file)
+    return previous, overlay
+
+def run_watch(args):
+    """Builds the output once, then keeps it up to date with the RAML files (see raml_watch)."""
+    import raml_watch  # raml_watch builds on this module
+
+    cache_file = None if args.no_cache else args.cache_file
+    if cache_file:
+        parse_raml.load_parse_cache(cache_file)
+    _, overlay = load_overlay(args)
+    session = raml_watch.WatchSession(args.entry, args.output, overlay, not args.no_dedupe, args.shards, args.jobs,
+                                      args.search_index)
+    if cache_file:
+        parse_raml.save_parse_cache(cache_file, session.graph)
+    print(f"Wrote {args.output}: {len(_operations(session.openapi_data))} operations.")
+    raml_watch.watch(session, raml_watch.FileWatcher(args.interval, polling=args.poll))
+    return 0
+
+def run(args):
+    if args.watch:
+        return run_watch(args)
+    try:
+        with instrumentation.phase('convert.resolve'):
+            raml_data = parse_raml.get_resolved_raml(args.entry, jobs=args.jobs,
+                                                     cache_file=None if args.no_cache else args.cache_file)
+        if not raml_data:
+            print("Failed to parse RAML data. Exiting.")
+            return 1
+
+        previous, overlay = load_overlay(args)
+        openapi_data = convert(raml_data, overlay, dedupe=not args.no_dedupe)
+        with instrumentation.phase('convert.dump_yaml'):
+            update_openapi.write_yaml_file(openapi_data, args.output)
+        print(f"Wrote {args.output}: {len(_operations(openapi_data))} operations, "
+              f"{len(openapi_data['components']['schemas'])} schemas.")
+        if args.shards:
+            with instrumentation.phase('convert.write_shards'):
+                update_openapi.write_shards(openapi_data, args.shards)
+        if args.search_index:
+            search_index.write_index(openapi_data, args.search_index)
+        if previous is not None:
+            print(f"\nChanges against the previous {args.output}:")
+            print_diff(spec_diff(previous, openapi_data))
+        return 0
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        traceback.print_exc()
+        return 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
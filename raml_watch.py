@@ -0,0 +1,411 @@
+"""
+Watch mode of raml_to_openapi: keeps the resolved RAML include graph and the
+OpenAPI document in memory and, when files of the tree change, resolves and
+converts again only the top-level resources that include them.
+
+The reverse include index maps every file to the files that include it.
+Walking it up from a changed file stops at the resource files the entry file
+includes for its top-level resources (`/tickets: !include resources/tickets.raml`);
+only those resources are converted again, and only their path blocks of
+openapi.yaml are rewritten (see update_openapi.index_blocks). A change that
+reaches the entry file some other way (types, traits, resourceTypes, the entry
+file itself) rebuilds the whole document; either way only the changed files
+and the files including them are parsed again, the rest comes from the parse
+cache.
+
+Changes are picked up with inotify on Linux and by polling the files' stat
+signatures elsewhere.
+"""
+import ctypes
+import ctypes.util
+import os
+import pickle
+import select
+import struct
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import instrumentation
+import parse_raml
+import raml_to_openapi
+import search_index
+import update_openapi
+
+POLL_INTERVAL = 0.5
+# Changes closer together than this are handled as one; editors save in steps
+DEBOUNCE_SECONDS = 0.05
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+# Directories are watched rather than files, so files replaced through a rename are seen
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+libc = _load_libc()
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class FileWatcher:
+    """
+    Reports writes, replacements, creations and deletions of a set of files,
+    with inotify on their directories when available, else by checking their
+    stat signatures every `interval` seconds.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, polling=False):
+        self.interval = interval
+        self.files = set()
+        self.signatures = {}
+        self.watches = {}
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC) if libc is not None and not polling else -1
+
+    @property
+    def mode(self):
+        return 'inotify' if self.fd >= 0 else 'polling'
+
+    def track(self, files):
+        """Sets the files to watch."""
+        self.files = set(files)
+        if self.fd < 0:
+            self.signatures = {path: self.signatures[path] if path in self.signatures else _signature(path)
+                               for path in self.files}
+            return
+        for directory in {os.path.dirname(path) for path in self.files} - set(self.watches.values()):
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = directory
+
+    def _check(self):
+        changed = set()
+        for path in self.files:
+            signature = _signature(path)
+            if signature != self.signatures.get(path):
+                self.signatures[path] = signature
+                changed.add(path)
+        return changed
+
+    def _read_events(self, timeout):
+        if self.fd < 0:
+            changed = self._check()
+            if not changed and timeout != 0:
+                time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+                changed = self._check()
+            return changed
+
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return set(self.files)
+            path = os.path.join(self.watches.get(wd, ''), os.fsdecode(name))
+            if path in self.files:
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """
+        Blocks until tracked files change and returns them, once no further
+        change came in for DEBOUNCE_SECONDS. Returns an empty set if nothing
+        changed within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            found = self._read_events(DEBOUNCE_SECONDS if changed else remaining)
+            if found:
+                changed |= found
+            elif changed or remaining == 0.0:
+                return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class WatchSession:
+    """
+    The resolved RAML tree of `entry_file` and the OpenAPI document written to
+    `output`, kept up to date with update(). The first build takes the
+    operationIds, tags, etc. from `overlay` (see raml_to_openapi.apply_overlay),
+    later ones from the document itself. The shards and the search index are
+    written again with the document when `shard_dir` and `search_dir` are set.
+    """
+
+    def __init__(self, entry_file, output=update_openapi.OPENAPI_FILE, overlay=None, dedupe=True,
+                 shard_dir=None, jobs=None, search_dir=None):
+        self.entry = str(Path(entry_file).resolve())
+        self.output = output
+        self.dedupe = dedupe
+        self.shard_dir = shard_dir
+        self.search_dir = search_dir
+        self.jobs = jobs
+        with instrumentation.phase('watch.discover_includes'):
+            self.graph = parse_raml.discover_includes(Path(self.entry))
+        self._index()
+        self._resolve(None)
+        self.rebuild(overlay)
+        if shard_dir:
+            update_openapi.write_shards(self.openapi_data, shard_dir)
+        if search_dir:
+            search_index.write_index(self.openapi_data, search_dir)
+
+    def _index(self, reparse=True):
+        """
+        Builds the reverse include index and, with `reparse`, finds the files
+        of the top-level resources in the entry file.
+        """
+        self.parents = {}
+        for path, children in self.graph.items():
+            for child in children:
+                self.parents.setdefault(child, set()).add(path)
+        if not reparse:
+            return
+        try:
+            entry_data = pickle.loads(parse_raml._parse_file(self.entry))
+        except OSError:
+            entry_data = None
+        self.resource_files = {}
+        for key, value in (entry_data if isinstance(entry_data, dict) else {}).items():
+            if isinstance(key, str) and key.startswith('/') and isinstance(value, parse_raml.IncludeRef):
+                self.resource_files.setdefault(value.path, []).append(key)
+
+    def _resolve(self, files):
+        """Resolves the given files (all if None) whose content keys changed."""
+        keys, order = parse_raml.compute_include_keys(self.graph)
+        parse_raml.include_keys.clear()
+        parse_raml.include_keys.update(keys)
+        with instrumentation.phase('watch.resolve'):
+            parse_raml.resolve_include_graph(self.graph, [path for path in order if files is None or path in files],
+                                             self.jobs)
+
+    def rebuild(self, overlay):
+        """Converts the whole resolved tree and writes the output."""
+        self.raml_data = parse_raml.load_file_cached(Path(self.entry), parse_raml.load_yaml_with_context) or {}
+        self.converter = raml_to_openapi.Converter(self.raml_data, self.dedupe)
+        self.openapi_data = self.converter.convert()
+        if overlay:
+            raml_to_openapi.apply_overlay(self.openapi_data, overlay)
+        if self.dedupe:
+            update_openapi.prune_shared(self.openapi_data)
+        with instrumentation.phase('watch.dump_yaml'):
+            update_openapi.write_yaml_file(self.openapi_data, self.output)
+        with open(self.output, 'r', encoding='utf-8') as f:
+            self.lines = f.readlines()
+
+    def _rescan(self, changed):
+        """Updates the include graph for the changed files and drops the files no longer included."""
+        for path in changed:
+            if path in self.graph:
+                self.graph.update(parse_raml.discover_includes(Path(path)))
+        reachable, pending = set(), [self.entry]
+        while pending:
+            path = pending.pop()
+            if path not in reachable:
+                reachable.add(path)
+                pending.extend(self.graph.get(path, ()))
+        for path in set(self.graph) - reachable:
+            del self.graph[path]
+        self._index(reparse=self.entry in changed)
+
+    def affected(self, changed):
+        """
+        Returns the files that include the changed ones, directly or not, the
+        top-level resources they belong to, and whether the change reaches the
+        entry file other than through a resource.
+        """
+        files, resources, full = set(), set(), False
+        pending = [path for path in changed if path in self.graph]
+        while pending:
+            path = pending.pop()
+            if path in files:
+                continue
+            files.add(path)
+            if path == self.entry:
+                full = True
+                continue
+            if path in self.resource_files:
+                resources.update(self.resource_files[path])
+            pending.extend(parent for parent in self.parents.get(path, ())
+                           if parent != self.entry or path not in self.resource_files)
+        return files, resources, full
+
+    def update(self, changed):
+        """
+        Applies changes of the given files and writes the output again.
+        Returns a summary: the resources converted again (None after a full
+        rebuild), the number of files parsed, the paths rewritten and whether
+        the output was patched in place rather than dumped as a whole.
+        """
+        misses = instrumentation.counters['raml.parse_cache.misses']
+        for path in changed:
+            # A mapping of a changed file must not be read again (see sources.map_file)
+            parse_raml.file_cache.pop(path)
+            parse_raml.content_digests.pop(path, None)
+        self._rescan(changed)
+        files, resources, full = self.affected(changed)
+        summary = {'resources': None, 'paths': None, 'patched': False}
+        if full:
+            self._resolve(None)
+            self.rebuild(self.openapi_data)
+        elif resources:
+            self._resolve(files)
+            summary.update(self._update_resources(resources))
+        if self.shard_dir and (full or resources):
+            with instrumentation.phase('watch.write_shards'):
+                update_openapi.write_shards(self.openapi_data, self.shard_dir)
+        if self.search_dir and (full or resources):
+            with instrumentation.phase('watch.write_search_index'):
+                search_index.write_index(self.openapi_data, self.search_dir)
+        summary['files_parsed'] = instrumentation.counters['raml.parse_cache.misses'] - misses
+        return summary
+
+    def _update_resources(self, resources):
+        files = {key: path for path, keys in self.resource_files.items() for key in keys}
+        previous = self.openapi_data['paths']
+        had_examples = 'examples' in self.converter.components
+        examples = self.converter.components.setdefault('examples', {})
+        existing = set(examples)
+        replaced = {}
+        old_refs = set()
+        same_paths = True
+        for key in sorted(resources):
+            resource_def = parse_raml.load_file_cached(Path(files[key]), parse_raml.parse_included_content)
+            self.raml_data[key] = resource_def
+            old_paths = self.converter.paths_by_resource.get(key, [])
+            old = {path: previous[path] for path in old_paths}
+            update_openapi.collect_refs(old, old_refs)
+            new = self.converter.resource_paths(key, resource_def)
+            raml_to_openapi.apply_overlay({'paths': new, 'components': self.converter.components}, {'paths': old})
+            same_paths = same_paths and list(new) == old_paths
+            self.converter.paths_by_resource[key] = list(new)
+            replaced.update(new)
+
+        self.openapi_data['paths'] = {path: replaced[path] if path in replaced else previous[path]
+                                      for paths in self.converter.paths_by_resource.values() for path in paths}
+        # Only the shared examples the old paths used can have become unused
+        unused = [name for section, name in update_openapi.SHARED_REF.findall(' '.join(
+                      old_refs - update_openapi.collect_refs(replaced, set())))
+                  if section == 'examples' and update_openapi.SHARED_NAME.search(name)]
+        if unused:
+            refs = update_openapi.collect_refs(self.openapi_data, set())
+            unused = [name for name in unused if f'#/components/examples/{name}' not in refs]
+            for name in unused:
+                examples.pop(name, None)
+        added = [name for name in examples if name not in existing]
+        if not examples:
+            del self.converter.components['examples']
+
+        with instrumentation.phase('watch.write_output'):
+            patched = same_paths and bool(examples) == had_examples and self._patch(replaced, added, unused)
+            if patched:
+                with open(self.output, 'w', encoding='utf-8') as f:
+                    f.write(''.join(self.lines))
+            else:
+                update_openapi.write_yaml_file(self.openapi_data, self.output)
+                with open(self.output, 'r', encoding='utf-8') as f:
+                    self.lines = f.readlines()
+        return {'resources': sorted(resources), 'paths': len(replaced), 'patched': patched}
+
+    def _patch(self, replaced, added, unused):
+        """
+        Replaces the blocks of the replaced paths in self.lines, appends the
+        added shared examples and drops the unused ones, so the lines match a
+        full dump of the document. Returns False if the layout does not allow it
+        or the change reaches a YAML anchor or alias, as a full dump numbers
+        them through the whole document.
+        """
+        path_index = update_openapi.index_blocks(self.lines, ('paths',))
+        if path_index is None or any(path not in path_index[0] for path in replaced):
+            return False
+        repeated = set()
+        update_openapi.object_ids(self.openapi_data, repeated)
+        if update_openapi.object_ids(replaced) & repeated:
+            return False
+        replacements = {path_index[0][path]: update_openapi.dump_block(('paths',), path, path_item)
+                        for path, path_item in replaced.items()}
+
+        if added or unused:
+            example_index = update_openapi.index_blocks(self.lines, ('components', 'examples'))
+            if example_index is None or any(name not in example_index[0] for name in unused):
+                return False
+            blocks, end = example_index
+            examples = self.openapi_data['components']['examples']
+            replacements.update((blocks[name], []) for name in unused)
+            replacements[(end, end)] = [line for name in added for line in
+                                        update_openapi.dump_block(('components', 'examples'), name, examples[name])]
+
+        if any(update_openapi.has_anchors(self.lines[start:end]) or update_openapi.has_anchors(block)
+               for (start, end), block in replacements.items()):
+            return False
+        lines = list(self.lines)
+        for (start, end), block in sorted(replacements.items(), reverse=True):
+            lines[start:end] = block
+        self.lines = lines
+        return True
+
+def watch(session, watcher=None):
+    """Updates the session on every change of its files until interrupted, reporting the latency of each update."""
+    watcher = watcher or FileWatcher()
+    watcher.track(session.graph)
+    print(f"Watching {len(session.graph)} files ({watcher.mode}), press Ctrl+C to stop.")
+    try:
+        while True:
+            changed = watcher.wait()
+            seen = time.time()
+            written = max((os.stat(path).st_mtime for path in changed if os.path.exists(path)), default=seen)
+            try:
+                with instrumentation.phase('watch.update'):
+                    summary = session.update(changed)
+            except Exception as e:
+                print(f"Update failed: {e}")
+                traceback.print_exc()
+                continue
+            done = time.time()
+            watcher.track(session.graph)
+            instrumentation.count('watch.updates')
+            instrumentation.record_max('watch.max_latency_ms', (done - written) * 1000)
+
+            names = ', '.join(sorted(os.path.relpath(path, os.path.dirname(session.entry)) for path in changed))
+            if summary['resources'] is None:
+                what = "rebuilt the whole document"
+            else:
+                what = (f"converted {', '.join(summary['resources'])} again ({summary['paths']} paths, "
+                        f"{'patched in place' if summary['patched'] else 'dumped'})")
+            print(f"{names}: {what}, {summary['files_parsed']} files parsed; {session.output} updated "
+                  f"{(done - seen) * 1000:.0f} ms after the change was seen, "
+                  f"{(done - written) * 1000:.0f} ms after it was written.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
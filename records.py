@@ -0,0 +1,180 @@
+"""
+Typed records of the endpoints parsed from the HTML and RAML documentation.
+
+parse_html_v2 and parse_raml used to build a dict per endpoint and method,
+and a dict per parameter and response in it, although most of them are
+equal: the same `filter`, `limit`, `offset`, `sort` and `fields` parameters
+appear on nearly every endpoint, and the HTML page repeats a resource's
+query parameters for each of its methods. The parsers now build the
+NamedTuples below through a RecordTable, which interns their strings and
+shares equal parameters, responses and parameter lists (a flyweight table),
+so each distinct one is stored once. compare_api and update_openapi work on
+the records.
+
+JSON is only used at the edges: `html_json` and `raml_json` give the files
+the scripts have always written, `html_endpoints` and `raml_details` read
+them (or pass records through unchanged). Fields that a source does not
+have are None and are left out of its JSON; keys the records do not model
+are kept in `extra`, in order.
+"""
+import sys
+from typing import NamedTuple
+
+class Parameter(NamedTuple):
+    name: str
+    type: str = None
+    description: str = None
+    required: bool = None
+    display_name: str = None
+    extra: tuple = ()
+
+class Response(NamedTuple):
+    status_code: str
+    description: str = None
+    # Type of the application/json body (RAML)
+    body_type: str = None
+    # Example text (HTML)
+    example: str = None
+    extra: tuple = ()
+
+class Endpoint(NamedTuple):
+    path: str
+    # Lower case, as in OpenAPI documents
+    method: str
+    parameters: tuple = ()
+    responses: tuple = ()
+
+RAML_PARAMETER_KEYS = {'description': 'description', 'type': 'type', 'required': 'required',
+                       'displayName': 'display_name'}
+RAML_RESPONSE_KEYS = {'description', 'body'}
+MEDIA_TYPE = 'application/json'
+# `extra` of the responses of an HTML record whose response_examples are
+# keyed by status code, unlike the list parse_html_v2 writes
+KEYED_EXAMPLE = (('keyed', True),)
+
+class RecordTable:
+    """
+    Builds records with interned strings, returning the stored record for
+    every one equal to a record built before.
+    """
+
+    def __init__(self):
+        self.records = {}
+
+    def share(self, record):
+        try:
+            return self.records.setdefault(record, record)
+        except TypeError:  # unhashable values in `extra`, e.g. an inline RAML type
+            return record
+
+    def record(self, record):
+        """Returns the shared copy of a Parameter or Response with its strings interned."""
+        try:
+            # Most are equal to one built before
+            return self.records[record]
+        except (KeyError, TypeError):
+            return self.share(record._make(sys.intern(value) if type(value) is str else value for value in record))
+
+    def endpoint(self, path, method, parameters=(), responses=()):
+        return Endpoint(sys.intern(path), sys.intern(method.lower()),
+                        self.share(tuple(map(self.record, parameters))),
+                        self.share(tuple(map(self.record, responses))))
+
+    def html_endpoint(self, data):
+        """
+        Returns the record of a parse_html_v2 record, or of a parse_html one,
+        whose response examples are keyed by status code.
+        """
+        examples = data.get('response_examples') or []
+        if isinstance(examples, dict):
+            responses = [Response(str(code), example=(example or {}).get('example'), extra=KEYED_EXAMPLE)
+                         for code, example in examples.items()]
+        else:
+            responses = [Response(example['status_code'], example=example.get('example')) for example in examples]
+        parameters = [Parameter(param['name'], param.get('type'), param.get('description'))
+                      for param in data.get('query_params') or []]
+        return self.endpoint(data['path'], data['method'], parameters, responses)
+
+    def raml_endpoint(self, path, method, details):
+        """Returns the record of the {"parameters", "responses"} details of a method in raml_api_details.json."""
+        parameters = [self.raml_parameter(name, definition)
+                      for name, definition in (details.get('parameters') or {}).items()]
+        responses = [self.raml_response(code, definition)
+                     for code, definition in (details.get('responses') or {}).items()]
+        return self.endpoint(path, method, [param for param in parameters if param is not None],
+                             [response for response in responses if response is not None])
+
+    def raml_parameter(self, name, definition):
+        """Returns the record of one RAML query parameter, or None if its definition is not a mapping."""
+        if not isinstance(definition, dict):
+            return None
+        extra = () if definition.keys() <= RAML_PARAMETER_KEYS.keys() else \
+            tuple((key, value) for key, value in definition.items() if key not in RAML_PARAMETER_KEYS)
+        return self.record(Parameter(name, definition.get('type'), definition.get('description'),
+                                     definition.get('required'), definition.get('displayName'), extra))
+
+    def raml_response(self, code, definition):
+        """Returns the record of one RAML response, or None if its definition is not a mapping."""
+        if not isinstance(definition, dict):
+            return None
+        body = definition.get('body')
+        media = body.get(MEDIA_TYPE) if isinstance(body, dict) else None
+        body_type = media.get('type') if isinstance(media, dict) and isinstance(media.get('type'), str) else None
+        # A body holding more than the type is kept as it is
+        simple = body_type is not None and len(body) == 1 and len(media) == 1
+        extra = () if definition.keys() <= RAML_RESPONSE_KEYS and (simple or 'body' not in definition) else \
+            tuple((key, value) for key, value in definition.items()
+                  if key != 'description' and not (key == 'body' and simple))
+        return self.record(Response(str(code), definition.get('description'), body_type, extra=extra))
+
+def html_endpoints(data, table=None):
+    """Returns the records of a list of HTML endpoint records, loaded from JSON or records already."""
+    table = table or RecordTable()
+    return [endpoint if isinstance(endpoint, Endpoint) else table.html_endpoint(endpoint) for endpoint in data]
+
+def html_json(endpoint):
+    """Returns the parse_html_v2 JSON record of an Endpoint."""
+    return {
+        'path': endpoint.path,
+        'method': endpoint.method.upper(),
+        'query_params': [{'name': param.name, 'type': param.type, 'description': param.description}
+                         for param in endpoint.parameters],
+        'response_examples': [{'status_code': response.status_code, 'example': response.example}
+                              for response in endpoint.responses],
+    }
+
+def raml_details(api_details, table=None):
+    """
+    Returns raml_api_details.json data with a record for every method:
+    {"paths": {path: {method: Endpoint}}, "schemas": {...}}.
+    """
+    table = table or RecordTable()
+    paths = {path: {method: details if isinstance(details, Endpoint) else table.raml_endpoint(path, method, details)
+                    for method, details in methods.items()}
+             for path, methods in (api_details.get('paths') or {}).items()}
+    return dict(api_details, paths=paths)
+
+def _without_none(fields):
+    return {key: value for key, value in fields if value is not None}
+
+def raml_endpoint_json(endpoint):
+    """Returns the {"parameters", "responses"} details of a method, as in raml_api_details.json."""
+    parameters = {}
+    for param in endpoint.parameters:
+        parameters[param.name] = _without_none([('description', param.description), ('type', param.type),
+                                                ('required', param.required), ('displayName', param.display_name),
+                                                *param.extra])
+    responses = {}
+    for response in endpoint.responses:
+        body = {MEDIA_TYPE: {'type': response.body_type}} \
+            if response.body_type is not None and 'body' not in dict(response.extra) else None
+        responses[response.status_code] = _without_none([('description', response.description), ('body', body),
+                                                          *response.extra])
+    return {'parameters': parameters, 'responses': responses}
+
+def raml_json(api_details):
+    """Returns the raml_api_details.json data of raml_details data."""
+    paths = {path: {method: raml_endpoint_json(endpoint) if isinstance(endpoint, Endpoint) else endpoint
+                    for method, endpoint in methods.items()}
+             for path, methods in api_details.get('paths', {}).items()}
+    return dict(api_details, paths=paths)
@@ -0,0 +1,138 @@
+// Client of the search index that search_index.py writes (see its docstring
+// for the format). The manifest is fetched once; each query term then needs
+// the shards of its prefix, and the results the endpoint files of their ids,
+// each fetched on first use and kept. The matching follows SearchIndex.search:
+// every term must match a token, or the start of one for terms of
+// prefix_min_length characters or more, and the endpoints are ranked by the
+// fields the terms matched in.
+const KixSearch = (function() {
+  const WORD = /[A-Za-z0-9]+/g;
+  const EXACT_BONUS = 1;
+
+  function fetchJson(url) {
+    return fetch(url).then(function(response) {
+      if (!response.ok) {
+        throw new Error(url + ": " + response.status);
+      }
+      return response.json();
+    });
+  }
+
+  // The terms of a query, as search_index.query_terms: the stopwords and
+  // numbers are left out, as they are not indexed.
+  function queryTerms(query, stopwords) {
+    return (query.match(WORD) || []).map(function(word) {
+      return word.toLowerCase();
+    }).filter(function(word) {
+      return word.length >= 2 && stopwords.indexOf(word) < 0 && !/^[0-9]+$/.test(word);
+    });
+  }
+
+  function SearchIndex(dir) {
+    this.dir = dir;
+    this.shards = {};
+    this.endpointFiles = {};
+    const self = this;
+    this.ready = fetchJson(dir + "manifest.json").then(function(manifest) {
+      self.manifest = manifest;
+      return self;
+    });
+  }
+
+  SearchIndex.prototype.load = function(cache, key, entry) {
+    if (!cache[key]) {
+      cache[key] = fetchJson(this.dir + entry.file + "?v=" + entry.sha256);
+    }
+    return cache[key];
+  };
+
+  SearchIndex.prototype.shard = function(key) {
+    return this.load(this.shards, key, this.manifest.shards[key]);
+  };
+
+  SearchIndex.prototype.endpoint = function(id) {
+    const number = Math.floor(id / this.manifest.endpoints_per_file);
+    const perFile = this.manifest.endpoints_per_file;
+    return this.load(this.endpointFiles, number, this.manifest.endpoint_files[number]).then(function(rows) {
+      return rows[id % perFile];
+    });
+  };
+
+  // The shards of the tokens a term matches, as in search_index.term_shards.
+  function termShards(term, keys, prefix) {
+    let owner = null;
+    keys.forEach(function(key) {
+      if (term.startsWith(key) && (owner === null || key.length > owner.length)) {
+        owner = key;
+      }
+    });
+    const shards = owner === null ? [] : [owner];
+    return prefix ? shards.concat(keys.filter(function(key) {
+      return key.length > term.length && key.startsWith(term);
+    })) : shards;
+  }
+
+  SearchIndex.prototype.termScores = function(term) {
+    const self = this;
+    const manifest = this.manifest;
+    const prefix = term.length >= manifest.prefix_min_length;
+    const keys = termShards(term, Object.keys(manifest.shards), prefix);
+    return Promise.all(keys.map(function(key) { return self.shard(key); })).then(function(shards) {
+      const scores = new Map();
+      shards.forEach(function(shard) {
+        addScores(shard, prefix, term, manifest.weights, scores);
+      });
+      return scores;
+    });
+  };
+
+  function addScores(shard, prefix, term, weights, scores) {
+    const matches = prefix
+      ? Object.keys(shard).filter(function(token) { return token.startsWith(term); })
+      : (shard[term] ? [term] : []);
+    matches.forEach(function(token) {
+      Object.keys(shard[token]).forEach(function(field) {
+        const weight = weights[field] + (token === term ? EXACT_BONUS : 0);
+        let id = 0;
+        shard[token][field].forEach(function(delta) {
+          id += delta;
+          scores.set(id, Math.max(scores.get(id) || 0, weight));
+        });
+      });
+    });
+  }
+
+  // Resolves to the matching endpoints, best first: {method, path, summary,
+  // tags, operationId, resource, score}.
+  SearchIndex.prototype.search = function(query, limit) {
+    const self = this;
+    return this.ready.then(function() {
+      const terms = queryTerms(query, self.manifest.stopwords || []);
+      return Promise.all(terms.map(function(term) { return self.termScores(term); }));
+    }).then(function(perTerm) {
+      if (!perTerm.length) {
+        return [];
+      }
+      let total = perTerm[0];
+      perTerm.slice(1).forEach(function(scores) {
+        const next = new Map();
+        total.forEach(function(score, id) {
+          if (scores.has(id)) {
+            next.set(id, score + scores.get(id));
+          }
+        });
+        total = next;
+      });
+      return Promise.all(Array.from(total.entries()).sort(function(a, b) {
+        return b[1] - a[1] || a[0] - b[0];
+      }).slice(0, limit || 20).map(function(entry) {
+        return self.endpoint(entry[0]).then(function(row) {
+          return {method: row[0], path: row[1], summary: row[2], tags: row[3], operationId: row[4],
+                  resource: row[5], score: entry[1]};
+        });
+      }));
+    });
+  };
+
+  return {SearchIndex: SearchIndex, queryTerms: queryTerms};
+})();
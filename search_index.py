@@ -0,0 +1,339 @@
+"""
+Prebuilt inverted search index over the endpoints of openapi.yaml, for the
+docs site and the command line.
+
+Tokens are taken from each operation's path, summary, description,
+operationId and tags, from its parameter names, and from the property names
+of the schemas its request and response bodies reference (following $refs
+between schemas). Identifiers are also split at camel case, so `TicketID`
+is found by `ticketid`, `ticket` and `id`. Each token maps to the ids of the
+endpoints it occurs in, per field: path, parameter, property and text.
+
+The index is written as static JSON to SEARCH_DIR:
+
+    manifest.json       the shard key (token prefix) and content hash of
+                        each file, and the stopwords queries leave out
+    endpoints-<n>.json  the endpoint table in files of ENDPOINTS_PER_FILE:
+                        method, path, summary, tags, operationId and the
+                        resource shard of index.html
+    tokens-<key>.json   the tokens starting with the key, and their posting
+                        lists of endpoint ids (delta-encoded); keys are two
+                        characters long, longer where a shard would
+                        exceed SHARD_MAX_BYTES
+
+A lookup needs the manifest, the shards of its query terms and the endpoint
+files of the results shown; search.js does that in the browser, SearchIndex
+here. Every term of
+a query must match (as a token, or as the prefix of one for terms of
+PREFIX_MIN_LENGTH characters or more); results are ranked by the fields
+the terms matched in.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+import instrumentation
+import update_openapi
+
+SEARCH_DIR = 'search'
+MANIFEST_FILE = 'manifest.json'
+METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+# Tokens are sharded by their first PREFIX_LENGTH characters, or by longer
+# prefixes where a shard would exceed SHARD_MAX_BYTES
+PREFIX_LENGTH = 2
+SHARD_MAX_BYTES = 32 * 1024
+ENDPOINTS_PER_FILE = 500
+PREFIX_MIN_LENGTH = 3
+# Field codes of the posting lists and the score of a match in them
+FIELD_WEIGHTS = {'p': 4, 'q': 3, 's': 2, 't': 1}
+EXACT_BONUS = 1
+WORD = re.compile(r'[A-Za-z0-9]+')
+CAMEL_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+STOPWORDS = frozenset('an and are as at be by for from has if in is it of on or that the this to with'.split())
+
+def tokens(text):
+    """The index tokens of a text: its lowercased words, and the camel case parts of each."""
+    found = set()
+    for word in WORD.findall(text or ''):
+        found.add(word.lower())
+        found.update(part.lower() for part in CAMEL_PART.findall(word))
+    return {token for token in found if len(token) >= 2 and token not in STOPWORDS and not token.isdigit()}
+
+def query_terms(query):
+    """
+    The terms of a query: its lowercased words, as search.js splits them,
+    without the stopwords and numbers that tokens() does not index.
+    """
+    return [term for term in (word.lower() for word in WORD.findall(query))
+            if len(term) >= 2 and term not in STOPWORDS and not term.isdigit()]
+
+def _shard_keys(token_sizes, key, max_bytes, keys):
+    """
+    Assigns the tokens starting with `key` to shards: one shard if they fit
+    in max_bytes, else the tokens equal to `key` stay in its shard and the
+    others are split by their next character.
+    """
+    if sum(token_sizes.values()) <= max_bytes or all(len(token) <= len(key) for token in token_sizes):
+        keys.update(dict.fromkeys(token_sizes, key))
+        return
+    groups = defaultdict(dict)
+    for token, size in token_sizes.items():
+        groups[token[:len(key) + 1]][token] = size
+    for sub_key, group in groups.items():
+        if sub_key == key:
+            keys.update(dict.fromkeys(group, key))
+        else:
+            _shard_keys(group, sub_key, max_bytes, keys)
+
+def shard_keys(postings, max_bytes=None):
+    """
+    Maps each token to the key of its shard: its first PREFIX_LENGTH
+    characters, or a longer prefix where the shard would exceed max_bytes
+    (SHARD_MAX_BYTES, estimated from the token and posting lengths).
+    """
+    max_bytes = SHARD_MAX_BYTES if max_bytes is None else max_bytes
+    groups = defaultdict(dict)
+    for token, fields in postings.items():
+        groups[token[:PREFIX_LENGTH]][token] = len(token) + 8 + sum(4 + 4 * len(ids) for ids in fields.values())
+    keys = {}
+    for key, group in groups.items():
+        _shard_keys(group, key, max_bytes, keys)
+    return keys
+
+def term_shards(term, shard_keys, prefix):
+    """
+    The keys of the shards holding the tokens a term matches: the longest
+    shard key the term starts with and, if the term matches as a prefix, the
+    shards of longer keys starting with the term.
+    """
+    owner = max((key for key in shard_keys if term.startswith(key)), key=len, default=None)
+    keys = [owner] if owner is not None else []
+    if prefix:
+        keys += [key for key in shard_keys if len(key) > len(term) and key.startswith(term)]
+    return keys
+
+def _refs(value, found):
+    if isinstance(value, dict):
+        ref = value.get('$ref')
+        if isinstance(ref, str) and ref.startswith('#/components/schemas/'):
+            found.add(ref.rsplit('/', 1)[1])
+        for item in value.values():
+            _refs(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _refs(item, found)
+    return found
+
+def _property_names(schema, found):
+    if isinstance(schema, dict):
+        for name, item in (schema.get('properties') or {}).items():
+            found.add(name)
+            _property_names(item, found)
+        for key in ('items', 'additionalProperties'):
+            _property_names(schema.get(key), found)
+        for key in ('allOf', 'anyOf', 'oneOf'):
+            for item in schema.get(key) or []:
+                _property_names(item, found)
+    return found
+
+def schema_properties(schemas):
+    """Maps every schema to the property names of it and of the schemas it references, transitively."""
+    own = {name: _property_names(schema, set()) for name, schema in schemas.items()}
+    refs = {name: _refs(schema, set()) for name, schema in schemas.items()}
+    closed = {}
+    for name in schemas:
+        seen, pending, names = {name}, [name], set()
+        while pending:
+            current = pending.pop()
+            names |= own.get(current, set())
+            for ref in refs.get(current, ()):
+                if ref not in seen:
+                    seen.add(ref)
+                    pending.append(ref)
+        closed[name] = names
+    return closed
+
+def build_index(openapi_data):
+    """
+    Returns (endpoints, postings): the endpoint table, and {token: {field:
+    sorted endpoint ids}} with the fields of FIELD_WEIGHTS.
+    """
+    paths = openapi_data.get('paths') or {}
+    shards = update_openapi.shard_names(paths)
+    properties = schema_properties(((openapi_data.get('components') or {}).get('schemas')) or {})
+    endpoints = []
+    postings = defaultdict(lambda: defaultdict(list))
+
+    def add(text_tokens, field, endpoint_id):
+        for token in text_tokens:
+            ids = postings[token][field]
+            if not ids or ids[-1] != endpoint_id:
+                ids.append(endpoint_id)
+
+    for path, path_item in paths.items():
+        if not isinstance(path_item, dict):
+            continue
+        for method, operation in path_item.items():
+            if method not in METHODS or not isinstance(operation, dict):
+                continue
+            endpoint_id = len(endpoints)
+            # Fields may be present but null (`summary:` with no value in YAML)
+            summary, description, operation_id = (operation.get(key) or '' for key in
+                                                  ('summary', 'description', 'operationId'))
+            tags = [tag for tag in operation.get('tags') or [] if isinstance(tag, str)]
+            endpoints.append([method.upper(), path, summary, tags, operation_id, shards[path]])
+            add(tokens(path), 'p', endpoint_id)
+            for parameter in list(path_item.get('parameters') or []) + list(operation.get('parameters') or []):
+                if isinstance(parameter, dict) and parameter.get('name'):
+                    add(tokens(parameter['name']), 'q', endpoint_id)
+            referenced = _refs({key: operation.get(key) for key in ('requestBody', 'responses')}, set())
+            add(set().union(*(tokens(name) for name in referenced),
+                            *(tokens(name) for ref in referenced for name in properties.get(ref, ()))),
+                's', endpoint_id)
+            add(tokens(' '.join([summary, description, operation_id, *tags])), 't', endpoint_id)
+    instrumentation.count('search.endpoints', len(endpoints))
+    instrumentation.count('search.tokens', len(postings))
+    return endpoints, postings
+
+def delta_encode(ids):
+    return [ids[0]] + [current - previous for previous, current in zip(ids, ids[1:])] if ids else []
+
+def delta_decode(deltas):
+    ids, total = [], 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
+
+def _file_entry(files, file_name, content, **fields):
+    files[file_name] = content
+    return dict(file=file_name, sha256=hashlib.sha256(content).hexdigest()[:12], **fields)
+
+def shard_files(endpoints, postings, max_bytes=None):
+    """Returns {file name: content} of the index files, the manifest included."""
+    files = {}
+    manifest = {'prefix_min_length': PREFIX_MIN_LENGTH, 'weights': FIELD_WEIGHTS, 'stopwords': sorted(STOPWORDS),
+                'endpoints': len(endpoints), 'tokens': len(postings),
+                'endpoints_per_file': ENDPOINTS_PER_FILE, 'endpoint_files': [], 'shards': {}}
+    for start in range(0, len(endpoints), ENDPOINTS_PER_FILE):
+        manifest['endpoint_files'].append(_file_entry(
+            files, f'endpoints-{start // ENDPOINTS_PER_FILE}.json',
+            update_openapi.dump_minified(endpoints[start:start + ENDPOINTS_PER_FILE])))
+
+    shards = defaultdict(dict)
+    for token, key in sorted(shard_keys(postings, max_bytes).items()):
+        shards[key][token] = {field: delta_encode(ids) for field, ids in postings[token].items()}
+    for key, entries in sorted(shards.items()):
+        # Keys are lowercase letters and digits only, so they are safe file names
+        manifest['shards'][key] = _file_entry(files, f'tokens-{key}.json', update_openapi.dump_minified(entries),
+                                              tokens=len(entries))
+    files[MANIFEST_FILE] = update_openapi.dump_minified(manifest)
+    return files
+
+def write_index(openapi_data, search_dir=SEARCH_DIR, max_bytes=None):
+    """
+    Builds the index of a document and writes it to search_dir, rewriting
+    only the files that changed and removing those no longer used. Returns
+    the manifest.
+    """
+    with instrumentation.phase('search.build'):
+        files = shard_files(*build_index(openapi_data), max_bytes)
+    os.makedirs(search_dir, exist_ok=True)
+    try:
+        previous = update_openapi.load_json_file(os.path.join(search_dir, MANIFEST_FILE))
+        stale = [entry['file'] for entry in list(previous.get('shards', {}).values())
+                 + previous.get('endpoint_files', []) if entry['file'] not in files]
+    except (FileNotFoundError, json.JSONDecodeError):
+        stale = []
+    with instrumentation.phase('search.write'):
+        update_openapi.write_changed_files(search_dir, files, stale, counter='search.shards_written')
+    return json.loads(files[MANIFEST_FILE])
+
+class SearchIndex:
+    """
+    Queries an index written by write_index, loading only the shards of the
+    query terms and the endpoint files of the results, each once.
+    """
+
+    def __init__(self, search_dir=SEARCH_DIR):
+        self.search_dir = search_dir
+        self.manifest = self._load(MANIFEST_FILE)
+        self.shards = {}
+        self.endpoint_files = {}
+
+    def _load(self, file_name):
+        return update_openapi.load_json_file(os.path.join(self.search_dir, file_name))
+
+    def shard(self, key):
+        if key not in self.shards:
+            self.shards[key] = self._load(self.manifest['shards'][key]['file'])
+            instrumentation.count('search.shards_loaded')
+        return self.shards[key]
+
+    def endpoint(self, endpoint_id):
+        number = endpoint_id // self.manifest['endpoints_per_file']
+        if number not in self.endpoint_files:
+            self.endpoint_files[number] = self._load(self.manifest['endpoint_files'][number]['file'])
+        return self.endpoint_files[number][endpoint_id % self.manifest['endpoints_per_file']]
+
+    def term_scores(self, term):
+        """Returns {endpoint id: score} of the tokens a term matches."""
+        scores = defaultdict(int)
+        prefix = len(term) >= self.manifest['prefix_min_length']
+        for key in term_shards(term, self.manifest['shards'], prefix):
+            shard = self.shard(key)
+            matches = [token for token in shard if token.startswith(term)] if prefix else \
+                [term] if term in shard else []
+            for token in matches:
+                for field, deltas in shard[token].items():
+                    weight = self.manifest['weights'][field] + (EXACT_BONUS if token == term else 0)
+                    for endpoint_id in delta_decode(deltas):
+                        scores[endpoint_id] = max(scores[endpoint_id], weight)
+        return scores
+
+    def search(self, query, limit=20):
+        """Returns the endpoints matching every term of the query, best first, as dicts."""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        total = None
+        for term in terms:
+            scores = self.term_scores(term)
+            total = scores if total is None else {endpoint_id: score + scores[endpoint_id]
+                                                  for endpoint_id, score in total.items() if endpoint_id in scores}
+            if not total:
+                return []
+        ranked = sorted(total.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        keys = ('method', 'path', 'summary', 'tags', 'operationId', 'resource')
+        return [dict(zip(keys, self.endpoint(endpoint_id)), score=score) for endpoint_id, score in ranked]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the search index of openapi.yaml, or query it.')
+    parser.add_argument('--spec', default=update_openapi.OPENAPI_FILE, help='OpenAPI file to index')
+    parser.add_argument('--dir', default=SEARCH_DIR, help='directory of the index')
+    parser.add_argument('--query', help='search the index instead of building it')
+    parser.add_argument('--limit', type=int, default=20, help='results shown per query')
+    instrumentation.add_arguments(parser, 'search_index_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        if args.query is None:
+            manifest = write_index(update_openapi.load_yaml_file(args.spec), args.dir)
+            print(f"Indexed {manifest['endpoints']} endpoints, {manifest['tokens']} tokens in "
+                  f"{len(manifest['shards'])} shards under {args.dir}/.")
+            return 0
+        start = time.perf_counter()
+        results = SearchIndex(args.dir).search(args.query, args.limit)
+        milliseconds = (time.perf_counter() - start) * 1000
+    for result in results:
+        print(f"{result['method']:<7} {result['path']:<60} {result['summary']}")
+    print(f"{len(results)} results in {milliseconds:.1f} ms.")
+    return 0 if results else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
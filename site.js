@@ -0,0 +1,85 @@
+// Script of the pages static_site.py renders. The pages are complete without
+// it: it only fills the collapsed example and schema blocks (<details
+// data-block>) when they are opened, from the page's data file (data-blocks
+// of <body>, fetched on first use), and runs the search box of the index page
+// against the index search_index.py writes.
+(function() {
+  let blocks = null;
+
+  function loadBlocks() {
+    if (!blocks) {
+      const url = document.body.dataset.blocks;
+      blocks = fetch(url).then(function(response) {
+        if (!response.ok) {
+          throw new Error(url + ": " + response.status);
+        }
+        return response.json();
+      });
+    }
+    return blocks;
+  }
+
+  function escapeHtml(text) {
+    return text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+  }
+
+  // The JSON text of a block, with its schema references as links.
+  function render(text) {
+    return escapeHtml(text).replace(/&quot;#\/components\/schemas\/([A-Za-z0-9._-]+)&quot;/g, function(ref, name) {
+      return '&quot;<a href="schemas.html#' + name + '">#/components/schemas/' + name + '</a>&quot;';
+    });
+  }
+
+  // toggle does not bubble, so it is caught on the way down
+  document.addEventListener("toggle", function(event) {
+    const details = event.target;
+    if (!details.open || !details.dataset || !details.dataset.block || details.dataset.loaded) {
+      return;
+    }
+    details.dataset.loaded = "1";
+    loadBlocks().then(function(data) {
+      const pre = document.createElement("pre");
+      pre.innerHTML = render(data[details.dataset.block]);
+      details.appendChild(pre);
+    }).catch(function(error) {
+      delete details.dataset.loaded;
+      console.error(error);
+    });
+  }, true);
+
+  // The id of an operation's section, as static_site.anchor gives it
+  function anchor(result) {
+    return result.operationId || (result.method.toLowerCase() + result.path).replace(/[^A-Za-z0-9_-]/g, "-");
+  }
+
+  const input = document.getElementById("search");
+  if (!input || typeof KixSearch === "undefined") {
+    return;
+  }
+  const index = new KixSearch.SearchIndex(input.dataset.index);
+  const list = document.getElementById("search-results");
+  let pending = 0;
+  index.ready.then(function() {
+    input.parentNode.hidden = false;
+  }).catch(function() {});
+  input.addEventListener("input", function() {
+    const query = input.value;
+    const current = ++pending;
+    index.search(query, 30).then(function(results) {
+      if (current !== pending) {
+        return;
+      }
+      list.innerHTML = "";
+      results.forEach(function(result) {
+        const item = document.createElement("li");
+        const link = document.createElement("a");
+        link.href = result.resource + ".html#" + anchor(result);
+        const method = escapeHtml(result.method);
+        link.innerHTML = '<span class="method ' + method.toLowerCase() + '">' + method + "</span>"
+          + escapeHtml(result.path) + " " + escapeHtml(result.summary || "");
+        item.appendChild(link);
+        list.appendChild(item);
+      });
+    });
+  });
+})();
@@ -0,0 +1,81 @@
+"""
+Memory-mapped access to the input files of the pipeline scripts.
+
+The loaders used to read whole files into Python strings: the HTML page, the
+JSON intermediates and every RAML file, the latter kept for the whole run.
+Here files are mapped read-only instead, and the mappings are handed to the
+parsers that take any bytes-like object (lxml, orjson, hashlib, re) as they
+are, so nothing is decoded into str or copied first. Mapped pages are backed
+by the file: they are shared with the page cache and the kernel can drop them
+again under memory pressure, which it cannot do with a copy on the heap.
+"""
+import contextlib
+import mmap
+import os
+from collections import OrderedDict
+
+import instrumentation
+
+# Smaller files are read into bytes: a mapping takes at least a page and a
+# file descriptor, and is no cheaper to set up than a read.
+MAP_MIN_BYTES = mmap.PAGESIZE
+
+def map_file(file_path):
+    """
+    Returns the content of a file as a read-only buffer: a mmap, or bytes
+    for files smaller than MAP_MIN_BYTES (and empty files, which cannot be
+    mapped). A mapping sees later writes to the file, so it must not be kept
+    across changes; reading past the end of a truncated file faults.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MAP_MIN_BYTES:
+            return f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+@contextlib.contextmanager
+def mapped(file_path):
+    """Maps a file for the duration of the block."""
+    buffer = map_file(file_path)
+    try:
+        yield buffer
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+class LRUCache:
+    """
+    A dict-like cache holding at most `max_size` entries; the least recently
+    used entry is dropped when a new one is added to a full cache. Dropped
+    mappings are closed once nothing uses them any more.
+    """
+
+    def __init__(self, max_size, name='lru'):
+        self.max_size = max_size
+        self.name = name
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            instrumentation.count(f'{self.name}.evictions')
+
+    def get(self, key, default=None):
+        return self[key] if key in self.entries else default
+
+    def pop(self, key, default=None):
+        return self.entries.pop(key, default)
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,346 @@
+"""
+Static HTML documentation of openapi.yaml, rendered at build time.
+
+index.html renders the document in the browser with Swagger UI: the page
+is blank until the Swagger UI bundle, the spec and its script have run.
+This script renders the document to SITE_DIR instead, as plain HTML that
+shows without any script:
+
+    index.html          the resources, and a search box over the index of
+                        search_index.py
+    <resource>.html     the operations of a resource (the paths of a shard
+                        of update_openapi.shard_names): parameters, request
+                        body and responses
+    schemas.html        the component schemas and their properties
+    data/<page>.<hash>.json
+                        the examples and inline schemas of a page, which
+                        are collapsed blocks; site.js fills a block from
+                        this file when it is opened
+    assets/<name>.<hash>.<ext>
+                        site.css, site.js and search.js, named by their
+                        content hash so they can be cached for good
+    manifest.json       the asset files, and the digest and files of each
+                        page
+
+The digest of a page covers its part of the document, the info block, the
+asset names and this script, so a rebuild renders only the pages whose part
+changed, in parallel (--jobs). The files of pages that no longer exist, and
+of replaced assets, are removed.
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import instrumentation
+import openapi_diff
+import search_index
+import update_openapi
+
+SITE_DIR = 'site'
+MANIFEST_FILE = 'manifest.json'
+ASSET_DIR = 'assets'
+DATA_DIR = 'data'
+# Sources of the assets, next to this script
+ASSETS = ('site.css', 'search.js', 'site.js')
+INDEX_PAGE = 'index'
+SCHEMAS_PAGE = 'schemas'
+SCHEMA_REF = '#/components/schemas/'
+HASH_LENGTH = 12
+ROOT = Path(__file__).resolve().parent
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+def asset_files():
+    """Returns {asset: fingerprinted file name} and {file name: content} of the ASSETS."""
+    names, files = {}, {}
+    for asset in ASSETS:
+        content = (ROOT / asset).read_bytes()
+        stem, extension = os.path.splitext(asset)
+        names[asset] = f'{ASSET_DIR}/{stem}.{content_hash(content)}{extension}'
+        files[names[asset]] = content
+    return names, files
+
+def escape(text):
+    return '' if text is None else html.escape(str(text))
+
+def anchor(path, method, operation):
+    return operation.get('operationId') or re.sub(r'[^A-Za-z0-9_-]', '-', f'{method}{path}')
+
+def schema_link(ref):
+    if not ref.startswith(SCHEMA_REF):
+        return escape(ref)
+    name = escape(ref[len(SCHEMA_REF):])
+    return f'<a href="{SCHEMAS_PAGE}.html#{name}">{name}</a>'
+
+def type_html(schema):
+    """A short description of a schema: its type and format, or a link to the schema it references."""
+    if not isinstance(schema, dict):
+        return ''
+    if '$ref' in schema:
+        return schema_link(schema['$ref'])
+    if schema.get('type') == 'array':
+        return f"array of {type_html(schema.get('items')) or 'any'}"
+    text = escape(schema.get('type', ''))
+    if 'format' in schema:
+        text += f" ({escape(schema['format'])})"
+    if 'enum' in schema:
+        text += ': ' + ', '.join(f'<code>{escape(value)}</code>' for value in schema['enum'])
+    return text
+
+def lazy_block(blocks, label, value):
+    """Adds a value to the blocks of a page and returns the collapsed block that shows it."""
+    key = f'b{len(blocks)}'
+    blocks[key] = json.dumps(value, indent=2, ensure_ascii=False)
+    return f'<details class="block" data-block="{key}"><summary>{escape(label)}</summary></details>'
+
+def schema_html(schema, blocks):
+    # References, and arrays of them, are links; other schemas are collapsed
+    if isinstance(schema, dict) and ('$ref' in schema or schema.get('type') == 'array'
+                                     and '$ref' in (schema.get('items') or {})) and len(schema) <= 2:
+        return f'<p>Schema: {type_html(schema)}</p>'
+    return lazy_block(blocks, 'Schema', schema)
+
+def content_html(content, blocks):
+    parts = []
+    for media_type, media in (content or {}).items():
+        media = media or {}
+        parts.append(f'<p><code>{escape(media_type)}</code></p>')
+        if 'schema' in media:
+            parts.append(schema_html(media['schema'], blocks))
+        if 'example' in media:
+            parts.append(lazy_block(blocks, 'Example', media['example']))
+        for name, example in (media.get('examples') or {}).items():
+            value = example.get('value', example) if isinstance(example, dict) else example
+            parts.append(lazy_block(blocks, f'Example: {name}', value))
+    return ''.join(parts)
+
+def parameters_html(parameters):
+    rows = ''.join(
+        f"<tr><td><code>{escape(param.get('name'))}</code>"
+        f"{' <span class=required>*</span>' if param.get('required') else ''}</td>"
+        f"<td>{escape(param.get('in'))}</td><td>{type_html(param.get('schema'))}</td>"
+        f"<td class=description>{escape(param.get('description'))}</td></tr>"
+        for param in parameters)
+    return ('<h3>Parameters</h3><table><tr><th>Name</th><th>In</th><th>Type</th><th>Description</th></tr>'
+            f'{rows}</table>')
+
+def operation_html(path, method, operation, path_parameters, blocks):
+    parts = [f'<section class="operation" id="{escape(anchor(path, method, operation))}">',
+             f'<h2><span class="method {method}">{method}</span> <code>{escape(path)}</code></h2>']
+    if operation.get('summary'):
+        parts.append(f"<p><strong>{escape(operation['summary'])}</strong></p>")
+    if operation.get('description') and operation.get('description') != operation.get('summary'):
+        parts.append(f"<p class=description>{escape(operation['description'])}</p>")
+    # Operation parameters override the path's of the same name and location
+    parameters = {(param.get('name'), param.get('in')): param
+                  for param in [*path_parameters, *(operation.get('parameters') or [])] if isinstance(param, dict)}
+    if parameters:
+        parts.append(parameters_html(parameters.values()))
+    body = operation.get('requestBody')
+    if isinstance(body, dict):
+        parts.append(f"<h3>Request body{' <span class=required>*</span>' if body.get('required') else ''}</h3>")
+        if body.get('description'):
+            parts.append(f"<p class=description>{escape(body['description'])}</p>")
+        parts.append(content_html(body.get('content'), blocks))
+    responses = operation.get('responses') or {}
+    if responses:
+        parts.append('<h3>Responses</h3><table><tr><th>Status</th><th>Description</th></tr>')
+        for code, response in sorted(responses.items(), key=lambda item: str(item[0])):
+            response = response or {}
+            parts.append(f"<tr><td>{escape(code)}</td><td><span class=description>"
+                         f"{escape(response.get('description'))}</span>"
+                         f"{content_html(response.get('content'), blocks)}</td></tr>")
+        parts.append('</table>')
+    parts.append('</section>')
+    return ''.join(parts)
+
+def operations(paths):
+    """Yields (path, method, operation, path parameters) in document order, methods in METHODS order."""
+    for path, item in paths.items():
+        for method in search_index.METHODS:
+            if isinstance(item.get(method), dict):
+                yield path, method, item[method], item.get('parameters') or []
+
+def resource_body(name, paths, blocks):
+    found = list(operations(paths))
+    toc = ''.join(f'<li><a href="#{escape(anchor(path, method, operation))}"><span class="method {method}">'
+                  f"{method}</span> <code>{escape(path)}</code> {escape(operation.get('summary'))}</a></li>"
+                  for path, method, operation, _ in found)
+    return (f'<h1>{escape(name)}</h1><ul class=toc>{toc}</ul>'
+            + ''.join(operation_html(*operation, blocks) for operation in found))
+
+def schemas_body(schemas, blocks):
+    parts = ['<h1>Schemas</h1><ul class=toc>']
+    parts.extend(f'<li><a href="#{escape(name)}">{escape(name)}</a></li>' for name in schemas)
+    parts.append('</ul>')
+    for name, schema in schemas.items():
+        schema = schema if isinstance(schema, dict) else {}
+        parts.append(f'<section class="operation" id="{escape(name)}"><h2>{escape(name)}</h2>')
+        if schema.get('description'):
+            parts.append(f"<p class=description>{escape(schema['description'])}</p>")
+        properties = schema.get('properties') or {}
+        if properties:
+            required = set(schema.get('required') or [])
+            parts.append('<table><tr><th>Property</th><th>Type</th><th>Description</th></tr>')
+            parts.extend(f"<tr><td><code>{escape(prop)}</code>"
+                         f"{' <span class=required>*</span>' if prop in required else ''}</td>"
+                         f"<td>{type_html(definition)}</td><td class=description>{escape((definition or {}).get('description'))}</td></tr>"
+                         for prop, definition in properties.items())
+            parts.append('</table>')
+        else:
+            parts.append(f'<p>{type_html(schema)}</p>')
+        parts.append(lazy_block(blocks, 'Schema', schema))
+        parts.append('</section>')
+    return ''.join(parts)
+
+def index_body(info, resources):
+    rows = ''.join(f'<tr><td><a href="{escape(name)}.html">{escape(name)}</a></td><td>{operation_count}</td>'
+                   f"<td>{escape(', '.join(tags))}</td></tr>" for name, operation_count, tags in resources)
+    return (f"<h1>{escape(info.get('title'))}</h1><p class=description>{escape(info.get('description'))}</p>"
+            '<div class="search" hidden><input type="search" id="search" data-index="../search/" '
+            'placeholder="Search paths, parameters, schema properties" autocomplete="off">'
+            '<ol class="search-results" id="search-results"></ol></div>'
+            '<table><tr><th>Resource</th><th>Operations</th><th>Tags</th></tr>'
+            f'{rows}</table><p><a href="{SCHEMAS_PAGE}.html">Schemas</a></p>')
+
+def page_html(title, body, context, data_file=None, scripts=('site.js',)):
+    info, assets = context['info'], context['assets']
+    script_tags = ''.join(f'<script defer src="{assets[script]}"></script>' for script in scripts)
+    data = f' data-blocks="{data_file}"' if data_file else ''
+    return (f'<!DOCTYPE html>\n<html lang="en"><head><meta charset="UTF-8">'
+            '<meta name="viewport" content="width=device-width, initial-scale=1">'
+            f"<title>{escape(title)} - {escape(info.get('title'))}</title>"
+            f"<link rel=\"stylesheet\" href=\"{assets['site.css']}\">{script_tags}</head>"
+            f'<body{data}><header><a href="{INDEX_PAGE}.html">{escape(info.get("title"))}</a>'
+            f"<span class=version>{escape(info.get('version'))}</span><nav>"
+            f'<a href="{SCHEMAS_PAGE}.html">Schemas</a><a href="../index.html">Swagger UI</a></nav></header>'
+            f'<main>{body}</main></body></html>\n')
+
+def render_page(task):
+    """Renders a page from its (kind, name, payload, context) task; returns {file name: content}."""
+    kind, name, payload, context = task
+    blocks = {}
+    if kind == INDEX_PAGE:
+        title, scripts, body = 'Resources', ('search.js', 'site.js'), index_body(context['info'], payload)
+    elif kind == SCHEMAS_PAGE:
+        title, scripts, body = 'Schemas', ('site.js',), schemas_body(payload, blocks)
+    else:
+        title, scripts, body = name, ('site.js',), resource_body(name, payload, blocks)
+    files = {}
+    data_file = None
+    if blocks:
+        content = update_openapi.dump_minified(blocks)
+        data_file = f'{DATA_DIR}/{name}.{content_hash(content)}.json'
+        files[data_file] = content
+    files[f'{name}.html'] = page_html(title, body, context, data_file, scripts).encode('utf-8')
+    return files
+
+def page_tasks(openapi_data):
+    """Returns the (kind, name, payload) of each page of a document."""
+    paths = openapi_data.get('paths') or {}
+    shards = update_openapi.shard_names(paths)
+    resources = {}
+    for path, item in paths.items():
+        resources.setdefault(shards[path], {})[path] = item
+    tasks = [('resource', name, resource_paths) for name, resource_paths in sorted(resources.items())]
+    summary = []
+    for name, resource_paths in sorted(resources.items()):
+        found = list(operations(resource_paths))
+        tags = sorted({tag for _, _, operation, _ in found for tag in operation.get('tags') or []})
+        summary.append([name, len(found), tags])
+    tasks.append((SCHEMAS_PAGE, SCHEMAS_PAGE, (openapi_data.get('components') or {}).get('schemas') or {}))
+    tasks.append((INDEX_PAGE, INDEX_PAGE, summary))
+    return tasks
+
+def page_digest(kind, name, payload, context):
+    return hashlib.sha256(openapi_diff.canonical([kind, name, payload, context])).hexdigest()
+
+def render_pages(tasks, jobs=None):
+    """
+    Renders the pages of the tasks in `jobs` worker processes (one per CPU
+    by default, none when this is already a worker process); returns their
+    files, in task order.
+    """
+    jobs = jobs or (1 if multiprocessing.parent_process() else os.cpu_count() or 1)
+    if jobs == 1 or len(tasks) <= 1:
+        return list(map(render_page, tasks))
+    else:
+        # Imported here so that runs in one process do not pay for it
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            results = executor.map(render_page, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+    return list(results)
+
+def load_manifest(site_dir):
+    try:
+        return update_openapi.load_json_file(os.path.join(site_dir, MANIFEST_FILE))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def build_site(openapi_data, site_dir=SITE_DIR, jobs=None):
+    """
+    Renders the pages of a document whose digest changed to site_dir, and
+    writes the assets and the manifest. Returns the manifest and the names
+    of the pages rendered.
+    """
+    with instrumentation.phase('site.plan'):
+        asset_names, files = asset_files()
+        context = {'info': openapi_data.get('info') or {}, 'assets': asset_names,
+                   'generator': content_hash(Path(__file__).read_bytes())}
+        previous = load_manifest(site_dir)
+        previous_pages = previous.get('pages', {})
+        pages, tasks = {}, []
+        for kind, name, payload in page_tasks(openapi_data):
+            digest = page_digest(kind, name, payload, context)
+            entry = previous_pages.get(name)
+            if entry and entry['digest'] == digest and all(os.path.exists(os.path.join(site_dir, file_name))
+                                                           for file_name in entry['files']):
+                pages[name] = entry
+            else:
+                pages[name] = {'digest': digest}
+                tasks.append((kind, name, payload, context))
+    with instrumentation.phase('site.render'):
+        rendered = render_pages(tasks, jobs)
+    for (_, name, _, _), page_files in zip(tasks, rendered):
+        pages[name]['files'] = sorted(page_files)
+        files.update(page_files)
+    instrumentation.count('site.pages_rendered', len(tasks))
+    instrumentation.count('site.pages_skipped', len(pages) - len(tasks))
+
+    manifest = {'assets': asset_names, 'pages': pages}
+    files[MANIFEST_FILE] = update_openapi.dump_minified(manifest)
+    current = set(asset_names.values()) | {file_name for entry in pages.values() for file_name in entry['files']}
+    stale = sorted({*previous.get('assets', {}).values(),
+                    *(file_name for entry in previous_pages.values() for file_name in entry.get('files', []))}
+                   - current)
+    with instrumentation.phase('site.write'):
+        for directory in (ASSET_DIR, DATA_DIR):
+            os.makedirs(os.path.join(site_dir, directory), exist_ok=True)
+        update_openapi.write_changed_files(site_dir, files, stale, counter='site.files_written')
+    return manifest, [name for _, name, _, _ in tasks]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render openapi.yaml to static HTML pages, one per resource.')
+    parser.add_argument('--spec', default=update_openapi.OPENAPI_FILE, help='OpenAPI file to render')
+    parser.add_argument('--dir', default=SITE_DIR, help='directory of the pages')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes rendering pages (default: CPU count)')
+    instrumentation.add_arguments(parser, 'static_site_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        start = time.perf_counter()
+        manifest, rendered = build_site(update_openapi.load_yaml_file(args.spec), args.dir, args.jobs)
+        seconds = time.perf_counter() - start
+    print(f"Rendered {len(rendered)} of {len(manifest['pages'])} pages to {args.dir}/ in {seconds:.2f}s.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+import artifacts
+
+DATA = {
+    "paths": {"/tickets": {"get": {"responses": {200: {"description": "Tickets"}},
+                                   "parameters": {"limit": {"type": "integer", "required": False}}}}},
+    "schemas": {"Ticket": {"examples": {"default": {"value": {"Title": "Drucker kaputt – bitte prüfen",
+                                                              "Priority": 2.5, "Tags": [], "Owner": None}}}}},
+}
+# What a JSON round trip gives: the integer status code becomes a string key
+EXPECTED = json.loads(json.dumps(DATA))
+
+class TestArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'raml_api_details.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def variants(self):
+        for fmt in artifacts.FORMATS:
+            if fmt == 'msgpack' and artifacts.msgpack is None:
+                continue
+            for compress in (None,) + artifacts.COMPRESSIONS:
+                if compress == 'zstd' and artifacts.zstandard is None:
+                    continue
+                yield fmt, compress
+
+    def test_every_format_round_trips_and_is_detected(self):
+        for fmt, compress in self.variants():
+            with self.subTest(fmt=fmt, compress=compress):
+                artifacts.write(DATA, self.file_path, fmt, compress)
+                self.assertEqual(artifacts.read(self.file_path), EXPECTED)
+
+    def test_stdlib_json_reads_and_writes_the_same_files(self):
+        compact = artifacts.dumps(DATA)
+        with mock.patch.object(artifacts, 'orjson', None):
+            self.assertEqual(json.loads(artifacts.dumps(DATA)), json.loads(compact))
+            self.assertEqual(artifacts.loads(compact), EXPECTED)
+
+    def test_indented_json_stays_readable(self):
+        artifacts.write(DATA, self.file_path, indent=2)
+        with open(self.file_path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertEqual(text, json.dumps(DATA, indent=2))
+        self.assertEqual(artifacts.read(self.file_path), EXPECTED)
+
+    def test_default_json_is_compact(self):
+        compact = artifacts.dumps(DATA)
+        self.assertNotIn(b'\n', compact)
+        self.assertLess(len(compact), len(artifacts.dumps(DATA, indent=2)))
+        self.assertEqual(json.loads(compact), EXPECTED)
+
+    def test_unavailable_formats_fail_clearly(self):
+        with self.assertRaises(ValueError):
+            artifacts.dumps(DATA, fmt='xml')
+        if artifacts.zstandard is None:
+            with self.assertRaises(ValueError):
+                artifacts.dumps(DATA, compress='zstd')
+
+if __name__ == '__main__':
+    unittest.main()
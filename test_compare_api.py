@@ -1,118 +1,165 @@
 import unittest
+import contextlib
+import io
 import os
 import json
 import yaml
-import subprocess
 import shutil
+import tempfile
 
-class TestCompareApi(unittest.TestCase):
+import compare_api
 
-    def setUp(self):
-        """Set up test files with known discrepancies."""
-        # Backup original files by renaming them
-        if os.path.exists('parsed_api.json'):
-            shutil.move('parsed_api.json', 'parsed_api.json.bak')
-        if os.path.exists('openapi.yaml'):
-            shutil.move('openapi.yaml', 'openapi.yaml.bak')
-        if os.path.exists('comparison_output.json'):
-            os.remove('comparison_output.json')
-
-        # Create a mock parsed_api.json with more items than the openapi spec
-        parsed_api_data = [
-            {
-                "path": "/users",
-                "method": "GET",
-                "query_params": [{"name": "page", "description": "Page number"}],
-                "response_examples": {"200": {"description": "A list of users."}}
-            },
-            {
-                "path": "/users",
-                "method": "POST",
-                "query_params": [],
-                "response_examples": {}
-            },
-            {
-                "path": "/posts",
-                "method": "GET",
-                "query_params": [],
-                "response_examples": {}
-            }
-        ]
-        with open('parsed_api.json', 'w') as f:
-            json.dump(parsed_api_data, f)
-
-        # Create a mock openapi.yaml with missing items
-        openapi_data = {
-            "openapi": "3.0.0",
-            "info": {"title": "Test API", "version": "1.0.0"},
-            "paths": {
-                "/users": {
-                    "get": {
-                        "summary": "Get users",
-                        "parameters": [],
-                        "responses": {
-                            "200": {
-                                "description": "A list of users.",
-                                "content": {
-                                    "application/json": {}
-                                }
-                            }
+# Endpoints parsed from the HTML documentation, with more items than the openapi spec
+PARSED_API_DATA = [
+    {
+        "path": "/users",
+        "method": "GET",
+        "query_params": [{"name": "page", "description": "Page number"}],
+        "response_examples": {"200": {"description": "A list of users."}}
+    },
+    {
+        "path": "/users",
+        "method": "POST",
+        "query_params": [],
+        "response_examples": {}
+    },
+    {
+        "path": "/posts",
+        "method": "GET",
+        "query_params": [],
+        "response_examples": {}
+    }
+]
+
+# An openapi spec with missing items
+OPENAPI_DATA = {
+    "openapi": "3.0.0",
+    "info": {"title": "Test API", "version": "1.0.0"},
+    "paths": {
+        "/users": {
+            "get": {
+                "summary": "Get users",
+                "parameters": [{"name": "limit", "in": "query"}],
+                "responses": {
+                    "200": {
+                        "description": "A list of users.",
+                        "content": {
+                            "application/json": {}
                         }
                     }
                 }
             }
         }
-        with open('openapi.yaml', 'w') as f:
-            yaml.dump(openapi_data, f)
+    }
+}
+
+EXPECTED_OUTPUT = {
+    "missing_paths": [{"path": "/posts"}],
+    "missing_methods": [{"path": "/users", "method": "POST"}],
+    "missing_parameters": [{"path": "/users", "method": "GET", "parameter": "page"}],
+    "missing_examples": [{"path": "/users", "method": "GET"}]
+}
+
+# parse_html_v2 records list their examples; only those keyed by status code were ever checked
+V2_API_DATA = [
+    {"path": "/tickets", "method": "GET", "query_params": [{"name": "limit", "type": "integer", "description": ""}],
+     "response_examples": [{"status_code": "200", "example": '{"Ticket": []}'}]},
+    {"path": "/tickets", "method": "POST", "query_params": [],
+     "response_examples": [{"status_code": "201", "example": '{"TicketID": 1}'}]},
+    {"path": "/queues", "method": "GET", "query_params": [], "response_examples": {"200": {}}}
+]
+
+V2_OPENAPI_DATA = {
+    "paths": {
+        "/tickets": {"get": {"responses": {"200": {"description": "OK", "content": {"application/json": {}}}}},
+                     "post": {"responses": {}}},
+        "/queues": {"get": {"responses": {"200": {"description": "OK"}}}}
+    }
+}
+
+# What the compare_api.py of the baseline commit writes for V2_API_DATA and V2_OPENAPI_DATA
+V2_BASELINE_OUTPUT = {
+    "missing_paths": [],
+    "missing_methods": [],
+    "missing_parameters": [{"path": "/tickets", "method": "GET", "parameter": "limit"}],
+    "missing_examples": [{"path": "/queues", "method": "GET"}]
+}
+
+class TestCompareApi(unittest.TestCase):
+
+    def setUp(self):
+        """Write the input files with known discrepancies to a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(self.path('parsed_api.json'), 'w') as f:
+            json.dump(PARSED_API_DATA, f)
+        with open(self.path('openapi.yaml'), 'w') as f:
+            yaml.dump(OPENAPI_DATA, f)
 
     def tearDown(self):
-        """Clean up test files and restore original files."""
-        # Remove the mock files
-        if os.path.exists('parsed_api.json'):
-            os.remove('parsed_api.json')
-        if os.path.exists('openapi.yaml'):
-            os.remove('openapi.yaml')
-        if os.path.exists('comparison_output.json'):
-            os.remove('comparison_output.json')
-
-        # Restore original files
-        if os.path.exists('parsed_api.json.bak'):
-            shutil.move('parsed_api.json.bak', 'parsed_api.json')
-        if os.path.exists('openapi.yaml.bak'):
-            shutil.move('openapi.yaml.bak', 'openapi.yaml')
-
-    def test_fixed_script_reports_correctly_and_exits_with_error(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def run_main(self, *argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = compare_api.main(['--html', self.path('parsed_api.json'), '--spec', self.path('openapi.yaml'),
+                                       '--output', self.path('comparison_output.json'), *argv])
+        return status, stdout.getvalue()
+
+    def test_reports_discrepancies_and_returns_error_status(self):
         """
-        This test verifies the fix:
-        1. The script exits with code 1 when discrepancies are found.
+        1. main returns 1 when discrepancies are found.
         2. The output JSON contains all missing items, including paths and methods.
         """
-        # Run the updated script as a subprocess
-        process = subprocess.run(['python3', 'compare_api.py'], capture_output=True, text=True)
+        status, stdout = self.run_main()
+        self.assertEqual(status, 1, "main should return 1 when discrepancies are found.")
+        self.assertIn(f"Discrepancies found. See {self.path('comparison_output.json')} for details.", stdout)
 
-        # 1. Assert that the script exits with 1
-        self.assertEqual(process.returncode, 1, "Fix verification failed: Script should exit with 1 when discrepancies are found.")
-
-        # Assert that the correct message is printed to stdout
-        self.assertIn("Discrepancies found. See comparison_output.json for details.", process.stdout)
-
-        # 2. Assert that the output JSON contains all the missing items
-        with open('comparison_output.json', 'r') as f:
+        with open(self.path('comparison_output.json'), 'r') as f:
             output = json.load(f)
 
-        expected_output = {
-            "missing_paths": [{"path": "/posts"}],
-            "missing_methods": [{"path": "/users", "method": "POST"}],
-            "missing_parameters": [{"path": "/users", "method": "GET", "parameter": "page"}],
-            "missing_examples": [{"path": "/users", "method": "GET"}]
-        }
-
         # Sort the lists in both actual and expected output for a stable comparison
-        for key in expected_output:
+        expected_output = {}
+        for key in EXPECTED_OUTPUT:
             output[key] = sorted(output.get(key, []), key=lambda x: tuple(x.items()))
-            expected_output[key] = sorted(expected_output[key], key=lambda x: tuple(x.items()))
+            expected_output[key] = sorted(EXPECTED_OUTPUT[key], key=lambda x: tuple(x.items()))
+
+        self.assertDictEqual(output, expected_output, "The JSON output does not match the expected discrepancies.")
+
+    def test_compares_loaded_documents_without_writing(self):
+        missing_items, undocumented = compare_api.compare_api_specs(PARSED_API_DATA, OPENAPI_DATA, output=None,
+                                                                    reverse=True, reverse_output=None)
+        self.assertEqual(missing_items, EXPECTED_OUTPUT)
+        self.assertEqual(undocumented['undocumented_parameters'],
+                         [{"path": "/users", "method": "GET", "parameter": "limit"}])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['openapi.yaml', 'parsed_api.json'])
+
+    def test_matches_the_baseline_output_for_parse_html_v2_records(self):
+        missing_items, _ = compare_api.compare_api_specs(V2_API_DATA, V2_OPENAPI_DATA, output=None)
+        self.assertEqual(missing_items, V2_BASELINE_OUTPUT)
+
+    def test_path_item_fields_are_not_methods(self):
+        openapi_data = {"paths": {"/users": {
+            "summary": "Users",
+            "parameters": [{"name": "UserID", "in": "path", "required": True}],
+            "get": {"parameters": [{"name": "page", "in": "query"}, {"name": "limit", "in": "query"}],
+                    "responses": {}},
+        }}}
+        self.assertEqual(sorted(compare_api.build_openapi_index(openapi_data), key=str),
+                         [("/users", "get"), ("/users", None)])
+        _, undocumented = compare_api.compare_api_specs(PARSED_API_DATA, openapi_data, output=None, reverse=True,
+                                                        reverse_output=None)
+        self.assertEqual(undocumented["undocumented_methods"], [])
+        self.assertEqual(undocumented["undocumented_parameters"],
+                         [{"path": "/users", "method": "GET", "parameter": "limit"}])
 
-        self.assertDictEqual(output, expected_output, "Fix verification failed: The JSON output does not match the expected discrepancies.")
+    def test_missing_input_returns_error_status(self):
+        os.remove(self.path('openapi.yaml'))
+        status, stdout = self.run_main()
+        self.assertEqual(status, 1)
+        self.assertIn(f"Error: {self.path('openapi.yaml')} not found.", stdout)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import kixdoc
+
+class TestKixdoc(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(self.path('parsed_api_v2.json'), 'w') as f:
+            json.dump([], f)
+        with open(self.path('openapi.yaml'), 'w') as f:
+            f.write("openapi: 3.0.0\npaths: {}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def test_split_commands(self):
+        self.assertEqual(kixdoc.split_commands(['parse-raml', '+', 'update', '--full', '+', 'compare']),
+                         [['parse-raml'], ['update', '--full'], ['compare']])
+
+    def test_runs_subcommands_in_order_until_one_fails(self):
+        compare = ['compare', '--spec', self.path('openapi.yaml'), '--output', self.path('comparison.json')]
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = kixdoc.main([*compare, '--html', self.path('parsed_api_v2.json'),
+                                  '+', *compare, '--html', self.path('missing.json'),
+                                  '+', 'parse-html', '--input', self.path('missing.html'),
+                                  '--output', self.path('records.json')])
+        self.assertEqual(status, 1)
+        self.assertTrue(os.path.exists(self.path('comparison.json')))
+        self.assertIn(f"Error: {self.path('missing.json')} not found.", stdout.getvalue())
+        self.assertFalse(os.path.exists(self.path('records.json')))
+
+    def test_imports_no_subcommand_module_up_front(self):
+        code = ("import sys, kixdoc; print(sorted({'yaml', 'lxml', 'bs4', 'parse_raml', 'parse_html_v2', "
+                "'update_openapi', 'compare_api'} & set(sys.modules)))")
+        output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import unittest
+
+import mock_server
+
+OPENAPI_DATA = {
+    'servers': [{'url': 'https://{tenant}.example.com/kix-rest'}],
+    'paths': {
+        '/tickets': {'get': {
+            'parameters': [{'name': 'limit', 'in': 'query', 'schema': {'type': 'integer'}},
+                           {'name': 'sort', 'in': 'query', 'required': True,
+                            'schema': {'type': 'string', 'enum': ['Title', 'TicketID']}}],
+            'responses': {'200': {'content': {'application/json': {
+                'examples': {'default': {'$ref': '#/components/examples/Tickets'}}}}}}}},
+        '/tickets/search': {'post': {'responses': {'201': {'content': {'application/json': {'example': {'x': 1}}}}}}},
+        '/tickets/{TicketID}': {
+            'parameters': [{'name': 'TicketID', 'in': 'path', 'schema': {'type': 'integer'}}],
+            'get': {'responses': {'200': {'content': {'application/json': {'example': {'Ticket': {}}}}},
+                                  '404': {'description': 'Not found.'}}},
+            'delete': {'responses': {'204': {'description': 'Deleted.'}}}},
+        '/tickets/{TicketID}/articles/{ArticleID}': {'get': {'responses': {'200': {'description': 'The article.'}}}},
+        '/links': {'get': {'responses': {'299': {'description': 'A status http.HTTPStatus does not know.'}}}},
+    },
+    'components': {'examples': {'Tickets': {'value': {'Ticket': []}}}},
+}
+
+class TestMockServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = mock_server.MockServer(mock_server.build_routes(OPENAPI_DATA),
+                                             mock_server.server_base_path(OPENAPI_DATA))
+
+    def test_routes_literal_and_templated_segments(self):
+        routes = self.server.routes
+        self.assertEqual(routes.match('post', '/tickets/search')[1], '/tickets/search')
+        self.assertEqual(routes.match('get', '/tickets/search')[1:], ('/tickets/{TicketID}', {'TicketID': 'search'}))
+        self.assertEqual(routes.match('get', '/tickets/12/articles/3')[2], {'TicketID': '12', 'ArticleID': '3'})
+        self.assertEqual(routes.match('put', '/tickets/12'), (None, ['delete', 'get'], None))
+        self.assertEqual(routes.match('get', '/tickets/12/history'), (None, None, None))
+
+    def test_responds_with_examples_and_checks_parameters(self):
+        self.assertEqual(self.server.respond('GET', '/kix-rest/tickets?sort=Title&limit=5')[:2], (200, b'{"Ticket": []}'))
+        self.assertEqual(self.server.respond('DELETE', '/tickets/7')[:2], (204, b''))
+        status, body, _ = self.server.respond('GET', '/tickets?limit=five&page=2')
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body)['Message'], "The query parameter 'limit' must be of type integer. "
+                                                      "Unknown query parameter 'page'. "
+                                                      "The query parameter 'sort' is required.")
+        self.assertEqual(self.server.respond('GET', '/tickets/abc')[0], 400)
+        self.assertEqual(self.server.respond('PUT', '/tickets/7'), (405, self.server.respond('PUT', '/tickets/7')[1],
+                                                                    [('Allow', 'DELETE, GET')]))
+        self.assertEqual(self.server.respond('GET', '/users')[0], 404)
+
+    def exchange(self, request):
+        """Sends raw request bytes to the server and returns everything it answers until it closes."""
+        async def send():
+            listener = await self.server.start('127.0.0.1', 0)
+            try:
+                reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+                writer.write(request)
+                response = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                return response
+            finally:
+                listener.close()
+                await listener.wait_closed()
+        return asyncio.run(send())
+
+    def test_unknown_status_codes_get_a_generic_reason(self):
+        self.assertEqual(mock_server.reason_phrase(404), 'Not Found')
+        self.assertEqual([mock_server.reason_phrase(status) for status in (299, 499, 599, 999)],
+                         ['Success', 'Client Error', 'Server Error', 'Unknown'])
+        response = self.exchange(b'GET /links HTTP/1.1\r\nConnection: close\r\n\r\n')
+        self.assertTrue(response.startswith(b'HTTP/1.1 299 Success\r\n'))
+
+    def test_invalid_content_length_is_a_bad_request(self):
+        for length in (b'ten', b'-1'):
+            response = self.exchange(b'POST /tickets/search HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n'
+                                     b'GET /tickets/1 HTTP/1.1\r\n\r\n')
+            self.assertTrue(response.startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+            self.assertIn(b'Connection: close', response)
+            self.assertEqual(response.count(b'HTTP/1.1 '), 1)
+        response = self.exchange(b'POST /tickets/search HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n'
+                                 b'\r\n{}')
+        self.assertTrue(response.startswith(b'HTTP/1.1 201 Created\r\n'))
+
+    def test_load_driver_against_the_server(self):
+        targets = mock_server.load_targets(OPENAPI_DATA)
+        self.assertIn(('GET', '/tickets?sort=Title'), targets)
+        report = asyncio.run(mock_server.serve_and_drive(self.server, targets, requests=50, concurrency=4))
+        self.assertEqual(report['requests'], 50)
+        self.assertEqual(sum(report['statuses'].values()), 50)
+        self.assertNotIn(400, report['statuses'])
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+
+if __name__ == '__main__':
+    unittest.main()
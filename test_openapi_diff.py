@@ -0,0 +1,91 @@
+import copy
+import unittest
+
+import openapi_diff
+
+OLD = {
+    'openapi': '3.0.0',
+    'info': {'title': 'KIX', 'version': '1'},
+    'paths': {
+        '/tickets': {
+            'get': {'parameters': [{'name': 'limit', 'in': 'query', 'schema': {'type': 'integer'}},
+                                   {'name': 'sort', 'in': 'query', 'schema': {'type': 'string', 'enum': ['a', 'b']}}],
+                    'responses': {'200': {'description': 'Tickets.', 'content': {'application/json': {
+                        'schema': {'$ref': '#/components/schemas/TicketCollection'}, 'example': {'Ticket': []}}}}}},
+            'post': {'responses': {'201': {'description': 'Created.'}}},
+        },
+        '/users': {'get': {'responses': {'200': {'description': 'Users.'}}}},
+    },
+    'components': {'schemas': {
+        'Ticket': {'type': 'object', 'required': ['TicketID'],
+                   'properties': {'TicketID': {'type': 'integer'}, 'Title': {'type': 'string'}}},
+        'TicketCollection': {'type': 'object'},
+    }},
+}
+
+def changed():
+    new = copy.deepcopy(OLD)
+    get = new['paths']['/tickets']['get']
+    get['parameters'][0]['description'] = 'At most this many.'
+    get['parameters'][1]['schema']['enum'] = ['a']
+    get['parameters'].append({'name': 'filter', 'in': 'query', 'required': True, 'schema': {'type': 'string'}})
+    get['responses']['200']['content']['application/json']['example'] = {'Ticket': [{'TicketID': 1}]}
+    get['responses']['404'] = {'description': 'Not found.'}
+    del new['paths']['/tickets']['post']
+    del new['paths']['/users']
+    new['components']['schemas']['Ticket']['properties']['Title'] = {'type': 'integer'}
+    new['components']['schemas']['Ticket']['required'].append('Title')
+    new['components']['schemas']['Queue'] = {'type': 'object'}
+    return new
+
+class TestOpenAPIDiff(unittest.TestCase):
+
+    def test_reports_categorized_changes(self):
+        report = openapi_diff.diff(OLD, changed())
+        changes = {(change['kind'], change['category'], tuple(change['location'][1:]), change['breaking']):
+                   change.get('detail') for change in report['changes']}
+        self.assertEqual(changes, {
+            ('added', 'parameter', ('/tickets', 'get', 'parameters', 'query:filter'), True): 'new required parameter',
+            ('added', 'response', ('/tickets', 'get', 'responses', '404'), False): None,
+            ('modified', 'parameter', ('/tickets', 'get', 'parameters', 'query:limit'), False): None,
+            ('modified', 'parameter', ('/tickets', 'get', 'parameters', 'query:sort'), True): 'enum no longer allows b',
+            ('modified', 'response', ('/tickets', 'get', 'responses', '200'), False): None,
+            ('removed', 'operation', ('/tickets', 'post'), True): None,
+            ('removed', 'path', ('/users',), True): None,
+            ('added', 'schema', ('schemas', 'Queue'), False): None,
+            ('modified', 'schema', ('schemas', 'Ticket'), True):
+                'Title became required; Title changed from string to integer',
+        })
+        self.assertEqual(report['summary'], {'added': 3, 'removed': 2, 'modified': 4, 'breaking': 5,
+                                             'non_breaking': 4})
+
+        markdown = openapi_diff.to_markdown(report)
+        self.assertIn('- removed `POST /tickets`', markdown)
+        self.assertLess(markdown.index('## Breaking changes'), markdown.index('## Non-breaking changes'))
+
+    def test_unchanged_subtrees_are_skipped(self):
+        report = openapi_diff.diff(OLD, copy.deepcopy(OLD))
+        self.assertEqual((report['changes'], report['stats']), ([], {'compared': 1, 'skipped': 1}))
+
+        new = copy.deepcopy(OLD)
+        new['info']['version'] = '2'
+        report = openapi_diff.diff(OLD, new)
+        self.assertEqual([change['location'] for change in report['changes']], [['info']])
+        # The root, then each of its four fields
+        self.assertEqual(report['stats'], {'compared': 5, 'skipped': 3})
+
+    def test_added_references_are_classified_as_their_components(self):
+        new = copy.deepcopy(OLD)
+        new['components']['parameters'] = {'Filter': {'name': 'filter', 'in': 'query', 'required': True}}
+        new['components']['requestBodies'] = {'User': {'required': True, 'content': {}}}
+        new['paths']['/tickets']['get']['parameters'].append({'$ref': '#/components/parameters/Filter'})
+        new['paths']['/users']['get']['requestBody'] = {'$ref': '#/components/requestBodies/User'}
+        changes = {tuple(change['location'][1:]): (change['breaking'], change.get('detail'))
+                   for change in openapi_diff.diff(OLD, new)['changes'] if change['location'][0] == 'paths'}
+        self.assertEqual(changes, {
+            ('/tickets', 'get', 'parameters', '#/components/parameters/Filter'): (True, 'new required parameter'),
+            ('/users', 'get', 'requestBody'): (True, 'new required request body'),
+        })
+
+if __name__ == '__main__':
+    unittest.main()
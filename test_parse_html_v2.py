@@ -0,0 +1,36 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from benchmarks import synthetic
+import html_extract
+import parse_html
+import parse_html_v2
+
+class TestParallelParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.html_file = os.path.join(self.tmp_dir, 'kix_api_docs.html')
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(synthetic.make_html_document(120))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sharded_parse_matches_single_process(self):
+        records = parse_html_v2.parse_html(self.html_file)
+        self.assertEqual(len(records), 120)
+        self.assertEqual(parse_html_v2.parse_html(self.html_file, jobs=3), records)
+        self.assertEqual(parse_html.parse_html_file(self.html_file, jobs=2),
+                         parse_html.parse_html_file(self.html_file))
+
+    def test_pages_with_resource_content_outside_panels_are_not_split(self):
+        html = (b'<html><body><div class="panel panel-default resource"><div class="panel-heading">a</div></div>'
+                b'<!-- <div> --><div class="panel-heading">outside</div></body></html>')
+        self.assertIsNone(html_extract.resource_panel_ranges(html))
+        self.assertEqual(len(html_extract.resource_panel_ranges(html.replace(b'panel-heading">outside', b'x">'))), 1)
+
+if __name__ == '__main__':
+    unittest.main()
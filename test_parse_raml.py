@@ -0,0 +1,210 @@
+import unittest
+import contextlib
+import io
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import instrumentation
+import parse_raml
+
+class TestIncludeGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        parse_raml.file_cache.clear()
+        parse_raml.content_digests.clear()
+
+    def tearDown(self):
+        parse_raml.file_cache.clear()
+        parse_raml.content_digests.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_quoted_include_paths_may_hold_spaces(self):
+        (self.tmp_dir / 'types').mkdir()
+        for name in ('ticket type.raml', 'queue.raml', 'state type.raml'):
+            (self.tmp_dir / 'types' / name).write_text('type: object\n', encoding='utf-8')
+        entry = self.tmp_dir / 'KIX.raml'
+        entry.write_text('#%RAML 1.0\ntypes:\n'
+                         '  TicketType: !include "types/ticket type.raml"\n'
+                         "  StateType: !include 'types/state type.raml'\n"
+                         '  Queue: !include types/queue.raml # a comment\n', encoding='utf-8')
+        graph = parse_raml.discover_includes(entry)
+        self.assertEqual(sorted(Path(child).name for child in graph[str(entry.resolve())]),
+                         ['queue.raml', 'state type.raml', 'ticket type.raml'])
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.cache_file = self.tmp_dir / 'cache.pickle'
+        self.entry = self.tmp_dir / 'KIX.raml'
+        self.entry.write_text('#%RAML 1.0\ntypes:\n'
+                              '  Ticket: !include types/ticket.raml\n'
+                              '  Queue: !include types/queue.raml\n', encoding='utf-8')
+        (self.tmp_dir / 'types').mkdir()
+        self.write('types/ticket.raml', 'type: object\nproperties:\n  State: !include state.raml\n')
+        self.write('types/state.raml', 'type: string\n')
+        self.write('types/queue.raml', 'type: object\n')
+
+    def tearDown(self):
+        self.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, text):
+        (self.tmp_dir / name).write_text(text, encoding='utf-8')
+
+    def clear(self):
+        for cache in (parse_raml.file_cache.entries, parse_raml.parse_cache, parse_raml.include_keys,
+                      parse_raml.content_digests):
+            cache.clear()
+        instrumentation.reset()
+
+    def resolve(self):
+        """Resolves the entry file the way a new process would, and returns the data and the printed output."""
+        self.clear()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            data = parse_raml.get_resolved_raml(self.entry, jobs=1, cache_file=self.cache_file)
+        return data, output.getvalue()
+
+    def counts(self):
+        counters = instrumentation.counters
+        return counters['raml.parse_cache.hits'], counters['raml.parse_cache.misses']
+
+    def test_warm_run_parses_nothing(self):
+        cold, _ = self.resolve()
+        self.assertEqual(cold['types']['Ticket']['properties']['State'], {'type': 'string'})
+        self.assertEqual(self.counts(), (4, 4))
+        warm, _ = self.resolve()
+        self.assertEqual(self.counts(), (1, 0))
+        self.assertEqual(warm, cold)
+
+    def test_changed_include_invalidates_the_files_above_it(self):
+        self.resolve()
+        keys = dict(parse_raml.include_keys)
+        self.write('types/state.raml', 'type: string\nenum: [open, closed]\n')
+        data, _ = self.resolve()
+        self.assertEqual(data['types']['Ticket']['properties']['State']['enum'], ['open', 'closed'])
+        changed = sorted(Path(path).name for path, key in parse_raml.include_keys.items() if keys[path] != key)
+        self.assertEqual(changed, ['KIX.raml', 'state.raml', 'ticket.raml'])
+        self.assertEqual(self.counts(), (4, 3))
+
+    def test_unreadable_cache_files_are_ignored(self):
+        expected, _ = self.resolve()
+        for content in (b'', b'not a pickle', pickle.dumps(['not', 'a', 'cache'])):
+            self.cache_file.write_bytes(content)
+            data, output = self.resolve()
+            self.assertIn("Ignoring unreadable parse cache", output)
+            self.assertEqual(data, expected)
+            self.assertEqual(self.counts(), (4, 4))
+
+        self.cache_file.unlink()
+        self.cache_file.mkdir()
+        data, output = self.resolve()
+        self.assertIn("Ignoring unreadable parse cache", output)
+        self.assertIn("Could not write parse cache", output)
+        self.assertEqual(data, expected)
+        self.assertEqual(list(self.tmp_dir.glob('cache.pickle.tmp')), [])
+
+    def test_include_cycles_are_resolved_without_the_cache(self):
+        # The scan for includes also finds the one in the comment, so the graph has a cycle
+        self.write('types/queue.raml', '# included by !include ../KIX.raml\ntype: object\n')
+        cold, _ = self.resolve()
+        self.assertIsNone(parse_raml.include_keys[str(self.entry.resolve())])
+        self.assertEqual(cold['types']['Queue'], {'type': 'object'})
+        warm, _ = self.resolve()
+        self.assertEqual(warm, cold)
+        with open(self.cache_file, 'rb') as f:
+            self.assertEqual(sorted(Path(path).name for path in pickle.load(f)), ['state.raml', 'ticket.raml'])
+
+RESOURCE_TYPES = {
+    'base': {'delete?': {'description': 'Deletes the <<resourcePathName | !singularize>>.'}},
+    'collection': {
+        'type': 'base',
+        'get': {'description': 'Lists the <<typeName>> objects.', 'is': ['pageable']},
+        'post?': {'description': 'Creates a <<typeName>>.'},
+    },
+    'loop': {'type': 'cycle'},
+    'cycle': {'type': 'loop'},
+}
+TRAITS = {'pageable': {'description': 'Pageable <<methodName | !uppercase>>',
+                       'queryParameters': {'limit': {'type': 'number'}}}}
+
+class TestTypeResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = parse_raml.TypeResolver(RESOURCE_TYPES, TRAITS)
+
+    def test_resolves_each_type_once_per_parameter_set(self):
+        ticket = self.resolver.resolve_type('collection', {'typeName': 'Ticket', 'resourcePathName': 'tickets'})
+        self.assertIs(self.resolver.resolve_type('collection', {'typeName': 'Ticket', 'resourcePathName': 'tickets',
+                                                                'resourcePath': '/tickets'}), ticket)
+        queue = self.resolver.resolve_type('collection', {'typeName': 'Queue', 'resourcePathName': 'tickets'})
+        self.assertIsNot(queue, ticket)
+        self.assertEqual(ticket['get']['description'], 'Lists the Ticket objects.')
+        self.assertEqual(queue['get']['description'], 'Lists the Queue objects.')
+        # Subtrees without placeholders are shared
+        self.assertIs(ticket['get']['is'], queue['get']['is'])
+
+    def test_inheritance_cycle_raises(self):
+        with self.assertRaisesRegex(ValueError, 'loop -> cycle -> loop'):
+            self.resolver.resolve_resource('/loops', {'type': 'loop'})
+
+    def test_merging_leaves_shared_definitions_unchanged(self):
+        resolved = self.resolver.resolve_resource('/tickets', {'type': {'collection': {'typeName': 'Ticket'}},
+                                                               'get': {'description': 'Search tickets.'}})
+        self.assertEqual(resolved['get'], {'description': 'Search tickets.', 'is': ['pageable']})
+        base = self.resolver.resolve_type('collection', {'typeName': 'Ticket', 'resourcePathName': 'tickets'})
+        self.assertEqual(base['get']['description'], 'Lists the Ticket objects.')
+        with self.assertRaises(TypeError):
+            base['get']['description'] = 'Changed.'
+
+        override = {'get': {'is': ['pageable']}}
+        result = parse_raml.merged(base, override)
+        self.assertEqual(result['get'], {'description': 'Lists the Ticket objects.', 'is': ['pageable']})
+        self.assertEqual(override, {'get': {'is': ['pageable']}})
+        self.assertEqual(base['get']['description'], 'Lists the Ticket objects.')
+
+    def test_optional_methods_and_method_name_parameter(self):
+        resource = {'type': {'collection': {'typeName': 'Ticket'}}, 'get': {}, 'delete': {}}
+        resolved = self.resolver.resolve_resource('/tickets', resource)
+        self.assertEqual(sorted(key for key in resolved if key != 'type'), ['delete', 'get'])
+        self.assertEqual(resolved['delete'], {'description': 'Deletes the ticket.'})
+
+        resolved = self.resolver.resolve_resource('/tickets', dict(resource, post={}))
+        self.assertEqual(resolved['post'], {'description': 'Creates a Ticket.'})
+
+        method = self.resolver.resolve_method('/tickets', 'post', {'is': ['pageable']})
+        self.assertEqual(method['description'], 'Pageable POST')
+        self.assertEqual(method['queryParameters'], {'limit': {'type': 'number'}})
+
+class TestParameters(unittest.TestCase):
+
+    def test_parameter_functions(self):
+        params = {**parse_raml.resource_params('/tickets/{TicketID}/articles'), 'count': 3}
+        self.assertEqual(params['resourcePathName'], 'articles')
+        template = parse_raml.compile_template({
+            'singular': '<<resourcePathName | !singularize>>',
+            'title': 'All <<resourcePathName|!singularize|!uppercamelcase>>s of <<resourcePath>>',
+            '<<resourcePathName>>Count': '<<count>>',
+            'unknown': '<<missing | !uppercase>>',
+        })
+        self.assertEqual(template(params), {
+            'singular': 'article',
+            'title': 'All Articles of /tickets/{TicketID}/articles',
+            'articlesCount': 3,
+            'unknown': '<<missing | !uppercase>>',
+        })
+        functions = parse_raml.PARAM_FUNCTIONS
+        self.assertEqual([functions[name]('TicketArticle') for name in
+                          ('pluralize', 'uppercase', 'lowerunderscorecase', 'upperhyphencase', 'lowercamelcase')],
+                         ['TicketArticles', 'TICKETARTICLE', 'ticket_article', 'TICKET-ARTICLE', 'ticketArticle'])
+
+    def test_singularize(self):
+        self.assertEqual([parse_raml.singularize(word) for word in
+                          ('tickets', 'categories', 'addresses', 'mailboxes', 'branches', 'status', 'analysis')],
+                         ['ticket', 'category', 'address', 'mailbox', 'branch', 'status', 'analysis'])
+
+if __name__ == '__main__':
+    unittest.main()
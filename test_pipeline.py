@@ -0,0 +1,75 @@
+import unittest
+import os
+import shutil
+import tempfile
+import argparse
+
+import pipeline
+
+def run_source(options):
+    with open('source.txt') as f:
+        value = f.read().strip()
+    with open('source.out', 'w') as f:
+        f.write(value)
+    options.calls.append('source')
+    return value
+
+def run_upper(options, value):
+    with open('upper.out', 'w') as f:
+        f.write(value.upper())
+    options.calls.append('upper')
+    return value.upper()
+
+STAGES = [
+    pipeline.Stage('source', (), lambda options: pipeline.file_digests('source.txt'), ('source.out',),
+                   run_source, lambda: open('source.out').read()),
+    pipeline.Stage('upper', ('source',), lambda options: [], ('upper.out',),
+                   run_upper, lambda: open('upper.out').read()),
+]
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Run the toy stages in a temporary directory, in process so the calls can be recorded."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.original_dir = os.getcwd()
+        os.chdir(self.tmp_dir)
+        with open('source.txt', 'w') as f:
+            f.write('kix\n')
+
+    def tearDown(self):
+        os.chdir(self.original_dir)
+        shutil.rmtree(self.tmp_dir)
+
+    def run_stages(self):
+        options = argparse.Namespace(jobs=1, force=False, calls=[])
+        rows, result = pipeline.run_pipeline(options, STAGES)
+        return options.calls, [row['status'] for row in rows], result
+
+    def test_skips_up_to_date_stages(self):
+        self.assertEqual(self.run_stages(), (['source', 'upper'], ['ran', 'ran'], 'KIX'))
+        self.assertEqual(self.run_stages(), ([], ['cached', 'cached'], 'KIX'))
+
+    def test_reruns_stages_after_changes(self):
+        self.run_stages()
+        # Same content: the key does not change
+        with open('source.txt', 'w') as f:
+            f.write('kix\n')
+        self.assertEqual(self.run_stages()[1], ['cached', 'cached'])
+
+        # A changed input reruns the stage, and a changed output its dependents
+        with open('source.txt', 'w') as f:
+            f.write('doku\n')
+        self.assertEqual(self.run_stages(), (['source', 'upper'], ['ran', 'ran'], 'DOKU'))
+
+        # A modified output is regenerated
+        with open('upper.out', 'w') as f:
+            f.write('edited')
+        self.assertEqual(self.run_stages(), (['upper'], ['cached', 'ran'], 'DOKU'))
+
+    def test_unavailable_inputs_block_dependents(self):
+        os.remove('source.txt')
+        self.assertEqual(self.run_stages(), ([], ['unavailable', 'blocked'], None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import raml_to_openapi
+
+RAML_DATA = {
+    'title': 'KIX REST API',
+    'version': 'v1',
+    'baseUri': 'https://{tenant}.example.com/api/{version}',
+    'baseUriParameters': {'tenant': {'default': 'demo'}},
+    'traits': {'pageable': {'queryParameters': {'limit': {'type': 'integer', 'required': False}}}},
+    'resourceTypes': {'item': {'get': {'responses': {200: {'body': {'application/json': {'type': '<<typeName>>'}}},
+                                                     404: {'description': 'Not found.'}}}}},
+    'types': {
+        'User': {'type': 'object',
+                 'properties': {'UserID': 'integer', 'Login': {'type': 'string'}, 'Email?': 'string',
+                                'Valid': {'type': 'string', 'enum': ['yes', 'no'], 'required': False}},
+                 'example': {'UserID': 1, 'Login': 'admin'}},
+        'UserPost': {'type': {'type': 'object', '$schema': 'http://json-schema.org/draft-04/schema#',
+                              'properties': {'Login': {'type': 'string'}}, 'required': ['Login']}},
+        'UserSearch': {'type': {'type': 'object', 'properties': {'Login': 'string', 'Limit?': 'integer',
+                                                                 'Sort': {'enum': ['Login', 'UserID']}}}},
+    },
+    '/users': {
+        'get': {'is': ['pageable'], 'queryParameters': {'sort': {'enum': ['Login', 'UserID']}}},
+        'post': {'body': {'application/json': {'type': 'UserPost'}}, 'responses': {201: {'description': 'Created.'}}},
+        '/{UserID}': {'type': {'item': {'typeName': 'User'}},
+                      'uriParameters': {'UserID': {'type': 'integer', 'description': 'The ID of the user.'}}},
+    },
+}
+
+class TestRamlToOpenAPI(unittest.TestCase):
+
+    def test_converts_parameters_bodies_responses_and_types(self):
+        spec = raml_to_openapi.convert(RAML_DATA)
+        self.assertEqual(spec['servers'][0]['url'], 'https://{tenant}.example.com/api/v1')
+
+        users = spec['paths']['/users']
+        self.assertEqual(users['get']['parameters'], [
+            {'name': 'limit', 'in': 'query', 'required': False, 'schema': {'type': 'integer'}},
+            {'name': 'sort', 'in': 'query', 'required': True, 'schema': {'type': 'string', 'enum': ['Login', 'UserID']}},
+        ])
+        self.assertEqual(users['post']['requestBody']['content']['application/json']['schema'],
+                         {'$ref': '#/components/schemas/UserPost'})
+        self.assertEqual(users['post']['responses'], {'201': {'description': 'Created.'}})
+
+        user = spec['paths']['/users/{UserID}']['get']
+        self.assertEqual(user['parameters'], [{'name': 'UserID', 'in': 'path', 'description': 'The ID of the user.',
+                                               'required': True, 'schema': {'type': 'integer'}}])
+        self.assertEqual(set(user['responses']), {'200', '404'})
+        self.assertEqual(user['responses']['200']['content']['application/json']['examples'],
+                         {'default': {'value': {'UserID': 1, 'Login': 'admin'}}})
+
+        schemas = spec['components']['schemas']
+        self.assertEqual(schemas['User']['required'], ['UserID', 'Login'])
+        self.assertEqual(schemas['User']['properties']['Valid'], {'type': 'string', 'enum': ['yes', 'no']})
+        self.assertEqual(schemas['UserPost'], {'type': 'object', 'properties': {'Login': {'type': 'string'}},
+                                               'required': ['Login']})
+        # An inline RAML type declaration is converted, not copied as a JSON schema
+        self.assertEqual(schemas['UserSearch'], {
+            'type': 'object',
+            'properties': {'Login': {'type': 'string'}, 'Limit': {'type': 'integer'},
+                           'Sort': {'type': 'string', 'enum': ['Login', 'UserID']}},
+            'required': ['Login', 'Sort']})
+
+    def test_overlay_keeps_hand_maintained_fields(self):
+        overlay = {
+            'info': {'title': 'KIX-REST API', 'version': 'v1'},
+            'paths': {'/users': {'get': {'summary': 'List users', 'operationId': 'UserSearch', 'tags': ['Users'],
+                                         'parameters': [{'name': 'stale', 'in': 'query'}]}},
+                      '/gone': {'get': {'summary': 'Removed from the RAML'}}},
+        }
+        spec = raml_to_openapi.convert(RAML_DATA, overlay)
+        self.assertEqual(spec['info'], overlay['info'])
+        operation = spec['paths']['/users']['get']
+        self.assertEqual((operation['summary'], operation['operationId'], operation['tags']),
+                         ('List users', 'UserSearch', ['Users']))
+
+        diff = raml_to_openapi.spec_diff(overlay, spec)
+        self.assertEqual(diff['operations_removed'], [('/gone', 'get')])
+        self.assertIn(('/users', 'get', 'query', 'stale'), diff['parameters_removed'])
+        self.assertIn(('/users', 'post'), diff['operations_added'])
+
+if __name__ == '__main__':
+    unittest.main()
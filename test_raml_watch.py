@@ -0,0 +1,122 @@
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks import synthetic
+import parse_raml
+import raml_to_openapi
+import raml_watch
+import search_index
+import update_openapi
+
+def reset_raml_caches():
+    parse_raml.file_cache.clear()
+    parse_raml.parse_cache.clear()
+    parse_raml.include_keys.clear()
+    parse_raml.content_digests.clear()
+
+class TestWatchSession(unittest.TestCase):
+
+    def setUp(self):
+        """Build the spec of a small synthetic RAML tree in a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        reset_raml_caches()
+        self.entry = synthetic.write_raml_tree(Path(self.tmp_dir) / 'raml', resources=4, include_depth=2)
+        self.output = os.path.join(self.tmp_dir, 'openapi.yaml')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.search_dir = os.path.join(self.tmp_dir, 'search')
+            self.session = raml_watch.WatchSession(self.entry, self.output, jobs=1, search_dir=self.search_dir)
+
+    def tearDown(self):
+        reset_raml_caches()
+        shutil.rmtree(self.tmp_dir)
+
+    def edit(self, name, append):
+        file_path = self.entry.parent / name
+        with open(file_path, 'a', encoding='utf-8') as f:
+            f.write(append)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.session.update({str(file_path.resolve())})
+
+    def assert_matches_full_conversion(self):
+        """The output must be what converting the changed tree from scratch writes."""
+        reset_raml_caches()
+        with contextlib.redirect_stdout(io.StringIO()):
+            raml_data = parse_raml.get_resolved_raml(self.entry, jobs=1)
+        expected = os.path.join(self.tmp_dir, 'expected.yaml')
+        update_openapi.write_yaml_file(raml_to_openapi.convert(raml_data), expected)
+        with open(self.output, encoding='utf-8') as f, open(expected, encoding='utf-8') as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_resource_change_rewrites_only_its_paths(self):
+        summary = self.edit('resources/object00001.raml', '  get:\n    displayName: Get one object\n')
+        self.assertEqual(summary, {'resources': ['/object00001s'], 'paths': 2, 'patched': True, 'files_parsed': 1})
+        self.assertEqual(self.session.openapi_data['paths']['/object00001s/{Object00001ID}']['get']['summary'],
+                         'Get one object')
+        self.assertEqual([result['path'] for result in search_index.SearchIndex(self.search_dir).search('one object')],
+                         ['/object00001s/{Object00001ID}'])
+        self.assert_matches_full_conversion()
+
+        # The examples of Object00001 are no longer used, those of Object00000 are
+        resource = self.entry.parent / 'resources' / 'object00001.raml'
+        resource.write_text(resource.read_text().replace('typeName: Object00001 }', 'typeName: Object00000 }', 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = self.session.update({str(resource.resolve())})
+        self.assertTrue(summary['patched'])
+        self.assertNotIn('Object00001CollectionResponse', str(self.session.openapi_data['components']['examples']))
+        self.assert_matches_full_conversion()
+
+    def test_new_paths_and_nested_includes(self):
+        os.makedirs(self.entry.parent / 'history')
+        (self.entry.parent / 'history' / 'get.raml').write_text('description: The history.\n', encoding='utf-8')
+        summary = self.edit('resources/object00002.raml', '  /history:\n    get: !include ../history/get.raml\n')
+        self.assertEqual((summary['resources'], summary['patched']), (['/object00002s'], False))
+        self.assertIn('/object00002s/{Object00002ID}/history', self.session.openapi_data['paths'])
+        self.assert_matches_full_conversion()
+
+        summary = self.edit('history/get.raml', 'displayName: History\n')
+        self.assertEqual((summary['resources'], summary['files_parsed']), (['/object00002s'], 2))
+        self.assert_matches_full_conversion()
+
+    def test_shared_file_change_rebuilds_the_document(self):
+        summary = self.edit('types/Error.raml', 'description: An error.\n')
+        self.assertIsNone(summary['resources'])
+        self.assertEqual(self.session.openapi_data['components']['schemas']['Error']['description'], 'An error.')
+        self.assert_matches_full_conversion()
+
+class TestFileWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'KIX.raml')
+        with open(self.file_path, 'w') as f:
+            f.write('title: KIX\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_watcher(self, watcher):
+        watcher.track([self.file_path])
+        try:
+            self.assertEqual(watcher.wait(timeout=0.05), set())
+            with open(self.file_path, 'a') as f:
+                f.write('version: v1\n')
+            self.assertEqual(watcher.wait(timeout=5), {self.file_path})
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        self.check_watcher(raml_watch.FileWatcher(interval=0.01, polling=True))
+
+    @unittest.skipIf(raml_watch.libc is None, 'inotify is not available')
+    def test_inotify(self):
+        watcher = raml_watch.FileWatcher()
+        self.assertEqual(watcher.mode, 'inotify')
+        self.check_watcher(watcher)
+
+if __name__ == '__main__':
+    unittest.main()
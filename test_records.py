@@ -0,0 +1,59 @@
+import unittest
+
+import records
+
+PARAMS = [{'name': 'filter', 'type': 'string', 'description': 'The filter to be used.'},
+          {'name': 'limit', 'type': 'number', 'description': 'The limit.'}]
+
+HTML_DATA = [
+    {'path': '/tickets', 'method': 'GET', 'query_params': PARAMS,
+     'response_examples': [{'status_code': '200', 'example': '{"Ticket": []}'}]},
+    {'path': '/tickets', 'method': 'POST', 'query_params': PARAMS, 'response_examples': []},
+]
+
+RAML_DATA = {
+    'paths': {
+        '/auth': {
+            'get': {
+                'parameters': {'UserType': {'displayName': 'UserType'},
+                               'limit': {'description': 'The limit.', 'type': 'number', 'required': False}},
+                'responses': {'200': {'description': 'Methods', 'body': {'application/json': {'type': 'AuthMethods'}}},
+                              '400': {'description': 'Bad request'}},
+            },
+        },
+        '/users': {
+            'get': {
+                'parameters': {'limit': {'description': 'The limit.', 'type': 'number', 'required': False,
+                                         'enum': ['1', '2']}},
+                'responses': {'200': {'body': {'application/json': {'type': 'Users', 'example': {}},
+                                               'text/plain': {}}}},
+            },
+        },
+    },
+    'schemas': {'Users': {'properties': {}, 'examples': {}}},
+}
+
+class TestRecords(unittest.TestCase):
+
+    def test_html_records_round_trip_and_share_equal_parts(self):
+        endpoints = records.html_endpoints(HTML_DATA)
+        self.assertEqual([records.html_json(endpoint) for endpoint in endpoints], HTML_DATA)
+        self.assertEqual(endpoints[0].method, 'get')
+        self.assertIs(endpoints[0].parameters, endpoints[1].parameters)
+        self.assertIs(records.html_endpoints(endpoints)[0], endpoints[0])
+
+    def test_raml_details_round_trip_and_keep_unmodelled_keys(self):
+        table = records.RecordTable()
+        details = records.raml_details(RAML_DATA, table)
+        self.assertEqual(records.raml_json(details), RAML_DATA)
+        auth, users = details['paths']['/auth']['get'], details['paths']['/users']['get']
+        self.assertEqual(auth.parameters[0], records.Parameter('UserType', display_name='UserType'))
+        self.assertEqual([response.body_type for response in auth.responses], ['AuthMethods', None])
+        self.assertEqual(users.responses[0].body_type, 'Users')
+        # Equal definitions are one object, unhashable ones are not shared
+        self.assertIs(table.raml_endpoint('/other', 'get', RAML_DATA['paths']['/auth']['get']).parameters[1],
+                      auth.parameters[1])
+        self.assertEqual(users.parameters[0].extra, (('enum', ['1', '2']),))
+
+if __name__ == '__main__':
+    unittest.main()
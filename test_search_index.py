@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import search_index
+
+OPENAPI_DATA = {
+    'paths': {
+        '/tickets': {
+            'get': {'summary': 'Search for tickets', 'operationId': 'TicketSearch', 'tags': ['Tickets'],
+                    'parameters': [{'name': 'StateType', 'in': 'query', 'schema': {'type': 'string'}}],
+                    'responses': {'200': {'content': {'application/json': {
+                        'schema': {'$ref': '#/components/schemas/TicketCollection'}}}}}},
+        },
+        '/tickets/{TicketID}/articles': {
+            'parameters': [{'name': 'TicketID', 'in': 'path'}],
+            'post': {'summary': 'Create an article', 'requestBody': {'content': {'application/json': {
+                'schema': {'$ref': '#/components/schemas/ArticlePost'}}}}},
+        },
+        '/users': {'get': {'summary': 'Search for users'}},
+    },
+    'components': {'schemas': {
+        'TicketCollection': {'type': 'object', 'properties': {
+            'Ticket': {'type': 'array', 'items': {'$ref': '#/components/schemas/Ticket'}}}},
+        'Ticket': {'type': 'object', 'properties': {'QueueID': {'type': 'integer'}}},
+        'ArticlePost': {'type': 'object', 'properties': {'Article': {'properties': {'MimeType': {}}}}},
+    }},
+}
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_tokens_split_identifiers(self):
+        self.assertEqual(search_index.tokens('/tickets/{TicketID}'), {'tickets', 'ticketid', 'ticket', 'id'})
+        self.assertEqual(search_index.tokens('Search for the HTMLBody'), {'search', 'htmlbody', 'html', 'body'})
+
+    def test_postings_cover_paths_parameters_and_referenced_properties(self):
+        endpoints, postings = search_index.build_index(OPENAPI_DATA)
+        self.assertEqual([endpoint[:2] for endpoint in endpoints],
+                         [['GET', '/tickets'], ['POST', '/tickets/{TicketID}/articles'], ['GET', '/users']])
+        self.assertEqual(postings['statetype'], {'q': [0]})
+        # Path parameters of the path item, and properties of schemas referenced through other schemas
+        self.assertEqual(postings['ticketid'], {'p': [1], 'q': [1]})
+        self.assertEqual(postings['queueid'], {'s': [0]})
+        self.assertEqual(postings['mimetype'], {'s': [1]})
+        self.assertEqual(postings['search'], {'t': [0, 2]})
+
+    def test_null_fields_are_indexed_as_empty(self):
+        openapi_data = {'paths': {'/links': {'get': {'summary': None, 'description': None, 'operationId': None,
+                                                     'tags': None}},
+                                  '/links/{LinkID}': {'get': {'summary': 'Get a link', 'tags': [None, 'Links']}}}}
+        endpoints, postings = search_index.build_index(openapi_data)
+        self.assertEqual(endpoints[0][2:5], ['', [], ''])
+        self.assertEqual(endpoints[1][3], ['Links'])
+        self.assertEqual(postings['links'], {'p': [0, 1], 't': [1]})
+
+    def test_query_loads_only_the_shards_of_its_terms(self):
+        manifest = search_index.write_index(OPENAPI_DATA, self.tmp_dir)
+        index = search_index.SearchIndex(self.tmp_dir)
+        self.assertEqual([result['path'] for result in index.search('ticket state')], ['/tickets'])
+        self.assertEqual(set(index.shards), {'ti', 'st'})
+        # Prefixes match from three characters, all terms must match
+        self.assertEqual([result['path'] for result in index.search('tick')],
+                         ['/tickets', '/tickets/{TicketID}/articles'])
+        self.assertEqual(index.search('ti'), [])
+        self.assertEqual(index.search('search users')[0]['operationId'], '')
+        # Stopwords and numbers are not indexed, so they are left out of queries too
+        self.assertEqual(index.search('search for the users'), index.search('search users'))
+        self.assertEqual([result['path'] for result in index.search('ticket 200 state')], ['/tickets'])
+        self.assertEqual(index.search('mime ticket')[0]['method'], 'POST')
+
+        # Shards of prefixes that no longer occur are removed
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, manifest['shards']['mi']['file'])))
+        search_index.write_index({'paths': {'/users': OPENAPI_DATA['paths']['/users']}}, self.tmp_dir)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'tokens-mi.json')))
+
+    def test_large_shards_are_split_by_longer_prefixes(self):
+        manifest = search_index.write_index(OPENAPI_DATA, self.tmp_dir, max_bytes=40)
+        self.assertTrue({'ticket', 'ticketi', 'tickets'} <= set(manifest['shards']))
+        self.assertNotIn('ti', manifest['shards'])
+        index = search_index.SearchIndex(self.tmp_dir)
+        self.assertEqual([result['path'] for result in index.search('ti')], [])
+        self.assertEqual([result['path'] for result in index.search('tick')],
+                         ['/tickets', '/tickets/{TicketID}/articles'])
+        self.assertEqual([result['path'] for result in index.search('ticket state')], ['/tickets'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import mmap
+import os
+import shutil
+import tempfile
+
+import sources
+
+class TestSources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, content):
+        file_path = os.path.join(self.tmp_dir, name)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        return file_path
+
+    def test_large_files_are_mapped_and_small_ones_read(self):
+        large = b'x' * sources.MAP_MIN_BYTES
+        with sources.mapped(self.write('large.json', large)) as content:
+            self.assertIsInstance(content, mmap.mmap)
+            self.assertEqual(content[:], large)
+        self.assertEqual(sources.map_file(self.write('small.json', b'{}')), b'{}')
+        self.assertEqual(sources.map_file(self.write('empty.json', b'')), b'')
+
+    def test_lru_cache_drops_the_least_recently_used_entry(self):
+        cache = sources.LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)
+        cache['c'] = 3
+        self.assertNotIn('b', cache)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        self.assertEqual(len(cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import copy
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+import instrumentation
+import static_site
+
+OPENAPI_DATA = {
+    'info': {'title': 'KIX-REST API', 'version': 'v1'},
+    'paths': {
+        '/tickets': {
+            'get': {'summary': 'Search for tickets', 'operationId': 'TicketSearch', 'tags': ['Tickets'],
+                    'parameters': [{'name': 'Title', 'in': 'query', 'schema': {'type': 'string'}}],
+                    'responses': {'200': {'description': 'The tickets.', 'content': {'application/json': {
+                        'schema': {'$ref': '#/components/schemas/Ticket'},
+                        'example': {'Ticket': [{'Title': '<b>Printer</b>'}]}}}}}},
+        },
+        '/users/{UserID}': {
+            'parameters': [{'name': 'UserID', 'in': 'path', 'required': True}],
+            'get': {'summary': 'Get a user', 'operationId': 'UserGet', 'tags': ['Users']},
+        },
+    },
+    'components': {'schemas': {'Ticket': {'type': 'object', 'properties': {'Title': {'type': 'string'}}}}},
+}
+
+class TestStaticSite(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        instrumentation.reset()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self, file_name):
+        with open(os.path.join(self.tmp_dir, file_name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_renders_pages_with_collapsed_blocks_and_fingerprinted_assets(self):
+        manifest, rendered = static_site.build_site(OPENAPI_DATA, self.tmp_dir, jobs=1)
+        self.assertEqual(sorted(rendered), ['index', 'schemas', 'tickets', 'users'])
+        page = self.read('tickets.html')
+        self.assertIn('<section class="operation" id="TicketSearch">', page)
+        self.assertIn('<a href="schemas.html#Ticket">Ticket</a>', page)
+        # The example is only in the data file
+        self.assertNotIn('Printer', page)
+        block = re.search(r'<details class="block" data-block="(b\d+)"><summary>Example</summary>', page).group(1)
+        data_file = re.search(r'data-blocks="([^"]+)"', page).group(1)
+        self.assertIn('<b>Printer</b>', json.loads(self.read(data_file))[block])
+        self.assertIn('<code>UserID</code> <span class=required>*</span>', self.read('users.html'))
+        for asset, file_name in manifest['assets'].items():
+            self.assertRegex(file_name, rf'^assets/{asset.split(".")[0]}\.[0-9a-f]{{12}}\.{asset.split(".")[1]}$')
+            self.assertIn(file_name, self.read('index.html'))
+
+    def test_rerenders_only_changed_pages(self):
+        static_site.build_site(OPENAPI_DATA, self.tmp_dir, jobs=1)
+        self.assertEqual(static_site.build_site(OPENAPI_DATA, self.tmp_dir, jobs=1)[1], [])
+
+        changed = copy.deepcopy(OPENAPI_DATA)
+        changed['paths']['/tickets']['get']['responses']['200']['content']['application/json']['example'] = {}
+        del changed['paths']['/users/{UserID}']
+        old_data = re.search(r'data-blocks="([^"]+)"', self.read('tickets.html')).group(1)
+        manifest, rendered = static_site.build_site(changed, self.tmp_dir, jobs=1)
+        # The index lists the resources, so it changes with them
+        self.assertEqual(rendered, ['tickets', 'index'])
+        self.assertEqual(sorted(manifest['pages']), ['index', 'schemas', 'tickets'])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'users.html')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, old_data)))
+
+if __name__ == '__main__':
+    unittest.main()
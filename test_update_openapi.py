@@ -0,0 +1,198 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import contextlib
+import io
+import yaml
+
+import update_openapi
+
+class TestIncrementalUpdate(unittest.TestCase):
+
+    def setUp(self):
+        """Create RAML details and an OpenAPI spec in a temporary directory and run a first, full update."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.raml_data = {
+            "paths": {
+                "/users": {
+                    "get": {
+                        "parameters": {"page": {"description": "Page number", "type": "number"}},
+                        "responses": {"200": {"body": {"application/json": {"type": "UserCollection"}}}}
+                    }
+                },
+                "/users/{UserID}": {
+                    "get": {
+                        "parameters": {},
+                        "responses": {"200": {"body": {"application/json": {"type": "User"}}},
+                                      "404": {"body": {"application/json": {"type": "Error"}}}}
+                    }
+                }
+            },
+            "schemas": {
+                "User": {"properties": {"UserID": {"type": "integer"}},
+                         "examples": {"default": {"value": {"UserID": 1}}}},
+                "UserCollection": {"properties": {"User": {"type": "array"}},
+                                   "examples": {"default": {"value": {"User": []}}}},
+                "Error": {"properties": {"Code": {"type": "string"}},
+                          "examples": {"default": {"value": {"Code": "Object.NotFound"}}}}
+            }
+        }
+        openapi_data = {
+            "openapi": "3.0.0",
+            "info": {"title": "Test API", "version": "1.0.0"},
+            "components": {"schemas": {"User": {"type": "object"}}},
+            "paths": {
+                "/users": {"get": {"summary": "Get users", "responses": {"200": {"description": "A list of users."}}}},
+                "/users/{UserID}": {"get": {"summary": "Get a user", "responses": {}}}
+            }
+        }
+        with open(self.path('openapi.yaml'), 'w') as f:
+            yaml.dump(openapi_data, f)
+        self.write_raml()
+        self.run_update(self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name, directory=None):
+        return os.path.join(directory or self.tmp_dir, name)
+
+    def write_raml(self):
+        with open(self.path('raml_api_details.json'), 'w') as f:
+            json.dump(self.raml_data, f)
+
+    def run_update(self, directory, full=False, dedupe=False):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            update_openapi.main(self.path('raml_api_details.json', directory),
+                                self.path('openapi.yaml', directory),
+                                self.path('state.json', directory), full=full, dedupe=dedupe)
+        return output.getvalue()
+
+    def read_openapi(self, directory=None):
+        with open(self.path('openapi.yaml', directory)) as f:
+            return f.read()
+
+    def test_incremental_and_full_runs_produce_identical_documents(self):
+        """Changing one parameter, one example and adding a schema must give the same file in both modes."""
+        self.raml_data["paths"]["/users"]["get"]["parameters"]["limit"] = {"description": "Limit", "type": "number"}
+        self.raml_data["schemas"]["Error"]["examples"]["default"]["value"]["Code"] = "Object.Invalid"
+        self.raml_data["schemas"]["Group"] = {"properties": {"GroupID": {"type": "integer"}}, "examples": {}}
+        self.write_raml()
+
+        full_dir = os.path.join(self.tmp_dir, 'full')
+        os.mkdir(full_dir)
+        for name in ('raml_api_details.json', 'openapi.yaml', 'state.json'):
+            shutil.copy(self.path(name), full_dir)
+
+        output = self.run_update(self.tmp_dir)
+        self.assertIn("Incrementally updated", output)
+        self.run_update(full_dir, full=True)
+
+        self.assertEqual(self.read_openapi(), self.read_openapi(full_dir))
+        spec = yaml.safe_load(self.read_openapi())
+        self.assertIn("Group", spec["components"]["schemas"])
+        self.assertIn("limit", [p["name"] for p in spec["paths"]["/users"]["get"]["parameters"]])
+
+    def test_unchanged_raml_leaves_openapi_untouched(self):
+        """A second run without RAML changes must not rewrite openapi.yaml."""
+        before = self.read_openapi()
+        output = self.run_update(self.tmp_dir)
+        self.assertIn("up to date", output)
+        self.assertEqual(before, self.read_openapi())
+
+    def test_modified_openapi_falls_back_to_full_update(self):
+        """A hand-edited openapi.yaml must not be spliced into; a full update runs instead."""
+        with open(self.path('openapi.yaml'), 'a') as f:
+            f.write("x-edited: true\n")
+        self.raml_data["paths"]["/users"]["get"]["parameters"]["sort"] = {"description": "Sort", "type": "string"}
+        self.write_raml()
+
+        output = self.run_update(self.tmp_dir)
+        self.assertIn("running a full update", output)
+        spec = yaml.safe_load(self.read_openapi())
+        self.assertTrue(spec["x-edited"])
+        self.assertIn("sort", [p["name"] for p in spec["paths"]["/users"]["get"]["parameters"]])
+
+    def test_large_examples_are_shared_through_components(self):
+        """With dedupe, large examples are stored once under components/examples and replaced when they change."""
+        message = "The requested user could not be found. " * 3
+        self.raml_data["paths"]["/users"]["get"]["responses"]["404"] = {"body": {"application/json": {"type": "Error"}}}
+        self.raml_data["schemas"]["Error"]["examples"]["default"]["value"]["Message"] = message
+        self.write_raml()
+        self.run_update(self.tmp_dir)
+        self.assertNotIn("examples", yaml.safe_load(self.read_openapi())["components"])
+        self.run_update(self.tmp_dir, dedupe=True)
+
+        spec = yaml.safe_load(self.read_openapi())
+        (name, example), = spec["components"]["examples"].items()
+        self.assertEqual(example["value"]["Message"], message)
+        for path in ("/users", "/users/{UserID}"):
+            content = spec["paths"][path]["get"]["responses"]["404"]["content"]["application/json"]
+            self.assertEqual(content["examples"], {"default": {"$ref": f"#/components/examples/{name}"}})
+
+        self.raml_data["schemas"]["Error"]["examples"]["default"]["value"]["Code"] = "Object.Invalid"
+        self.write_raml()
+        full_dir = os.path.join(self.tmp_dir, 'full')
+        os.mkdir(full_dir)
+        for file_name in ('raml_api_details.json', 'openapi.yaml', 'state.json'):
+            shutil.copy(self.path(file_name), full_dir)
+
+        self.assertIn("Incrementally updated", self.run_update(self.tmp_dir, dedupe=True))
+        self.run_update(full_dir, full=True, dedupe=True)
+        self.assertEqual(self.read_openapi(), self.read_openapi(full_dir))
+        examples = yaml.safe_load(self.read_openapi())["components"]["examples"]
+        self.assertNotIn(name, examples)
+        self.assertEqual([example["value"]["Code"] for example in examples.values()], ["Object.Invalid"])
+
+    def test_changes_to_anchored_blocks_fall_back_to_full_update(self):
+        """Examples used by several responses are written as anchors and aliases, which are never spliced."""
+        self.raml_data["paths"]["/users"]["get"]["responses"]["404"] = {"body": {"application/json": {"type": "Error"}}}
+        self.write_raml()
+        self.run_update(self.tmp_dir, full=True)
+        self.assertIn("&id001", self.read_openapi())
+
+        full_dir = os.path.join(self.tmp_dir, 'full')
+        os.mkdir(full_dir)
+        for change in (lambda: self.raml_data["schemas"]["Error"]["examples"]["default"]["value"].update(Code="Gone"),
+                       lambda: self.raml_data["paths"]["/users"]["get"]["parameters"].update(
+                           sort={"description": "Sort", "type": "string"})):
+            change()
+            self.write_raml()
+            for file_name in ('raml_api_details.json', 'openapi.yaml', 'state.json'):
+                shutil.copy(self.path(file_name), full_dir)
+            self.assertIn("cannot be updated in place", self.run_update(self.tmp_dir))
+            self.run_update(full_dir, full=True)
+            self.assertEqual(self.read_openapi(), self.read_openapi(full_dir))
+
+    def test_shards_make_up_the_whole_document(self):
+        """Every shard plus the components is a complete document, and removed resources lose their shard."""
+        spec = yaml.safe_load(self.read_openapi())
+        spec["paths"]["/groups"] = {"get": {"summary": "Get groups", "tags": ["Groups"], "responses": {}}}
+        shard_dir = self.path('shards')
+        index = update_openapi.write_shards(spec, shard_dir)
+
+        self.assertEqual([shard["name"] for shard in index["x-shards"]], ["groups", "users"])
+        self.assertEqual(index["x-shards"][0]["tags"], ["Groups"])
+        self.assertEqual(index["info"], spec["info"])
+        with open(os.path.join(shard_dir, 'components.json')) as f:
+            self.assertEqual(json.load(f)["components"], spec["components"])
+        paths = {}
+        for shard in index["x-shards"]:
+            with open(os.path.join(shard_dir, shard["file"])) as f:
+                paths.update(json.load(f)["paths"])
+        self.assertEqual(paths, spec["paths"])
+
+        del spec["paths"]["/groups"]
+        update_openapi.write_shards(spec, shard_dir)
+        self.assertFalse(os.path.exists(os.path.join(shard_dir, 'groups.json')))
+
+    def test_large_resources_are_split_by_their_second_segment(self):
+        paths = [f"/system/area{i % 2}/item{i}" for i in range(update_openapi.SHARD_MAX_PATHS + 1)] + ["/users"]
+        names = update_openapi.shard_names(paths)
+        self.assertEqual(names["/system/area1/item1"], "system-area1")
+        self.assertEqual(names["/users"], "users")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import validate_examples
+
+OPENAPI_DATA = {
+    'paths': {
+        '/users/{UserID}': {
+            'get': {'responses': {
+                '200': {'content': {'application/json': {
+                    'schema': {'$ref': '#/components/schemas/UserResponse'},
+                    'examples': {'default': {'$ref': '#/components/examples/User-0123abcd'},
+                                 'wrong': {'value': {'User': {'UserID': '1', 'Email': None}}}}}}},
+                '404': {'content': {'application/json': {'schema': {'$ref': '#/components/schemas/Error'},
+                                                         'example': {'Code': 'Object.NotFound'}}}},
+            }},
+            'patch': {'requestBody': {'content': {'application/json': {
+                'schema': {'type': 'object', 'required': ['User']}, 'example': {'Login': 'admin'}}}},
+                'responses': {'200': {'description': 'Updated.'}}},
+        },
+    },
+    'components': {
+        'schemas': {
+            'User': {'type': 'object', 'required': ['UserID'],
+                     'properties': {'UserID': {'type': 'integer'}, 'Email': {'type': 'string', 'nullable': True}}},
+            'UserResponse': {'type': 'object', 'properties': {'User': {'$ref': '#/components/schemas/User'}}},
+            'Error': {'type': 'object', 'properties': {'Code': {'type': 'string'}}},
+        },
+        'examples': {'User-0123abcd': {'value': {'User': {'UserID': 1, 'Email': None}}}},
+    },
+}
+
+HTML_DATA = [{'path': '/users/{UserID}', 'method': 'GET', 'query_params': [], 'response_examples': [
+    {'status_code': '200', 'example': '{"User": {"UserID": 2, "Email": "a@example.com"}}'},
+    {'status_code': '404', 'example': '{"Code": "Object.NotFound",}'},
+]}]
+
+@unittest.skipIf(validate_examples.jsonschema is None, 'jsonschema is not installed')
+class TestValidateExamples(unittest.TestCase):
+
+    def test_reports_mismatches_per_path_method_and_status(self):
+        report = validate_examples.validate(OPENAPI_DATA, HTML_DATA, jobs=1)
+        self.assertEqual((report['checked'], report['valid']), (6, 3))
+        self.assertEqual([(m['path'], m['method'], m['status'], m['source'], m['example'])
+                          for m in report['mismatches']], [
+            ('/users/{UserID}', 'get', '200', 'openapi', 'wrong'),
+            ('/users/{UserID}', 'get', '404', 'html', 'html-1'),
+            ('/users/{UserID}', 'patch', 'request', 'openapi', 'example'),
+        ])
+        self.assertEqual(report['mismatches'][0]['errors'],
+                         [{'path': '/User/UserID', 'message': "'1' is not of type 'integer'"}])
+        self.assertEqual(report['mismatches'][1]['schema'], None)
+
+    def test_worker_pool_gives_the_same_report(self):
+        html_data = HTML_DATA * 10
+        serial = validate_examples.validate(OPENAPI_DATA, html_data, jobs=1)
+        pooled = validate_examples.validate(OPENAPI_DATA, html_data, jobs=2)
+        self.assertEqual(pooled['mismatches'], serial['mismatches'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,51 +1,415 @@
+import argparse
+import artifacts
+import contextlib
+import hashlib
+import instrumentation
 import json
+import os
+import re
+import records
 import yaml
+import yaml_backend
+from collections import Counter
+
+RAML_FILE = 'raml_api_details.json'
+OPENAPI_FILE = 'openapi.yaml'
+STATE_FILE = '.update_openapi_state.json'
+# Sharded copy of the spec for the viewer (see write_shards)
+SHARD_DIR = 'openapi'
+SHARD_INDEX = 'index.json'
+SHARD_COMPONENTS = 'components.json'
+SHARD_MAX_PATHS = 40
+YAML_OPTIONS = {'default_flow_style': False, 'sort_keys': False, 'indent': 2}
+# Examples and property schemas at least this long (as JSON) are stored once
+# under components and referenced; shorter ones are not worth a $ref.
+SHARED_MIN_BYTES = 100
+SHARED_NAME = re.compile(r'-[0-9a-f]{8}$')
+SHARED_REF = re.compile(r'#/components/(schemas|examples)/([A-Za-z0-9._-]+)')
 
 def load_json_file(file_path):
-    """Loads a JSON file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Loads a JSON file, or an intermediate file in any of the formats of artifacts."""
+    return artifacts.read(file_path)
 
 def load_yaml_file(file_path):
     """Loads a YAML file."""
     with open(file_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        return yaml_backend.safe_load(f)
 
 def write_yaml_file(data, file_path):
     """Writes data to a YAML file."""
     with open(file_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False, indent=2)
+        yaml_backend.dump(data, f, **YAML_OPTIONS)
 
-def convert_raml_param_to_openapi(param_name, param_details):
-    """Converts a RAML parameter to OpenAPI 3.0 format."""
-    if not isinstance(param_details, dict):
-        return None
+def convert_raml_param_to_openapi(param):
+    """Converts a RAML parameter (records.Parameter) to OpenAPI 3.0 format."""
     return {
-        'name': param_name,
+        'name': param.name,
         'in': 'query',
-        'description': param_details.get('description', param_details.get('displayName', '')),
-        'required': param_details.get('required', False),
-        'schema': {'type': param_details.get('type', 'string')}
+        'description': param.description if param.description is not None else (param.display_name or ''),
+        'required': param.required if param.required is not None else False,
+        'schema': {'type': param.type if param.type is not None else 'string'}
     }
 
-def main():
+def share(shared, section, hint, value):
     """
-    Updates the OpenAPI specification with comprehensive data from RAML files.
+    Stores `value` in shared[section] (the components of the document) under a
+    name made of `hint` and its content hash, and returns a $ref to it. Equal
+    values get the same name, so each is stored once however often it is used.
     """
-    print("Starting OpenAPI specification update...")
+    text = json.dumps(value, sort_keys=True)
+    if len(text) < SHARED_MIN_BYTES:
+        return value
+    name = f"{re.sub(r'[^A-Za-z0-9._-]', '_', hint)}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:8]}"
+    shared.setdefault(section, {}).setdefault(name, value)
+    return {'$ref': f'#/components/{section}/{name}'}
+
+def collect_refs(data, refs):
+    """Adds every $ref string found in data to refs."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == '$ref' and isinstance(value, str):
+                refs.add(value)
+            else:
+                collect_refs(value, refs)
+    elif isinstance(data, list):
+        for value in data:
+            collect_refs(value, refs)
+    return refs
+
+def resolve_ref(openapi_data, value):
+    """Follows a local $ref of the document (e.g. to components/examples), or returns value."""
+    if isinstance(value, dict) and isinstance(value.get('$ref'), str) and value['$ref'].startswith('#/'):
+        target = openapi_data
+        for part in value['$ref'][2:].split('/'):
+            target = target.get(part.replace('~1', '/').replace('~0', '~')) if isinstance(target, dict) else None
+        return target
+    return value
+
+def prune_shared(openapi_data):
+    """Removes the shared schemas and examples that nothing refers to any more."""
+    refs = collect_refs(openapi_data, set())
+    components = openapi_data.get('components', {})
+    for section in ('schemas', 'examples'):
+        entries = components.get(section, {})
+        for name in [name for name in entries if SHARED_NAME.search(name)]:
+            if f'#/components/{section}/{name}' not in refs:
+                del entries[name]
+    if 'examples' in components and not components['examples']:
+        del components['examples']
+
+def update_schema(schemas, schema_name, schema_details, shared=None):
+    """Updates/creates one component schema from its RAML details."""
+    if schema_details.get('properties'):
+        properties = schema_details.get('properties', {})
+        if shared is not None:
+            properties = {name: share(shared, 'schemas', name, prop) for name, prop in properties.items()}
+        schemas[schema_name] = {
+            'type': 'object',
+            'properties': properties
+        }
+
+def update_endpoint(openapi_endpoint, details, schema_names, raml_schemas, shared=None):
+    """
+    Adds the RAML parameters and response schemas/examples of one method (a
+    records.Endpoint) to its OpenAPI operation. With `shared`, the examples
+    are stored there and referenced instead of being copied into every
+    response.
+    """
+    # Add Query Parameters
+    if details.parameters:
+        if 'parameters' not in openapi_endpoint:
+            openapi_endpoint['parameters'] = []
+        existing_params = {p['name'] for p in openapi_endpoint['parameters'] if p.get('in') == 'query'}
+
+        for param in details.parameters:
+            if param.name not in existing_params:
+                openapi_endpoint['parameters'].append(convert_raml_param_to_openapi(param))
+
+    # Add Response schemas and examples
+    for response in details.responses:
+        openapi_response = openapi_endpoint.setdefault('responses', {}).setdefault(response.status_code, {})
+        if 'description' not in openapi_response:
+            openapi_response['description'] = response.description if response.description is not None \
+                else "No description provided."
+
+        content = openapi_response.setdefault('content', {}).setdefault('application/json', {})
+
+        if response.body_type is not None:
+            schema_name = response.body_type
+            if schema_name in schema_names:
+                content['schema'] = {'$ref': f'#/components/schemas/{schema_name}'}
+
+                schema_examples = raml_schemas.get(schema_name, {}).get('examples')
+                if schema_examples:
+                    # **Crucially, remove singular 'example' if 'examples' is being added**
+                    if 'example' in content:
+                        del content['example']
+                    if shared is not None:
+                        schema_examples = {name: share(shared, 'examples', f'{schema_name}.{name}', example)
+                                           for name, example in schema_examples.items()}
+                    content['examples'] = schema_examples
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def referenced_schemas(details):
+    """Names of the RAML types used as response bodies of one method."""
+    return {response.body_type for response in details.responses if response.body_type is not None}
+
+def fingerprint_raml(raml_data):
+    """
+    Returns content hashes of every RAML schema and path/method. A method's hash
+    also covers the schemas it references, since their examples end up in it.
+    """
+    schemas = {name: _digest(details) for name, details in raml_data.get('schemas', {}).items()}
+    paths = {}
+    for path, methods in raml_data.get('paths', {}).items():
+        paths[path] = {
+            method: _digest([records.raml_endpoint_json(details),
+                             sorted((name, schemas.get(name)) for name in referenced_schemas(details))])
+            for method, details in methods.items()
+        }
+    return {'schemas': schemas, 'paths': paths}
+
+def load_state(state_file):
+    try:
+        return load_json_file(state_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_state(state_file, fingerprints, openapi_text, dedupe=False):
+    state = dict(fingerprints, openapi_sha256=hashlib.sha256(openapi_text.encode('utf-8')).hexdigest(),
+                 dedupe=dedupe)
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+BLOCK_KEY = re.compile(r'^( *)(\S.*):$')
+# Anchors and aliases PyYAML writes for objects used more than once
+ANCHOR = re.compile(r'[&*]id\d{3,}\b')
+
+def index_blocks(lines, section):
+    """
+    Locates the mapping entries of `section` (a tuple of nested keys) in the
+    lines of a file written by write_yaml_file.
+
+    Returns `({key: (start, end)}, section_end)` with line ranges, or None if
+    the section cannot be found in that layout.
+    """
+    start = 0
+    for depth, parent in enumerate(section):
+        header = ' ' * (2 * depth) + parent + ':'
+        for number in range(start, len(lines)):
+            line = lines[number].rstrip('\n')
+            if line == header:
+                start = number + 1
+                break
+            if line.strip() and len(line) - len(line.lstrip(' ')) < 2 * depth:
+                return None
+        else:
+            return None
+
+    indent = 2 * len(section)
+    blocks, key, key_start, end = {}, None, None, len(lines)
+    for number in range(start, len(lines)):
+        line = lines[number].rstrip('\n')
+        stripped = line.lstrip(' ')
+        if not stripped:
+            continue
+        line_indent = len(line) - len(stripped)
+        if line_indent < indent:
+            end = number
+            break
+        if line_indent == indent and not stripped.startswith('- '):
+            match = BLOCK_KEY.match(line)
+            if not match:
+                return None
+            if key is not None:
+                blocks[key] = (key_start, number)
+            key_text = match.group(2)
+            key = yaml_backend.safe_load(key_text) if key_text[0] in '\'"' else key_text
+            key_start = number
+    if key is not None:
+        blocks[key] = (key_start, end)
+    return blocks, end
+
+def dump_block(section, key, value):
+    """Dumps one mapping entry exactly as write_yaml_file would inside `section`."""
+    data = {key: value}
+    for parent in reversed(section):
+        data = {parent: data}
+    text = yaml_backend.dump(data, **YAML_OPTIONS)
+    return text.splitlines(keepends=True)[len(section):]
+
+def has_anchors(lines):
+    """Whether the lines define or use a YAML anchor."""
+    return any(ANCHOR.search(line) for line in lines)
+
+def object_ids(data, repeated=None):
+    """
+    Returns the ids of the dicts and lists in data. Those reached more than
+    once, which a full write stores as an anchor and its aliases, are also
+    added to `repeated`.
+    """
+    seen, stack = set(), [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (dict, list)):
+            if id(value) in seen:
+                if repeated is not None:
+                    repeated.add(id(value))
+                continue
+            seen.add(id(value))
+            stack.extend(value.values() if isinstance(value, dict) else value)
+    return seen
+
+def shared_example_schemas(raml_data, dedupe=False):
+    """
+    Names of the RAML types whose examples go into more than one response as
+    the same objects, which a full write stores once, as an anchor and its
+    aliases. With `dedupe`, that is only the examples too small to share.
+    """
+    raml_schemas = raml_data.get('schemas', {})
+    uses = Counter(response.body_type for methods in raml_data.get('paths', {}).values()
+                   for details in methods.values() for response in details.responses)
+    names = set()
+    for name, count in uses.items():
+        examples = raml_schemas.get(name, {}).get('examples') if name is not None and count > 1 else None
+        if examples and (not dedupe or any(len(json.dumps(example, sort_keys=True)) < SHARED_MIN_BYTES
+                                           for example in examples.values())):
+            names.add(name)
+    return names
 
-    raml_data = load_json_file('raml_api_details.json')
-    openapi_data = load_yaml_file('openapi.yaml')
+def load_block(section, lines):
+    """Parses the lines of one mapping entry inside `section`."""
+    text = ''.join(' ' * (2 * depth) + parent + ':\n' for depth, parent in enumerate(section)) + ''.join(lines)
+    data = yaml_backend.safe_load(text)
+    for parent in section:
+        data = data[parent]
+    return data
 
+def prune_shared_blocks(lines):
+    """
+    Same as prune_shared on the lines of a written document: drops the blocks
+    of shared entries whose $ref appears nowhere in the text. Returns None if
+    that would leave components/examples empty.
+    """
+    refs = set(SHARED_REF.findall(''.join(lines)))
+    unused = []
+    for section in ('schemas', 'examples'):
+        index = index_blocks(lines, ('components', section))
+        if index is None:
+            continue
+        blocks = index[0]
+        stale = [block for name, block in blocks.items()
+                 if SHARED_NAME.search(name) and (section, name) not in refs]
+        if section == 'examples' and stale and len(stale) == len(blocks):
+            return None
+        unused.extend(stale)
+    for start, end in sorted(unused, reverse=True):
+        del lines[start:end]
+    return lines
+
+def update_incrementally(raml_data, fingerprints, state, openapi_text, dedupe=False):
+    """
+    Applies the RAML entries whose fingerprints changed since the last run to
+    openapi_text, re-serializing only the affected path and schema blocks.
+    Returns the new text, or None if the document cannot be updated in place.
+    That includes every change that reaches a YAML anchor or alias: a full
+    write numbers them through the whole document.
+    """
+    changed_schemas = {name for name, digest in fingerprints['schemas'].items()
+                       if state['schemas'].get(name) != digest}
+    changed_paths = {}
+    for path, methods in fingerprints['paths'].items():
+        for method, digest in methods.items():
+            if state['paths'].get(path, {}).get(method) != digest:
+                changed_paths.setdefault(path, []).append(method)
+    instrumentation.count('update.changed_schemas', len(changed_schemas))
+    instrumentation.count('update.changed_endpoints', sum(map(len, changed_paths.values())))
+    if not changed_schemas and not changed_paths:
+        return openapi_text
+
+    lines = openapi_text.splitlines(keepends=True)
+    schema_index = index_blocks(lines, ('components', 'schemas'))
+    path_index = index_blocks(lines, ('paths',))
+    if schema_index is None or path_index is None:
+        return None
+    schema_blocks, schemas_end = schema_index
+    path_blocks, _ = path_index
+    example_blocks, examples_end = index_blocks(lines, ('components', 'examples')) or ({}, None)
+
+    shared_examples = shared_example_schemas(raml_data, dedupe)
+    if any(referenced_schemas(raml_data['paths'][path][method]) & shared_examples
+           for path, methods in changed_paths.items() for method in methods):
+        return None
+
+    raml_schemas = raml_data.get('schemas', {})
+    shared = {} if dedupe else None
+    replacements = {}
+    new_schema_lines = []
+    schema_names = set(schema_blocks)
+    for name in (name for name in raml_schemas if name in changed_schemas):
+        schemas = {}
+        update_schema(schemas, name, raml_schemas[name], shared)
+        # New shared property schemas go before the schema, as in a full update
+        for shared_name, value in (shared or {}).get('schemas', {}).items():
+            if shared_name not in schema_names:
+                new_schema_lines.extend(dump_block(('components', 'schemas'), shared_name, value))
+                schema_names.add(shared_name)
+        if name not in schemas:
+            continue
+        block = dump_block(('components', 'schemas'), name, schemas[name])
+        if name in schema_blocks:
+            replacements[schema_blocks[name]] = block
+        else:
+            new_schema_lines.extend(block)
+            schema_names.add(name)
+
+    for path, methods in changed_paths.items():
+        if path not in path_blocks:
+            continue
+        start, end = path_blocks[path]
+        try:
+            path_item = load_block(('paths',), lines[start:end])[path]
+        except (yaml.YAMLError, KeyError, TypeError):
+            return None
+        for method in methods:
+            if isinstance(path_item, dict) and method in path_item:
+                update_endpoint(path_item[method], raml_data['paths'][path][method], schema_names, raml_schemas,
+                                shared)
+        replacements[(start, end)] = dump_block(('paths',), path, path_item)
+
+    new_example_lines = []
+    for name, value in (shared or {}).get('examples', {}).items():
+        if name not in example_blocks:
+            new_example_lines.extend(dump_block(('components', 'examples'), name, value))
+    if new_example_lines:
+        if examples_end is None:
+            return None
+        replacements[(examples_end, examples_end)] = new_example_lines
+    if new_schema_lines:
+        replacements[(schemas_end, schemas_end)] = new_schema_lines
+    if any(has_anchors(lines[start:end]) or has_anchors(block) for (start, end), block in replacements.items()):
+        return None
+    for (start, end), block in sorted(replacements.items(), reverse=True):
+        lines[start:end] = block
+    lines = prune_shared_blocks(lines)
+    return None if lines is None else ''.join(lines)
+
+def update_full(raml_data, openapi_data, dedupe=False):
+    """
+    Applies all RAML schemas and paths to the loaded OpenAPI document. With
+    `dedupe`, examples and property schemas are shared through components.
+    """
+    raml_data = records.raml_details(raml_data)
     # 1. Update/Create schemas in the components section
     print("Updating component schemas...")
-    schemas = openapi_data.setdefault('components', {}).setdefault('schemas', {})
+    components = openapi_data.setdefault('components', {})
+    schemas = components.setdefault('schemas', {})
+    shared = components if dedupe else None
     for schema_name, schema_details in raml_data.get('schemas', {}).items():
-        if schema_details.get('properties'):
-            schemas[schema_name] = {
-                'type': 'object',
-                'properties': schema_details.get('properties', {})
-            }
+        update_schema(schemas, schema_name, schema_details, shared)
+    instrumentation.count('update.schemas', len(raml_data.get('schemas', {})))
 
     # 2. Update paths with parameters and response examples/schemas
     print("Updating paths with parameters and response data...")
@@ -57,48 +421,189 @@ def main():
         for method, details in methods.items():
             if method not in paths[path]:
                 continue
+            update_endpoint(paths[path][method], details, schemas, raml_data.get('schemas', {}), shared)
+            instrumentation.count('update.endpoints')
+
+    prune_shared(openapi_data)
+
+def shard_names(paths):
+    """
+    Maps each path to its shard: its first segment (/tickets/{TicketID} ->
+    tickets), or its first two for resources with more than SHARD_MAX_PATHS
+    paths (/system/users -> system-users).
+    """
+    segments = {path: [re.sub(r'[^A-Za-z0-9_-]', '_', segment) for segment in path.strip('/').split('/')]
+                for path in paths}
+    sizes = Counter(parts[0] for parts in segments.values())
+    return {path: '-'.join(parts[:2] if sizes[parts[0]] > SHARD_MAX_PATHS else parts[:1]) or 'root'
+            for path, parts in segments.items()}
 
-            openapi_endpoint = paths[path][method]
+def dump_minified(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
 
-            # Add Query Parameters
-            if details.get('parameters'):
-                if 'parameters' not in openapi_endpoint:
-                    openapi_endpoint['parameters'] = []
-                existing_params = {p['name'] for p in openapi_endpoint['parameters'] if p.get('in') == 'query'}
+def write_shards(openapi_data, shard_dir=SHARD_DIR):
+    """
+    Writes the document as one minified JSON file per resource (see
+    shard_names) holding its paths, a file with the components, and an index.
 
-                for name, deets in details['parameters'].items():
-                    if name not in existing_params:
-                        param = convert_raml_param_to_openapi(name, deets)
-                        if param:
-                            openapi_endpoint['parameters'].append(param)
+    The index is the document without paths and components, plus an
+    x-shards list with the file, content hash, paths and tags of each shard;
+    a shard and the components together make a complete OpenAPI document.
+    Unchanged files are not rewritten, and shards of resources that no longer
+    exist are removed. Returns the index.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    paths = openapi_data.get('paths', {})
+    shards = {}
+    for path, name in shard_names(paths).items():
+        shards.setdefault(name, {})[path] = paths[path]
 
-            # Add Response schemas and examples
-            if details.get('responses'):
-                for code, response_def in details['responses'].items():
-                    if not isinstance(response_def, dict): continue
+    files = {SHARD_COMPONENTS: dump_minified({'components': openapi_data.get('components', {})})}
+    index = {key: value for key, value in openapi_data.items() if key not in ('paths', 'components')}
+    index['paths'] = {}
+    index['x-components'] = {'file': SHARD_COMPONENTS,
+                             'sha256': hashlib.sha256(files[SHARD_COMPONENTS]).hexdigest()[:12]}
+    index['x-shards'] = []
+    for name in sorted(shards):
+        file_name = f'{name}.json'
+        files[file_name] = dump_minified({'paths': shards[name]})
+        operations = [operation for methods in shards[name].values() for operation in methods.values()
+                      if isinstance(operation, dict)]
+        index['x-shards'].append({
+            'name': name,
+            'resource': name.split('-', 1)[0],
+            'file': file_name,
+            'sha256': hashlib.sha256(files[file_name]).hexdigest()[:12],
+            'operations': len(operations),
+            'tags': sorted({tag for operation in operations for tag in operation.get('tags', [])}),
+            'paths': list(shards[name]),
+        })
+    files[SHARD_INDEX] = dump_minified(index)
 
-                    openapi_response = openapi_endpoint.setdefault('responses', {}).setdefault(str(code), {})
-                    if 'description' not in openapi_response:
-                        openapi_response['description'] = response_def.get('description', "No description provided.")
+    index_file = os.path.join(shard_dir, SHARD_INDEX)
+    try:
+        previous = load_json_file(index_file)
+        stale = [shard['file'] for shard in previous.get('x-shards', []) if shard['file'] not in files]
+    except (FileNotFoundError, json.JSONDecodeError):
+        stale = []
+    write_changed_files(shard_dir, files, stale)
+    return index
 
-                    content = openapi_response.setdefault('content', {}).setdefault('application/json', {})
+def write_changed_files(directory, files, stale=(), counter='update.shards_written'):
+    """
+    Writes {file name: content bytes} to a directory, skipping the files whose
+    content did not change, after removing the `stale` files.
+    """
+    for file_name in stale:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, file_name))
+
+    for file_name, content in files.items():
+        file_path = os.path.join(directory, file_name)
+        try:
+            with open(file_path, 'rb') as f:
+                if f.read() == content:
+                    continue
+        except FileNotFoundError:
+            pass
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        instrumentation.count(counter)
+
+def update_spec(raml_data, openapi_file=OPENAPI_FILE, state_file=STATE_FILE, full=False, dedupe=False,
+                shard_dir=None):
+    """
+    Updates the OpenAPI specification with comprehensive data from RAML files.
 
-                    body = response_def.get('body', {}).get('application/json', {})
-                    if 'type' in body and isinstance(body['type'], str):
-                        schema_name = body['type']
-                        if schema_name in schemas:
-                            content['schema'] = {'$ref': f'#/components/schemas/{schema_name}'}
+    By default only the RAML paths/methods and schemas whose fingerprints
+    changed since the previous run are applied, and only their blocks of the
+    YAML file are rewritten. A full update runs with `full`, when there is no
+    usable state from a previous run, or when openapi.yaml was modified since.
+    With `dedupe`, examples and large property schemas are stored once under
+    components and referenced by $ref (see share).
 
-                            schema_examples = raml_data.get('schemas', {}).get(schema_name, {}).get('examples')
-                            if schema_examples:
-                                # **Crucially, remove singular 'example' if 'examples' is being added**
-                                if 'example' in content:
-                                    del content['example']
-                                content['examples'] = schema_examples
+    With `shard_dir`, the result is also written there as shards (see
+    write_shards).
+
+    Returns the new text of the file and, after a full update, its parsed
+    content (None after an incremental one).
+    """
+    raml_data = records.raml_details(raml_data)
+    with instrumentation.phase('update.fingerprint'):
+        fingerprints = fingerprint_raml(raml_data)
+    with open(openapi_file, 'r', encoding='utf-8') as f:
+        openapi_text = f.read()
+
+    state = None if full else load_state(state_file)
+    if state and state.get('openapi_sha256') == hashlib.sha256(openapi_text.encode('utf-8')).hexdigest() \
+            and state.get('dedupe', False) == dedupe:
+        with instrumentation.phase('update.incremental'):
+            new_text = update_incrementally(raml_data, fingerprints, state, openapi_text, dedupe)
+        if new_text is not None:
+            if new_text != openapi_text:
+                with open(openapi_file, 'w', encoding='utf-8') as f:
+                    f.write(new_text)
+                print("Incrementally updated openapi.yaml with the changed RAML data.")
+            else:
+                print("openapi.yaml is up to date.")
+            write_state(state_file, fingerprints, new_text, dedupe)
+            if shard_dir:
+                with instrumentation.phase('update.write_shards'):
+                    write_shards(yaml_backend.safe_load(new_text), shard_dir)
+            return new_text, None
+        print("openapi.yaml cannot be updated in place, running a full update...")
+    elif not full:
+        print("No matching state from a previous run, running a full update...")
+
+    with instrumentation.phase('update.load_yaml'):
+        openapi_data = yaml_backend.safe_load(openapi_text)
+    with instrumentation.phase('update.apply'):
+        update_full(raml_data, openapi_data, dedupe)
 
     # Write the final, complete file
-    write_yaml_file(openapi_data, 'openapi.yaml')
+    with instrumentation.phase('update.dump_yaml'):
+        write_yaml_file(openapi_data, openapi_file)
+    with open(openapi_file, 'r', encoding='utf-8') as f:
+        new_text = f.read()
+    write_state(state_file, fingerprints, new_text, dedupe)
     print("\\nSuccessfully updated openapi.yaml with comprehensive RAML data.")
+    if shard_dir:
+        with instrumentation.phase('update.write_shards'):
+            write_shards(openapi_data, shard_dir)
+    return new_text, openapi_data
+
+def main(raml_file=RAML_FILE, openapi_file=OPENAPI_FILE, state_file=STATE_FILE, full=False, dedupe=False,
+         shard_dir=None):
+    """
+    Updates openapi.yaml with the RAML data stored in raml_api_details.json and
+    returns the written text and document, as update_spec does.
+    """
+    print("Starting OpenAPI specification update...")
+
+    with instrumentation.phase('update.load_raml'):
+        raml_data = load_json_file(raml_file)
+    return update_spec(raml_data, openapi_file, state_file, full, dedupe, shard_dir)
+
+def cli(argv=None):
+    """Command line of this script; returns what main returns."""
+    parser = argparse.ArgumentParser(description='Update openapi.yaml with the data in raml_api_details.json.')
+    parser.add_argument('--full', action='store_true', help='apply all RAML data and rewrite the whole file')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='store large examples and property schemas once under components and reference '
+                             'them by $ref (on the current data the file gets larger than with the YAML aliases)')
+    parser.add_argument('--shards', nargs='?', const=SHARD_DIR, default=None, metavar='DIR',
+                        help=f'also write the spec as per-resource JSON shards for index.html (default: {SHARD_DIR})')
+    parser.add_argument('--search-index', nargs='?', const='search', default=None, metavar='DIR',
+                        help='also write the search index for index.html (default: search)')
+    instrumentation.add_arguments(parser, 'update_openapi_profile.json')
+    args = parser.parse_args(argv)
+    with instrumentation.profiling(args):
+        new_text, openapi_data = main(full=args.full, dedupe=args.dedupe, shard_dir=args.shards)
+        if args.search_index:
+            # search_index imports this module
+            import search_index
+            search_index.write_index(openapi_data or yaml_backend.safe_load(new_text), args.search_index)
+    return new_text, openapi_data
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    cli()
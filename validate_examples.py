@@ -0,0 +1,241 @@
+"""
+Validates the examples documented in openapi.yaml, and the response examples
+of the HTML documentation (parse_html_v2), against the schemas of the
+responses and request bodies they belong to.
+
+Every distinct schema is compiled once per process into a jsonschema
+validator and cached; the examples are validated in batches by a process
+pool driven from asyncio, as validating is CPU-bound. The report lists the
+mismatches per path, method and status code. jsonschema is optional: without
+it nothing is validated, and the report says so.
+"""
+import argparse
+import asyncio
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import artifacts
+import instrumentation
+import records
+import update_openapi
+import yaml_backend
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+OPENAPI_FILE = 'openapi.yaml'
+HTML_RECORDS_FILE = 'parsed_api_v2.json'
+REPORT_FILE = 'example_validation.json'
+MEDIA_TYPE = 'application/json'
+# Errors reported per mismatching example; the rest are counted
+MAX_ERRORS = 5
+SCHEMA_KEYWORDS = ('allOf', 'anyOf', 'oneOf')
+
+def _media_checks(openapi_data, path, method, status, content):
+    media = (content or {}).get(MEDIA_TYPE)
+    if not isinstance(media, dict) or 'schema' not in media:
+        return
+    if 'example' in media:
+        yield ('openapi', path, method, status, 'example', media['schema'], media['example'])
+    for name, example in (media.get('examples') or {}).items():
+        example = update_openapi.resolve_ref(openapi_data, example)
+        if isinstance(example, dict) and 'value' in example:
+            yield ('openapi', path, method, status, name, media['schema'], example['value'])
+
+def collect_checks(openapi_data, html_data=None):
+    """
+    Returns the examples to validate as (source, path, method, status,
+    example name, schema, example) tuples: the examples of every
+    response and request body (status 'request') of the spec, and the
+    response examples of the HTML records, against the spec's schema for the
+    same path, method and status code. HTML examples that are not valid JSON
+    are checked against a None schema and reported as such.
+    """
+    checks = []
+    paths = openapi_data.get('paths') or {}
+    for path, path_item in paths.items():
+        for method, operation in (path_item or {}).items():
+            if not isinstance(operation, dict):
+                continue
+            request_body = update_openapi.resolve_ref(openapi_data, operation.get('requestBody'))
+            if isinstance(request_body, dict):
+                checks.extend(_media_checks(openapi_data, path, method, 'request', request_body.get('content')))
+            for status, response in (operation.get('responses') or {}).items():
+                response = update_openapi.resolve_ref(openapi_data, response)
+                if isinstance(response, dict):
+                    checks.extend(_media_checks(openapi_data, path, method, str(status), response.get('content')))
+
+    for record in records.html_endpoints(html_data or []):
+        method = record.method
+        operation = (paths.get(record.path) or {}).get(method)
+        if not isinstance(operation, dict):
+            continue
+        responses = operation.get('responses') or {}
+        for number, html_example in enumerate(record.responses):
+            status = html_example.status_code
+            response = update_openapi.resolve_ref(openapi_data, responses.get(status, responses.get('default')))
+            media = ((response or {}).get('content') or {}).get(MEDIA_TYPE) if isinstance(response, dict) else None
+            if not isinstance(media, dict) or 'schema' not in media:
+                continue
+            try:
+                example = json.loads(html_example.example or '')
+                schema = media['schema']
+            except json.JSONDecodeError:
+                example, schema = html_example.example, None
+            checks.append(('html', record.path, method, status, f'html-{number}', schema, example))
+    return checks
+
+def to_json_schema(schema):
+    """
+    Converts an OpenAPI 3.0 schema object to JSON Schema draft 4, which it is
+    based on: `nullable: true` becomes a 'null' type, in all nested schemas.
+    """
+    if isinstance(schema, list):
+        return [to_json_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    converted = {}
+    for key, value in schema.items():
+        if key in ('properties', 'patternProperties', 'definitions') and isinstance(value, dict):
+            converted[key] = {name: to_json_schema(item) for name, item in value.items()}
+        elif key in ('items', 'additionalProperties', 'not') or key in SCHEMA_KEYWORDS:
+            converted[key] = to_json_schema(value)
+        elif key != 'nullable':
+            converted[key] = value
+    if schema.get('nullable') is True:
+        if isinstance(converted.get('type'), str):
+            converted['type'] = [converted['type'], 'null']
+        elif 'type' not in converted:
+            converted = {'anyOf': [converted, {'type': 'null'}]}
+    return converted
+
+# Per-process state: the converted components every $ref resolves against, and the compiled validators
+_components = {}
+_validators = {}
+
+def init_validators(components):
+    """Sets the components the schemas refer to and drops the validators compiled for other ones."""
+    global _components
+    _components = {'schemas': {name: to_json_schema(schema)
+                               for name, schema in ((components or {}).get('schemas') or {}).items()}}
+    _validators.clear()
+
+def validator_for(schema):
+    """Returns the cached validator of a schema, compiling it on first use."""
+    key = json.dumps(schema, sort_keys=True)
+    validator = _validators.get(key)
+    if validator is None:
+        # Local $refs ('#/components/schemas/...') resolve against this root
+        root = {'allOf': [to_json_schema(schema)], 'components': _components}
+        validator = _validators[key] = jsonschema.Draft4Validator(root)
+        instrumentation.count('validate.validators_compiled')
+    return validator
+
+def _error_path(error):
+    return '/' + '/'.join(str(part) for part in error.absolute_path)
+
+def validate_batch(checks):
+    """Validates (index, schema, example) triples and returns (index, errors, error count) for the mismatches."""
+    mismatches = []
+    for index, schema, example in checks:
+        if schema is None:
+            mismatches.append((index, [{'path': '/', 'message': 'The example is not valid JSON.'}], 1))
+            continue
+        try:
+            errors = sorted(validator_for(schema).iter_errors(example), key=_error_path)
+        except Exception as e:
+            # Broken schemas and unresolvable $refs; their exception types differ between jsonschema versions
+            mismatches.append((index, [{'path': '/', 'message': f'Cannot check against the schema: {e}'}], 1))
+            continue
+        if errors:
+            mismatches.append((index, [{'path': _error_path(error), 'message': error.message[:500]}
+                                       for error in errors[:MAX_ERRORS]], len(errors)))
+    return mismatches
+
+async def validate_async(checks, components, jobs=None):
+    """
+    Validates the checks in batches, in a pool of `jobs` processes (one per
+    CPU by default, none when this is already a worker process) that each
+    compile their validators once; with jobs=1 or few checks, in this
+    process. Returns the mismatches as validate_batch does.
+    """
+    items = [(index, check[5], check[6]) for index, check in enumerate(checks)]
+    jobs = jobs or (1 if multiprocessing.parent_process() else os.cpu_count() or 1)
+    if jobs == 1 or len(items) < 2 * jobs:
+        init_validators(components)
+        return validate_batch(items)
+
+    batch_size = max(1, len(items) // (jobs * 4))
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(jobs, initializer=init_validators, initargs=(components,)) as executor:
+        results = await asyncio.gather(*(loop.run_in_executor(executor, validate_batch, batch)
+                                         for batch in batches))
+    return [mismatch for result in results for mismatch in result]
+
+def validate(openapi_data, html_data=None, jobs=None):
+    """
+    Validates the examples of the spec and the HTML records (see
+    collect_checks) and returns the report: the validator used, the numbers
+    of examples checked and valid, and the mismatches sorted by path, method
+    and status code.
+    """
+    with instrumentation.phase('validate.collect'):
+        checks = collect_checks(openapi_data, html_data)
+    if jsonschema is None:
+        print("jsonschema is not installed, the examples were not validated.")
+        return {'validator': None, 'checked': 0, 'valid': 0, 'skipped': len(checks), 'mismatches': []}
+
+    start = time.perf_counter()
+    with instrumentation.phase('validate.examples'):
+        mismatches = asyncio.run(validate_async(checks, openapi_data.get('components'), jobs))
+    seconds = time.perf_counter() - start
+    instrumentation.count('validate.examples', len(checks))
+    instrumentation.track_rate('validate.examples', 'validate.examples')
+
+    report = []
+    for index, errors, error_count in mismatches:
+        source, path, method, status, name, schema, _ = checks[index]
+        report.append({'path': path, 'method': method, 'status': status, 'source': source, 'example': name,
+                       'schema': schema.get('$ref', 'inline') if isinstance(schema, dict) else None,
+                       'error_count': error_count, 'errors': errors})
+    report.sort(key=lambda item: (item['path'], item['method'], item['status'], item['source'], item['example']))
+    return {
+        'validator': f"jsonschema {importlib.metadata.version('jsonschema')} Draft4Validator",
+        'checked': len(checks),
+        'valid': len(checks) - len(report),
+        'examples_per_second': round(len(checks) / seconds) if seconds else None,
+        'mismatches': report,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate the examples of openapi.yaml and of the HTML '
+                                                 'documentation against their schemas.')
+    parser.add_argument('--spec', default=OPENAPI_FILE, help='OpenAPI file')
+    parser.add_argument('--html-records', default=HTML_RECORDS_FILE,
+                        help='records written by parse_html_v2.py, skipped if the file does not exist')
+    parser.add_argument('--output', default=REPORT_FILE, help='JSON report of the mismatches')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    instrumentation.add_arguments(parser, 'validate_examples_profile.json')
+    args = parser.parse_args(argv)
+
+    with instrumentation.profiling(args):
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            openapi_data = yaml_backend.safe_load(f)
+        html_data = artifacts.read(args.html_records) if os.path.exists(args.html_records) else None
+        report = validate(openapi_data, html_data, args.jobs)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"{report['checked']} examples checked, {len(report['mismatches'])} do not match their schema. "
+          f"See {args.output} for details.")
+    return 1 if report['mismatches'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
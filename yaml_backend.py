@@ -0,0 +1,29 @@
+"""
+YAML backend selection for the pipeline scripts.
+
+PyYAML's pure-Python loader and dumper dominate the runtime of the pipeline.
+When PyYAML is built against libyaml, the C-backed CSafeLoader/CSafeDumper
+are used instead; otherwise everything falls back to the pure-Python classes.
+Both backends produce the same documents for the data handled here.
+"""
+import yaml
+
+HAS_LIBYAML = getattr(yaml, '__with_libyaml__', False) and hasattr(yaml, 'CSafeLoader')
+
+PureSafeLoader = yaml.SafeLoader
+PureSafeDumper = yaml.SafeDumper
+
+if HAS_LIBYAML:
+    SafeLoader = yaml.CSafeLoader
+    SafeDumper = yaml.CSafeDumper
+else:
+    SafeLoader = PureSafeLoader
+    SafeDumper = PureSafeDumper
+
+def safe_load(stream, Loader=None):
+    """Like yaml.safe_load, using the fastest available loader."""
+    return yaml.load(stream, Loader=Loader or SafeLoader)
+
+def dump(data, stream=None, Dumper=None, **kwds):
+    """Like yaml.dump for plain data, using the fastest available dumper."""
+    return yaml.dump(data, stream, Dumper=Dumper or SafeDumper, **kwds)